@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+
+MODES = ("record", "replay", "auto")
+
+
+class CassetteMiss(KeyError):
+    """Replay mode was asked for a prompt that was never recorded"""
+
+
+def prompt_key(prompt: str, params: Dict[str, Any]) -> str:
+    """Identity of a request: rendered prompt plus model parameters"""
+    raw = prompt + "\x1f" + json.dumps(params, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _prompt_text(input: Any) -> str:
+    return input.to_string() if hasattr(input, "to_string") else str(input)
+
+
+class Cassette:
+    """Append-only file of individually compressed records, plus a hash -> offset index
+
+    `<path>` holds zlib-compressed JSON records back to back; `<path>.idx` holds one
+    "key offset length" line per record. Opening a cassette only reads the index,
+    and each lookup is a dict hit plus one seek and one decompress.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.index_path = path + ".idx"
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._index: Dict[str, Tuple[int, int]] = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding="ascii") as f:
+                for line in f:
+                    key, offset, length = line.split()
+                    self._index[key] = (int(offset), int(length))
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        location = self._index.get(key)
+        if location is None:
+            return None
+        offset, length = location
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return json.loads(zlib.decompress(f.read(length)))
+
+    def put(self, record: Dict[str, Any]):
+        blob = zlib.compress(json.dumps(record, separators=(",", ":")).encode("utf-8"), 9)
+        with self._lock:
+            if record["key"] in self._index:
+                return
+            with open(self.path, "ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(blob)
+            with open(self.index_path, "a", encoding="ascii") as f:
+                f.write(f"{record['key']} {offset} {len(blob)}\n")
+            self._index[record["key"]] = (offset, len(blob))
+
+
+class CassetteClient:
+    """Wraps a chat model so calls are recorded to, or replayed from, a cassette"""
+
+    def __init__(self, client, cassette: Cassette, params: Dict[str, Any], mode: str = "replay",
+                 speed: float = 1.0):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}'. Choose one of: {', '.join(MODES)}")
+        self.client = client
+        self.cassette = cassette
+        self.params = params
+        self.mode = mode
+        self.speed = speed
+
+    def _lookup(self, prompt: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        key = prompt_key(prompt, self.params)
+        if self.mode == "record":
+            return key, None
+        record = self.cassette.get(key)
+        if record is None and self.mode == "replay":
+            raise CassetteMiss(f"No recording for prompt {key[:12]}… in {self.cassette.path}")
+        return key, record
+
+    def _save(self, key: str, prompt: str, chunks: List[Tuple[float, str]]):
+        self.cassette.put({
+            "key": key,
+            "prompt": prompt,
+            "params": self.params,
+            "chunks": chunks,
+            "recorded_at": time.time()
+        })
+
+    def _replay(self, record: Dict[str, Any]) -> Iterator[str]:
+        # Chunk times are stored as deltas, so `speed` scales the original pacing
+        for delta_s, text in record["chunks"]:
+            if self.speed:
+                time.sleep(delta_s * self.speed)
+            yield text
+
+    def invoke(self, input: Any, **kwargs) -> AIMessage:
+        prompt = _prompt_text(input)
+        key, record = self._lookup(prompt)
+        if record is not None:
+            return AIMessage(content="".join(self._replay(record)))
+
+        started = time.perf_counter()
+        result = self.client.invoke(input, **kwargs)
+        content = result.content if hasattr(result, "content") else str(result)
+        self._save(key, prompt, [(time.perf_counter() - started, content)])
+        return result
+
+    def stream(self, input: Any, **kwargs) -> Iterator[AIMessageChunk]:
+        prompt = _prompt_text(input)
+        key, record = self._lookup(prompt)
+        if record is not None:
+            for text in self._replay(record):
+                yield AIMessageChunk(content=text)
+            return
+
+        chunks: List[Tuple[float, str]] = []
+        last = time.perf_counter()
+        for chunk in self.client.stream(input, **kwargs):
+            now = time.perf_counter()
+            chunks.append((now - last, chunk.content if hasattr(chunk, "content") else str(chunk)))
+            last = now
+            yield chunk
+        # Only complete streams are recorded; an abandoned (e.g. hedged-out) stream is not
+        self._save(key, prompt, chunks)
+
+
+def cassette_factory(base_factory: Callable, path: str, mode: str = "replay", speed: float = 1.0) -> Callable:
+    """Wrap a ModelRouter factory so every model it builds goes through one cassette"""
+    cassette = Cassette(path)
+
+    def factory(profile):
+        # In pure replay mode the real client is never needed, so it is never built
+        client = None if mode == "replay" else base_factory(profile)
+        params = {
+            "model": profile.name,
+            "temperature": profile.temperature,
+            "max_output_tokens": profile.max_output_tokens
+        }
+        return CassetteClient(client, cassette, params, mode=mode, speed=speed)
+
+    return factory
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# ormsgpack is optional; without it checkpoints are JSON
+try:
+    import ormsgpack
+    HAS_ORMSGPACK = True
+except ImportError:
+    HAS_ORMSGPACK = False
+
+
+DEFAULT_CHECKPOINT_DIR = os.path.join(".state", "sessions")
+
+# Sessions not seen for this long are forgotten
+DEFAULT_MAX_AGE_S = 7 * 24 * 3600
+
+_SAFE_ID = re.compile(r"[^A-Za-z0-9_-]")
+
+
+def _dumps(state: Dict[str, Any]) -> bytes:
+    if HAS_ORMSGPACK:
+        return ormsgpack.packb(state)
+    return json.dumps(state, separators=(",", ":")).encode("utf-8")
+
+
+def _loads(data: bytes, msgpack: bool) -> Dict[str, Any]:
+    return ormsgpack.unpackb(data) if msgpack else json.loads(data)
+
+
+class CheckpointStore:
+    """Per-session state on local disk, so a restarted process can pick sessions back up
+
+    `save` only touches the disk when the state actually changed since the last write
+    (compared by digest), and writes atomically, so a crash mid-write leaves the previous
+    checkpoint intact.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CHECKPOINT_DIR, max_age_s: float = DEFAULT_MAX_AGE_S):
+        self.directory = directory
+        self.max_age_s = max_age_s
+        self.writes = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._digests: Dict[str, bytes] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, session_id: str, msgpack: bool = HAS_ORMSGPACK) -> str:
+        return os.path.join(self.directory, _SAFE_ID.sub("_", session_id) + (".msgpack" if msgpack else ".json"))
+
+    def save(self, session_id: str, state: Dict[str, Any]) -> bool:
+        """Write the state if it changed; returns whether it wrote"""
+        data = _dumps(state)
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        with self._lock:
+            if self._digests.get(session_id) == digest:
+                self.skipped += 1
+                return False
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._path(session_id))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        # Only now is this state on disk; remembering it earlier would skip the retry of a failed write
+        with self._lock:
+            self._digests[session_id] = digest
+            self.writes += 1
+        return True
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """The session's last checkpoint, in whichever format it was written"""
+        for msgpack in ((True, False) if HAS_ORMSGPACK else (False,)):
+            try:
+                with open(self._path(session_id, msgpack), "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                continue
+            try:
+                state = _loads(data, msgpack)
+            except ValueError:
+                return None
+            with self._lock:
+                self._digests[session_id] = hashlib.blake2b(_dumps(state), digest_size=16).digest()
+            return state
+        return None
+
+    def update(self, session_id: str, **changes: Any) -> bool:
+        """Merge fields into the last checkpoint"""
+        state = self.load(session_id) or {}
+        state.update(changes)
+        return self.save(session_id, state)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._digests.pop(session_id, None)
+        for msgpack in (True, False):
+            try:
+                os.unlink(self._path(session_id, msgpack))
+            except FileNotFoundError:
+                pass
+
+    def prune(self) -> int:
+        """Drop checkpoints older than `max_age_s`; returns how many went"""
+        cutoff = time.time() - self.max_age_s
+        removed = 0
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                try:
+                    os.unlink(entry.path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        return {"directory": self.directory, "writes": self.writes, "skipped": self.skipped,
+                "format": "msgpack" if HAS_ORMSGPACK else "json"}
@@ -0,0 +1,120 @@
+import threading
+import zlib
+from typing import Callable, Dict, List, Optional, Union
+
+# zstd is optional; without it everything is stored with zlib
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+
+# First byte of every compressed blob says how to read the rest
+_ZLIB = b"\x01"
+_ZSTD = b"\x02"
+
+DICT_SIZE = 32 * 1024
+
+# Training on fewer samples than this gives zstd nothing to learn from
+MIN_TRAINING_SAMPLES = 50
+
+
+def train_dictionary(samples: List[str], size: int = DICT_SIZE) -> bytes:
+    """A zstd dictionary of the phrases our posts and prompts keep repeating"""
+    if not HAS_ZSTD:
+        raise RuntimeError("Dictionary training needs zstandard. Install it with: pip install zstandard")
+    if len(samples) < MIN_TRAINING_SAMPLES:
+        raise ValueError(f"Need at least {MIN_TRAINING_SAMPLES} samples to train a dictionary, got {len(samples)}")
+    return zstandard.train_dictionary(size, [sample.encode("utf-8") for sample in samples]).as_bytes()
+
+
+def dictionary_id(data: bytes) -> int:
+    return zstandard.ZstdCompressionDict(data).dict_id()
+
+
+class Codec:
+    """Compresses stored text; zstd with a trained dictionary when available, zlib otherwise
+
+    Every frame records the id of the dictionary it was written with, so data written
+    before a retrain stays readable: unknown ids are fetched through `loader`.
+    """
+
+    def __init__(self, dictionary: Optional[bytes] = None, level: int = 9, min_size: int = 64,
+                 loader: Optional[Callable[[int], Optional[bytes]]] = None):
+        self.level = level
+        self.min_size = min_size
+        self.loader = loader
+        self.dict_id = 0
+        self._dicts: Dict[int, "zstandard.ZstdCompressionDict"] = {}
+        self._lock = threading.Lock()
+        # zstd (de)compressors are not thread-safe, so each thread builds its own
+        self._local = threading.local()
+        if dictionary:
+            self.use_dictionary(dictionary)
+
+    def use_dictionary(self, data: bytes) -> int:
+        """Compress new data with this dictionary; returns its id"""
+        if not HAS_ZSTD:
+            raise RuntimeError("Dictionary compression needs zstandard. Install it with: pip install zstandard")
+        compression_dict = zstandard.ZstdCompressionDict(data)
+        compression_dict.precompute_compress(level=self.level)
+        with self._lock:
+            self._dicts[compression_dict.dict_id()] = compression_dict
+            self.dict_id = compression_dict.dict_id()
+        return self.dict_id
+
+    def _dictionary(self, dict_id: int) -> "zstandard.ZstdCompressionDict":
+        with self._lock:
+            compression_dict = self._dicts.get(dict_id)
+        if compression_dict is None:
+            data = self.loader(dict_id) if self.loader else None
+            if data is None:
+                raise KeyError(f"Unknown compression dictionary {dict_id}")
+            compression_dict = zstandard.ZstdCompressionDict(data)
+            with self._lock:
+                self._dicts[dict_id] = compression_dict
+        return compression_dict
+
+    def _compressor(self) -> "zstandard.ZstdCompressor":
+        local = self._local
+        if getattr(local, "dict_id", None) != self.dict_id:
+            compression_dict = self._dictionary(self.dict_id) if self.dict_id else None
+            local.compressor = zstandard.ZstdCompressor(level=self.level, dict_data=compression_dict)
+            local.dict_id = self.dict_id
+        return local.compressor
+
+    def _decompressor(self, dict_id: int) -> "zstandard.ZstdDecompressor":
+        decompressors = getattr(self._local, "decompressors", None)
+        if decompressors is None:
+            decompressors = self._local.decompressors = {}
+        decompressor = decompressors.get(dict_id)
+        if decompressor is None:
+            compression_dict = self._dictionary(dict_id) if dict_id else None
+            decompressor = decompressors[dict_id] = zstandard.ZstdDecompressor(dict_data=compression_dict)
+        return decompressor
+
+    def compress(self, text: str) -> bytes:
+        data = text.encode("utf-8")
+        if HAS_ZSTD:
+            return _ZSTD + self._compressor().compress(data)
+        return _ZLIB + zlib.compress(data, self.level)
+
+    def decompress(self, blob: bytes) -> str:
+        kind, payload = blob[:1], blob[1:]
+        if kind == _ZLIB:
+            return zlib.decompress(payload).decode("utf-8")
+        if kind != _ZSTD:
+            raise ValueError(f"Unknown compression header {kind!r}")
+        if not HAS_ZSTD:
+            raise RuntimeError("This data was written with zstd. Install it with: pip install zstandard")
+        dict_id = zstandard.get_frame_parameters(payload).dict_id
+        return self._decompressor(dict_id).decompress(payload).decode("utf-8")
+
+    def encode(self, text: str) -> Union[str, bytes]:
+        """Storage form: short values stay plain text, since compressing them only adds bytes"""
+        return text if len(text) < self.min_size else self.compress(text)
+
+    def decode(self, value: Union[str, bytes]) -> str:
+        """Inverse of `encode`; plain text written before compression existed passes through"""
+        return value if isinstance(value, str) else self.decompress(value)
@@ -0,0 +1,323 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+
+# Below this many requests per arm a difference is not reported as significant
+MIN_SAMPLES = 30
+DEFAULT_ALPHA = 0.05
+
+# Per-request metrics and the direction that counts as better
+METRICS = {"latency_s": "lower", "prompt_tokens": "lower", "total_tokens": "lower"}
+RATES = ("word_limit_hit", "hashtags_at_end")
+
+
+class RunningStats:
+    """Count, mean and variance in O(1) memory (Welford's update)"""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x: float):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        return {"n": self.n, "mean": self.mean, "std": math.sqrt(self.variance),
+                "min": self.min if self.n else 0.0, "max": self.max if self.n else 0.0}
+
+
+class P2Quantile:
+    """Streaming quantile estimate from five markers (Jain & Chlamtac's P² algorithm)
+
+    Memory stays constant however many values arrive; the estimate is exact for the
+    first five and typically within a few percent after that.
+    """
+
+    def __init__(self, q: float):
+        self.q = q
+        self.count = 0
+        self._heights: List[float] = []
+        self._positions = [0.0, 1.0, 2.0, 3.0, 4.0]
+        self._desired = [0.0, 2 * q, 4 * q, 2 + 2 * q, 4.0]
+        self._steps = [0.0, q / 2, q, (1 + q) / 2, 1.0]
+
+    def add(self, x: float):
+        self.count += 1
+        heights = self._heights
+        if self.count <= 5:
+            heights.append(x)
+            heights.sort()
+            return
+
+        if x < heights[0]:
+            heights[0] = x
+            k = 0
+        elif x >= heights[4]:
+            heights[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if heights[i] <= x < heights[i + 1])
+        positions = self._positions
+        for i in range(k + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self._desired[i] += self._steps[i]
+
+        # Move the middle markers toward where they should be, one position at a time
+        for i in (1, 2, 3):
+            offset = self._desired[i] - positions[i]
+            if (offset >= 1 and positions[i + 1] - positions[i] > 1) or \
+                    (offset <= -1 and positions[i - 1] - positions[i] < -1):
+                d = 1 if offset > 0 else -1
+                height = self._parabolic(i, d)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + d * (heights[i + d] - heights[i]) / (positions[i + d] - positions[i])
+                heights[i] = height
+                positions[i] += d
+
+    def _parabolic(self, i: int, d: int) -> float:
+        q, n = self._heights, self._positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def value(self) -> Optional[float]:
+        if not self.count:
+            return None
+        if self.count <= 5:
+            return self._heights[min(len(self._heights) - 1, int(self.q * len(self._heights)))]
+        return self._heights[2]
+
+
+class MetricSummary:
+    """Streaming mean/variance plus p50 and p95 for one metric"""
+
+    def __init__(self):
+        self.stats = RunningStats()
+        self.p50 = P2Quantile(0.5)
+        self.p95 = P2Quantile(0.95)
+
+    def add(self, x: float):
+        self.stats.add(x)
+        self.p50.add(x)
+        self.p95.add(x)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**self.stats.to_dict(), "p50": self.p50.value(), "p95": self.p95.value()}
+
+
+class VariantStats:
+    """Aggregates for every request served with one prompt variant"""
+
+    def __init__(self):
+        self.metrics = {name: MetricSummary() for name in METRICS}
+        self.hits = {name: 0 for name in RATES}
+        self.errors = 0
+
+    @property
+    def n(self) -> int:
+        return self.metrics["latency_s"].stats.n
+
+    def to_dict(self) -> Dict[str, Any]:
+        n = self.n
+        return {
+            "n": n,
+            "errors": self.errors,
+            **{name: summary.to_dict() for name, summary in self.metrics.items()},
+            **{f"{name}_rate": self.hits[name] / n if n else 0.0 for name in RATES}
+        }
+
+
+def _betacf(a: float, b: float, x: float) -> float:
+    """Continued fraction for the incomplete beta function (modified Lentz)"""
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, 200):
+        for numerator in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                          -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            h *= d * c
+        if abs(d * c - 1.0) < 1e-12:
+            break
+    return h
+
+
+def _betainc(a: float, b: float, x: float) -> float:
+    """Regularized incomplete beta I_x(a, b)"""
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log(1 - x))
+    if x < (a + 1) / (a + b + 2):
+        return front * _betacf(a, b, x) / a
+    return 1.0 - front * _betacf(b, a, 1 - x) / b
+
+
+def welch_test(a: RunningStats, b: RunningStats) -> Dict[str, float]:
+    """Two-sided Welch's t-test on the difference of means (b - a)"""
+    if a.n < 2 or b.n < 2:
+        return {"diff": b.mean - a.mean, "t": 0.0, "df": 0.0, "p": 1.0}
+    va, vb = a.variance / a.n, b.variance / b.n
+    diff = b.mean - a.mean
+    if va + vb == 0:
+        return {"diff": diff, "t": 0.0, "df": float(a.n + b.n - 2), "p": 1.0 if diff == 0 else 0.0}
+    t = diff / math.sqrt(va + vb)
+    df = (va + vb) ** 2 / ((va ** 2 / (a.n - 1) if va else 0.0) + (vb ** 2 / (b.n - 1) if vb else 0.0))
+    return {"diff": diff, "t": t, "df": df, "p": _betainc(df / 2, 0.5, df / (df + t * t))}
+
+
+def proportion_test(hits_a: int, n_a: int, hits_b: int, n_b: int) -> Dict[str, float]:
+    """Two-sided two-proportion z-test on the difference of rates (b - a)"""
+    if not n_a or not n_b:
+        return {"diff": 0.0, "z": 0.0, "p": 1.0}
+    rate_a, rate_b = hits_a / n_a, hits_b / n_b
+    pooled = (hits_a + hits_b) / (n_a + n_b)
+    se = math.sqrt(pooled * (1 - pooled) * (1 / n_a + 1 / n_b))
+    if se == 0:
+        return {"diff": rate_b - rate_a, "z": 0.0, "p": 1.0}
+    z = (rate_b - rate_a) / se
+    return {"diff": rate_b - rate_a, "z": z, "p": math.erfc(abs(z) / math.sqrt(2))}
+
+
+class Experiment:
+    """Splits generation requests across prompt variants and compares them as results arrive
+
+    The first variant is the control. A request with a unit (the user) always lands on the
+    same variant, so a user doesn't see prompts change between posts; requests without
+    one are spread at random. Only the streaming aggregates are kept, never the requests.
+    """
+
+    def __init__(self, variants: Sequence[str], name: str = "prompt", weights: Optional[Sequence[float]] = None,
+                 seed: Optional[int] = None):
+        if len(variants) < 2:
+            raise ValueError("An experiment needs at least two variants")
+        self.name = name
+        self.variants = list(variants)
+        weights = list(weights or [1.0] * len(self.variants))
+        total = sum(weights)
+        self._bounds = [sum(weights[:i + 1]) / total for i in range(len(weights))]
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats = {variant: VariantStats() for variant in self.variants}
+
+    @classmethod
+    def from_env(cls) -> Optional["Experiment"]:
+        """PROMPT_EXPERIMENT=full,compact turns the experiment on; the first is the control"""
+        variants = [v.strip() for v in os.getenv("PROMPT_EXPERIMENT", "").split(",") if v.strip()]
+        return cls(variants) if len(variants) > 1 else None
+
+    def assign(self, unit: Optional[str] = None) -> str:
+        if unit is None:
+            with self._lock:
+                point = self._random.random()
+        else:
+            digest = hashlib.blake2b(f"{self.name}:{unit}".encode("utf-8"), digest_size=8).digest()
+            point = int.from_bytes(digest, "big") / 2 ** 64
+        return next((v for v, bound in zip(self.variants, self._bounds) if point < bound), self.variants[-1])
+
+    def record(self, variant: str, latency_s: float, prompt_tokens: int, total_tokens: int,
+               word_limit_hit: bool, hashtags_at_end: bool):
+        with self._lock:
+            stats = self._stats[variant]
+            for name, value in (("latency_s", latency_s), ("prompt_tokens", prompt_tokens),
+                                ("total_tokens", total_tokens)):
+                stats.metrics[name].add(value)
+            stats.hits["word_limit_hit"] += word_limit_hit
+            stats.hits["hashtags_at_end"] += hashtags_at_end
+
+    def record_error(self, variant: str):
+        with self._lock:
+            self._stats[variant].errors += 1
+
+    def report(self, alpha: float = DEFAULT_ALPHA) -> Dict[str, Any]:
+        """Per-variant aggregates, and every variant's differences from the control with p-values"""
+        with self._lock:
+            control_name = self.variants[0]
+            control = self._stats[control_name]
+            report = {
+                "experiment": self.name,
+                "control": control_name,
+                "alpha": alpha,
+                "variants": {name: stats.to_dict() for name, stats in self._stats.items()},
+                "comparisons": {}
+            }
+            for name in self.variants[1:]:
+                stats = self._stats[name]
+                enough = min(control.n, stats.n) >= MIN_SAMPLES
+                comparison = {}
+                for metric, better in METRICS.items():
+                    test = welch_test(control.metrics[metric].stats, stats.metrics[metric].stats)
+                    base = control.metrics[metric].stats.mean
+                    test["relative"] = test["diff"] / base if base else 0.0
+                    test["significant"] = enough and test["p"] < alpha
+                    test["better"] = test["significant"] and (test["diff"] < 0) == (better == "lower")
+                    comparison[metric] = test
+                for rate in RATES:
+                    test = proportion_test(control.hits[rate], control.n, stats.hits[rate], stats.n)
+                    test["significant"] = enough and test["p"] < alpha
+                    test["better"] = test["significant"] and test["diff"] > 0
+                    comparison[f"{rate}_rate"] = test
+                report["comparisons"][name] = comparison
+            return report
+
+    def reset(self):
+        with self._lock:
+            self._stats = {variant: VariantStats() for variant in self.variants}
+
+
+def format_report(report: Dict[str, Any]) -> List[str]:
+    """Plain-text lines for a report, one block per variant"""
+    lines = [f"experiment {report['experiment']!r}, control {report['control']!r}, alpha {report['alpha']}"]
+    for name, stats in report["variants"].items():
+        lines.append(
+            f"  {name:<10} n={stats['n']:<6,} latency p50 {stats['latency_s']['p50'] or 0:.3f}s "
+            f"p95 {stats['latency_s']['p95'] or 0:.3f}s  prompt {stats['prompt_tokens']['mean']:.0f} tok  "
+            f"total {stats['total_tokens']['mean']:.0f} tok  word limit {stats['word_limit_hit_rate']:.1%}  "
+            f"hashtags at end {stats['hashtags_at_end_rate']:.1%}"
+        )
+    for name, comparison in report["comparisons"].items():
+        for metric, test in comparison.items():
+            change = f"{test['relative']:+.1%}" if "relative" in test else f"{test['diff']:+.3f}"
+            verdict = ("better" if test["better"] else "worse") if test["significant"] else "n.s."
+            lines.append(f"  {name} vs {report['control']}: {metric:<22} {change:>8}  p={test['p']:.4f}  {verdict}")
+    return lines
+
+
+def main():
+    """Print a saved experiment report"""
+    parser = argparse.ArgumentParser(description="Show an A/B prompt experiment report")
+    parser.add_argument("path", help="Report JSON, as written by benchmarks.experiments --out")
+    args = parser.parse_args()
+
+    with open(args.path, encoding="utf-8") as f:
+        report = json.load(f)
+    print("\n".join(format_report(report)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import argparse
+import csv
+import hashlib
+import json
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from Agents.SharedState import StateBackend, get_backend
+
+# Parquet is optional; CSV and JSONL always work
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+FORMATS = ("csv", "jsonl", "parquet")
+
+COLUMNS = ["id", "user", "created_at", "topic", "audience", "template", "tone", "length",
+           "chars", "words", "hashtags", "job_id", "post"]
+
+# Watermarks reuse the backend cache, so they are shared across workers; effectively permanent
+WATERMARK_TTL_S = 10 * 365 * 24 * 3600
+
+
+@dataclass
+class ExportFilter:
+    """Which history records to export; None means "any" """
+    user: Optional[str] = None
+    since: Optional[float] = None
+    until: Optional[float] = None
+    audience: Optional[str] = None
+    template: Optional[str] = None
+    tone: Optional[str] = None
+    length: Optional[str] = None
+    contains: Optional[str] = None
+
+    def matches(self, record: Dict[str, Any]) -> bool:
+        created_at = record.get("created_at") or 0
+        if self.since is not None and created_at < self.since:
+            return False
+        if self.until is not None and created_at >= self.until:
+            return False
+        for field in ("audience", "template", "tone", "length"):
+            wanted = getattr(self, field)
+            if wanted is not None and record.get(field) != wanted:
+                return False
+        if self.contains and self.contains.lower() not in record.get("post", "").lower():
+            return False
+        return True
+
+
+@dataclass
+class ExportResult:
+    path: str
+    rows: int
+    last_id: int
+
+
+def iter_history(backend: StateBackend, filters: ExportFilter, after_id: int = 0,
+                 chunk_size: int = 1000) -> Iterator[Tuple[List[Dict[str, Any]], int]]:
+    """Yield (matching rows, last id seen) per page, oldest first; one page in memory at a time"""
+    while True:
+        page = backend.history_page(filters.user, after_id=after_id, limit=chunk_size)
+        if not page:
+            return
+        after_id = page[-1]["id"]
+        chunk = [_row(record) for record in page if filters.matches(record)]
+        # Even an all-filtered page is yielded so the caller's watermark keeps moving
+        yield chunk, after_id
+
+
+def _row(record: Dict[str, Any]) -> Dict[str, Any]:
+    row = {column: record.get(column) for column in COLUMNS}
+    if row["created_at"] is not None:
+        row["created_at"] = datetime.fromtimestamp(row["created_at"], tz=timezone.utc).isoformat()
+    return row
+
+
+class _CsvWriter:
+    def __init__(self, path: str):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=COLUMNS)
+        self._writer.writeheader()
+
+    def write(self, rows: List[Dict[str, Any]]):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class _JsonlWriter:
+    def __init__(self, path: str):
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, rows: List[Dict[str, Any]]):
+        self._file.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+
+    def close(self):
+        self._file.close()
+
+
+class _ParquetWriter:
+    """One row group per chunk, so memory stays bounded by the chunk size"""
+
+    def __init__(self, path: str):
+        if not HAS_PYARROW:
+            raise RuntimeError("Parquet export needs pyarrow. Install it with: pip install pyarrow")
+        self._schema = pa.schema([
+            ("id", pa.int64()), ("user", pa.string()), ("created_at", pa.string()),
+            ("topic", pa.string()), ("audience", pa.string()), ("template", pa.string()),
+            ("tone", pa.string()), ("length", pa.string()), ("chars", pa.int64()),
+            ("words", pa.int64()), ("hashtags", pa.int64()), ("job_id", pa.int64()), ("post", pa.string())
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema, compression="zstd")
+
+    def write(self, rows: List[Dict[str, Any]]):
+        if rows:
+            self._writer.write_batch(pa.RecordBatch.from_pylist(rows, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+_WRITERS = {"csv": _CsvWriter, "jsonl": _JsonlWriter, "parquet": _ParquetWriter}
+
+
+def _watermark_key(name: str, filters: ExportFilter) -> str:
+    """One watermark per name and filter set, so an export for one audience never skips another's posts"""
+    digest = hashlib.blake2b(json.dumps(asdict(filters), sort_keys=True).encode(), digest_size=8).hexdigest()
+    return f"export-watermark:{filters.user or '*'}:{name}:{digest}"
+
+
+def commit_watermark(backend: StateBackend, name: str, filters: ExportFilter, last_id: int):
+    """Mark posts up to `last_id` as exported under `name`; never moves the watermark back"""
+    key = _watermark_key(name, filters)
+    if last_id > int(backend.cache_get(key) or 0):
+        backend.cache_set(key, str(last_id), WATERMARK_TTL_S)
+
+
+def export_history(backend: StateBackend, path: str, fmt: str = "csv",
+                   filters: Optional[ExportFilter] = None, incremental: Optional[str] = None,
+                   chunk_size: int = 1000, commit: bool = True) -> ExportResult:
+    """Stream history to CSV/JSONL/Parquet; `incremental` names a watermark to resume from
+
+    The watermark is kept per name and filters: "only new" means new since the last export
+    with exactly these filters. With commit=False it is left alone, and the caller passes
+    `last_id` to commit_watermark once the file has actually been delivered.
+    """
+    if fmt not in _WRITERS:
+        raise ValueError(f"Unknown export format '{fmt}'. Choose one of: {', '.join(FORMATS)}")
+    filters = filters or ExportFilter()
+
+    after_id = 0
+    if incremental:
+        after_id = int(backend.cache_get(_watermark_key(incremental, filters)) or 0)
+
+    writer = _WRITERS[fmt](path)
+    rows, last_id = 0, after_id
+    try:
+        for chunk, last_id in iter_history(backend, filters, after_id, chunk_size):
+            writer.write(chunk)
+            rows += len(chunk)
+    finally:
+        writer.close()
+
+    if incremental and commit:
+        commit_watermark(backend, incremental, filters, last_id)
+    return ExportResult(path=path, rows=rows, last_id=last_id)
+
+
+def main():
+    """Export history from the shared state backend"""
+    parser = argparse.ArgumentParser(description="Export LinkedIn post history")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--user", help="Only this user's posts (default: everyone)")
+    parser.add_argument("--audience")
+    parser.add_argument("--template")
+    parser.add_argument("--tone")
+    parser.add_argument("--length")
+    parser.add_argument("--since-last", metavar="NAME", help="Incremental: only posts newer than the last NAME export")
+    args = parser.parse_args()
+
+    filters = ExportFilter(user=args.user, audience=args.audience, template=args.template,
+                           tone=args.tone, length=args.length)
+    result = export_history(get_backend(), args.out, args.format, filters, incremental=args.since_last)
+    print(f"Exported {result.rows} posts to {result.path} (last id {result.last_id})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import argparse
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from Agents.Hashtags import HashtagIndex, topic_terms
+from Agents.Parser import parse_post
+from Agents.PostAgent import LinkedInPostAgent
+from Agents.SharedState import StateBackend, get_backend
+
+
+# How much of the user's history a fallback looks through
+HISTORY_SCAN = 200
+
+# Share of topic terms a saved post must have in common to stand in for a new one
+SIMILAR_MIN_OVERLAP = 0.6
+
+# History sentences per draft, by length
+SNIPPETS_BY_LENGTH = {"Short": 2, "Medium": 4, "Long": 6}
+
+# Hook and call-to-action for each template's local draft, and whether the body is a numbered list
+TEMPLATE_SHAPES: Dict[str, Tuple[str, str, bool]] = {
+    "Personal Story": ("A moment that changed how I think about {topic}:",
+                       "Have you had a moment like this? I'd like to hear it.", False),
+    "Quick Tips List": ("A few things that make {topic} easier:", "Which one would you add?", True),
+    "Controversial Opinion": ("An unpopular take on {topic}:", "Agree or disagree? Tell me why.", False),
+    "Behind-the-Scenes": ("What {topic} looks like behind the scenes:", "What would you want to see next?", False),
+    "Trend Analysis": ("{topic} is changing. Here's what I'm watching:", "What are you seeing?", False),
+    "Motivational Message": ("If {topic} feels hard right now, you're not alone.",
+                             "What keeps you going?", False),
+    "Lesson Learned": ("One lesson {topic} taught me:", "What's a lesson you learned the hard way?", False),
+    "Myth vs Reality": ("Myth vs reality: {topic}", "Which myth would you add?", True),
+    "How-To / Framework": ("A simple way to approach {topic}:", "How do you approach it?", True)
+}
+DEFAULT_SHAPE = ("A few thoughts on {topic}:", "What's your take?", False)
+
+_SENTENCE = re.compile(r"[^.!?\n]+[.!?]+")
+_COVERED = ("Open with", "Start with", "End with")
+_LIST_MARK = re.compile(r"^\s*(?:[-•*]|\d+[.)])\s*")
+
+
+@dataclass
+class FallbackDraft:
+    """A stand-in post produced without the model"""
+    text: str
+    source: str  # "similar" (a saved post) or "template" (assembled locally)
+    detail: str = ""
+
+
+def _overlap(terms: set, other: set) -> float:
+    return len(terms & other) / len(terms | other) if terms and other else 0.0
+
+
+def similar_post(history: List[Dict], topic: str, template: str = "", tone: str = "",
+                 min_overlap: float = SIMILAR_MIN_OVERLAP) -> Optional[Dict]:
+    """The saved post whose topic is closest to this one, if it is close enough"""
+    terms = set(topic_terms(topic))
+    best, best_score = None, min_overlap
+    for record in history:
+        score = _overlap(terms, set(topic_terms(record.get("topic", ""))))
+        # Matching template and tone break ties; the history is newest first, so recency does too
+        score += 0.01 * (record.get("template") == template) + 0.01 * (record.get("tone") == tone)
+        if score > best_score and record.get("post"):
+            best, best_score = record, score
+    return best
+
+
+def history_snippets(history: List[Dict], topic: str, limit: int) -> List[str]:
+    """Sentences from saved post bodies that mention the topic's terms, best matches first"""
+    terms = set(topic_terms(topic))
+    if not terms or limit <= 0:
+        return []
+    # A single shared word ("work") is too loose once the topic has more than one
+    needed = min(2, len(terms))
+    scored, seen = [], set()
+    for rank, record in enumerate(history):
+        body = parse_post(record.get("post", "")).sections()["body"]
+        for match in _SENTENCE.finditer(body):
+            sentence = _LIST_MARK.sub("", match.group()).strip()
+            words = len(sentence.split())
+            if not 6 <= words <= 35 or sentence.lower() in seen:
+                continue
+            hits = len(terms & set(topic_terms(sentence)))
+            if hits >= needed:
+                seen.add(sentence.lower())
+                scored.append((-hits, rank, sentence))
+    scored.sort()
+    return [sentence for _, _, sentence in scored[:limit]]
+
+
+def _beats(template_prompt: str) -> List[str]:
+    """The template's structural instructions after its opening line, as writing prompts"""
+    sentences = [match.group().strip() for match in _SENTENCE.finditer(template_prompt)]
+    # Openings and endings are already covered by the hook and call-to-action
+    return [f"[{sentence}]" for sentence in sentences[1:] if not sentence.startswith(_COVERED)]
+
+
+def _camel_tag(terms: List[str]) -> str:
+    return "#" + "".join(part.capitalize() for term in terms for part in re.split(r"\W+", term))
+
+
+def _fallback_tags(topic: str, index: Optional[HashtagIndex]) -> List[str]:
+    """Suggestions from the hashtag index, topped up with tags made from the topic's own words"""
+    tags = [tag for tag, _ in index.suggest(topic, 5)] if index else []
+    terms = topic_terms(topic)
+    for tag in [_camel_tag(terms[:2])] + [_camel_tag([term]) for term in terms]:
+        if len(tags) >= 3:
+            break
+        if tag != "#" and tag.lower() not in {t.lower() for t in tags}:
+            tags.append(tag)
+    return tags
+
+
+def template_draft(template: str, template_prompt: str, topic: str, length: str = "Medium",
+                   history: Optional[List[Dict]] = None, index: Optional[HashtagIndex] = None) -> str:
+    """Assemble a draft from the template's shape and the user's own past sentences on the topic
+
+    Where history runs short, the template's remaining instructions are left as bracketed
+    prompts, so what needs writing is obvious.
+    """
+    hook, cta, numbered = TEMPLATE_SHAPES.get(template, DEFAULT_SHAPE)
+    topic = topic.strip()
+    snippets = history_snippets(history or [], topic, SNIPPETS_BY_LENGTH.get(length, 4))
+    beats = _beats(template_prompt.replace("{topic}", topic))
+    points = snippets + beats[len(snippets):]
+    if not points:
+        points = ["[Your main point.]"]
+    if numbered:
+        body = "\n".join(f"{i}. {point}" for i, point in enumerate(points, 1))
+    else:
+        body = "\n\n".join(points)
+    hook = hook.format(topic=topic)
+    parts = [hook[:1].upper() + hook[1:], body, cta, " ".join(_fallback_tags(topic, index))]
+    return "\n\n".join(part for part in parts if part)
+
+
+def fallback_post(backend: StateBackend, user: str, topic: str, template: str, template_prompt: str,
+                  tone: str = "", length: str = "Medium", index: Optional[HashtagIndex] = None) -> FallbackDraft:
+    """Best stand-in when the model can't answer: a close saved post, else a local template draft"""
+    history = backend.history_list(user, limit=HISTORY_SCAN)
+    similar = similar_post(history, topic, template, tone)
+    if similar:
+        return FallbackDraft(similar["post"], "similar", similar.get("topic", ""))
+    return FallbackDraft(template_draft(template, template_prompt, topic, length, history, index), "template", template)
+
+
+def main():
+    """Print the fallback draft a user would get for a topic"""
+    parser = argparse.ArgumentParser(description="Show the offline fallback draft for a topic")
+    parser.add_argument("topic")
+    parser.add_argument("--user", default="cli", help="Whose history to draw on")
+    parser.add_argument("--template", default="Quick Tips List", choices=sorted(TEMPLATE_SHAPES))
+    parser.add_argument("--length", default="Medium", choices=list(SNIPPETS_BY_LENGTH))
+    args = parser.parse_args()
+
+    agent = LinkedInPostAgent()
+    backend = get_backend()
+    index = HashtagIndex(backend)
+    index.refresh()
+    draft = fallback_post(backend, args.user, args.topic, args.template, agent.prompt_templates[args.template],
+                          length=args.length, index=index)
+    print(f"[{draft.source}] {draft.detail}\n")
+    print(draft.text)
+
+
+if __name__ == "__main__":
+    main()
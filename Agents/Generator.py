@@ -1,8 +1,9 @@
 import os
 from typing import Dict, Optional
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
 from dotenv import load_dotenv
+from Agents import Sections
+from Agents.Router import ModelProfile, ModelRouter, factory_from_env
 
 load_dotenv()
 
@@ -10,16 +11,16 @@ load_dotenv()
 class LinkedInPostAgent:
     """Interactive agent for generating LinkedIn posts"""
     
-    def __init__(self, api_key: Optional[str] = None):
-        """Initialize with Gemini model"""
+    def __init__(self, api_key: Optional[str] = None, router: Optional[ModelRouter] = None):
+        """Initialize with Gemini models"""
         if api_key:
             os.environ["GOOGLE_API_KEY"] = api_key
         
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            temperature=0.9,
-            max_output_tokens=2048
-        )
+        self.router = router or ModelRouter([
+            ModelProfile("gemini-2.5-flash", "quality", temperature=0.9, max_output_tokens=2048),
+            ModelProfile("gemini-2.5-flash-lite", "fast", temperature=0.9, max_output_tokens=2048)
+        ], factory=factory_from_env())
+        self.llm = self.router
         
         self.prompt_templates = self._load_prompt_templates()
         self.audiences = self._load_audiences()
@@ -251,16 +252,16 @@ class LinkedInPostAgent:
             """
         )
         
-        # Create chain using LCEL (LangChain Expression Language)
-        chain = final_prompt | self.llm
-        
-        result = chain.invoke({
+        prompt_value = final_prompt.invoke({
             "prompt": prompt,
             "topic": topic,
             "audience": audience,
             "rules": self._humanization_rules()
         })
         
+        # The CLI has no length setting, so it keeps the heavier model first
+        result = self.router.invoke(prompt_value, prefer="quality")
+        
         # Extract content from AIMessage if needed
         if hasattr(result, 'content'):
             result = result.content
@@ -277,52 +278,14 @@ class LinkedInPostAgent:
     
     def parse_post_sections(self, post: str) -> Dict[str, str]:
         """Parse post into sections for editing"""
-        sections = {
-            "hook": "",
-            "body": "",
-            "cta": "",
-            "hashtags": "",
-            "full": post
-        }
-        
-        lines = post.split('\n')
-        current_section = "body"
-        hook_found = False
-        
-        # Try to identify sections
-        for i, line in enumerate(lines):
-            line_lower = line.strip().lower()
-            
-            # Detect hook (usually first 1-2 non-empty lines)
-            if not hook_found and line.strip() and i < 3:
-                sections["hook"] += line + "\n"
-                hook_found = True
-                continue
-            
-            # Detect hashtags (lines starting with #)
-            if line.strip().startswith('#'):
-                sections["hashtags"] += line + "\n"
-                continue
-            
-            # Detect CTA (questions, "What do you think?", etc.)
-            if any(phrase in line_lower for phrase in ['what do you think', 'comment below', 'share your thoughts', '?']):
-                if not sections["cta"]:
-                    sections["cta"] = line + "\n"
-                else:
-                    sections["cta"] += line + "\n"
-                continue
-            
-            # Everything else is body
-            if line.strip():
-                sections["body"] += line + "\n"
-        
-        # Clean up sections
-        for key in sections:
-            sections[key] = sections[key].strip()
-        
-        return sections
+        return Sections.parse_post_sections(post)
+    
+    def regenerate_section(self, post: str, section: str, topic: str, audience: str,
+                           instructions: Optional[str] = None) -> str:
+        """Rewrite only one section (hook, body, cta or hashtags) of the post"""
+        return Sections.regenerate_section(self.llm, post, section, topic, audience, instructions)
     
-    def edit_post(self, post: str) -> str:
+    def edit_post(self, post: str, topic: str = "", audience: str = "") -> str:
         """Allow user to edit specific parts of the generated post"""
         sections = self.parse_post_sections(post)
         
@@ -336,9 +299,10 @@ class LinkedInPostAgent:
             print("3. Call-to-Action (Ending)")
             print("4. Hashtags")
             print("5. View current post")
-            print("6. Done editing")
+            print("6. Regenerate one section with AI")
+            print("7. Done editing")
             
-            choice = input("\nYour choice (1-6): ").strip()
+            choice = input("\nYour choice (1-7): ").strip()
             
             if choice == "1":
                 print("\nCurrent Hook:")
@@ -410,34 +374,33 @@ class LinkedInPostAgent:
                 print("\n" + "="*60 + "\n")
             
             elif choice == "6":
+                section = input("\nSection to regenerate (hook/body/cta/hashtags): ").strip().lower()
+                if section not in Sections.SECTION_NAMES:
+                    print("Invalid section.\n")
+                    continue
+                instructions = input("Any extra instructions? (optional): ").strip()
+                print(f"\nRegenerating {section}...")
+                try:
+                    new_post = self.regenerate_section(
+                        self.reconstruct_post(sections), section, topic, audience, instructions
+                    )
+                except Exception as e:
+                    print(f"Error regenerating section: {str(e)}\n")
+                    continue
+                sections = self.parse_post_sections(new_post)
+                print(f"{section.capitalize()} regenerated!\n")
+            
+            elif choice == "7":
                 # Reconstruct the final post
                 edited_post = self.reconstruct_post(sections)
                 return edited_post
             
             else:
-                print("Invalid choice. Please enter 1-6.\n")
+                print("Invalid choice. Please enter 1-7.\n")
     
     def reconstruct_post(self, sections: Dict[str, str]) -> str:
         """Reconstruct the post from edited sections"""
-        parts = []
-        
-        if sections["hook"]:
-            parts.append(sections["hook"])
-        
-        if sections["body"]:
-            parts.append(sections["body"])
-        
-        if sections["cta"]:
-            parts.append(sections["cta"])
-        
-        if sections["hashtags"]:
-            parts.append(sections["hashtags"])
-        
-        # If no sections were parsed, return original
-        if not any(sections[key] for key in ["hook", "body", "cta", "hashtags"]):
-            return sections["full"]
-        
-        return "\n\n".join(parts)
+        return Sections.reconstruct_post(sections)
     
     def run(self):
         """Main interactive flow"""
@@ -462,7 +425,7 @@ class LinkedInPostAgent:
         # Step 6: Ask if they want to edit the post
         edit_choice = input("Would you like to edit this post? (yes/no): ").strip().lower()
         if edit_choice in ['yes', 'y']:
-            post = self.edit_post(post)
+            post = self.edit_post(post, topic, audience)
             self.display_post(post)
         
         # Step 7: Ask if they want to use another template
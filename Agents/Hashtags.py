@@ -0,0 +1,223 @@
+import argparse
+import bisect
+import math
+import re
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from Agents.Parser import parse_post
+from Agents.Quota import DEFAULT_TENANT
+from Agents.SharedState import StateBackend, get_backend
+
+
+# Topic words that say nothing about which tags fit
+STOPWORDS = frozenset("""
+a about after all an and are as at be being but by can do for from has have how i if in into is it its
+make more my new not of on or our so than that the their them this to up us was we what when why will
+with without you your
+""".split())
+
+_TERM = re.compile(r"[^\W\d_][\w'-]*")
+_TAG = re.compile(r"#?(\w+)")
+
+
+def topic_terms(text: str) -> List[str]:
+    """Lower-cased content words of a topic, with a plural "s" dropped so "teams" finds "team" tags"""
+    terms = []
+    for match in _TERM.finditer(text.lower()):
+        term = match.group().strip("'-")
+        if len(term) < 3 or term in STOPWORDS:
+            continue
+        if len(term) > 3 and term.endswith("s") and not term.endswith("ss"):
+            term = term[:-1]
+        terms.append(term)
+    return list(dict.fromkeys(terms))
+
+
+def normalize_tag(tag: str) -> str:
+    """"#RemoteWork", "remotework" and "#remotework" are the same tag"""
+    match = _TAG.match(tag.strip())
+    return match.group(1).lower() if match else ""
+
+
+class HashtagIndex:
+    """Topic-term → hashtag co-occurrence counts, built incrementally from saved posts
+
+    Tags and terms are interned to ints. Counts live in flat arrays: `_cols[slot]` is a
+    tag id and `_counts[slot]` how often it appeared with a term, and each term keeps the
+    list of its slots. A save touches terms × tags slots (a topic has a handful of
+    terms), and scoring a topic is one bincount over its terms' slots.
+
+    An index covers one tenant's posts, so suggestions never leak another tenant's tags.
+    """
+
+    def __init__(self, backend: Optional[StateBackend] = None, tenant: str = DEFAULT_TENANT):
+        self.backend = backend
+        self.tenant = tenant
+        self.last_id = 0
+        self.posts = 0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._tag_ids: Dict[str, int] = {}
+        self._tag_names: List[str] = []  # display form, as first seen
+        self._tag_totals = array("I")
+        self._sorted_tags: List[str] = []  # normalized, for prefix search
+        self._term_ids: Dict[str, int] = {}
+        self._term_posts = array("I")  # posts each term appeared in, for IDF
+        self._term_slots: List[array] = []
+        self._slots: Dict[int, int] = {}  # (term id << 32 | tag id) → slot
+        self._cols = array("I")
+        self._counts = array("I")
+
+    def _tag_id(self, tag: str) -> int:
+        key = normalize_tag(tag)
+        tag_id = self._tag_ids.get(key)
+        if tag_id is None:
+            tag_id = self._tag_ids[key] = len(self._tag_names)
+            self._tag_names.append(tag if tag.startswith("#") else f"#{tag}")
+            self._tag_totals.append(0)
+            bisect.insort(self._sorted_tags, key)
+        return tag_id
+
+    def _term_id(self, term: str) -> int:
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            term_id = self._term_ids[term] = len(self._term_slots)
+            self._term_slots.append(array("I"))
+            self._term_posts.append(0)
+        return term_id
+
+    def add(self, topic: str, tags: Iterable[str]):
+        """Count one saved post"""
+        with self._lock:
+            tag_ids = list(dict.fromkeys(self._tag_id(tag) for tag in tags if normalize_tag(tag)))
+            if not tag_ids:
+                return
+            self.posts += 1
+            for tag_id in tag_ids:
+                self._tag_totals[tag_id] += 1
+            for term in topic_terms(topic):
+                term_id = self._term_id(term)
+                self._term_posts[term_id] += 1
+                for tag_id in tag_ids:
+                    key = term_id << 32 | tag_id
+                    slot = self._slots.get(key)
+                    if slot is None:
+                        slot = self._slots[key] = len(self._cols)
+                        self._cols.append(tag_id)
+                        self._counts.append(0)
+                        self._term_slots[term_id].append(slot)
+                    self._counts[slot] += 1
+
+    def add_post(self, record: Dict):
+        tree = parse_post(record.get("post", ""))
+        self.add(record.get("topic", ""), [*tree.tags, *tree.body_tags])
+
+    def refresh(self, page_size: int = 1000) -> int:
+        """Index the tenant's history saved since the last refresh (by any process); returns posts added
+
+        Sessions share one index, so the whole catch-up holds a lock: two refreshes at once
+        would otherwise both read the page after `last_id` and count it twice.
+        """
+        if self.backend is None:
+            return 0
+        added = 0
+        with self._refresh_lock:
+            while True:
+                page = self.backend.history_page(None, after_id=self.last_id, limit=page_size)
+                if not page:
+                    return added
+                for record in page:
+                    # Posts saved before tenants were recorded belong to the default one
+                    if record.get("tenant", DEFAULT_TENANT) == self.tenant:
+                        self.add_post(record)
+                        added += 1
+                self.last_id = page[-1]["id"]
+
+    def _scores(self, topic: str) -> np.ndarray:
+        """Per-tag relevance: co-occurrences with each topic term, weighted by the term's IDF"""
+        scores = np.zeros(len(self._tag_names))
+        for term in topic_terms(topic):
+            term_id = self._term_ids.get(term)
+            if term_id is None:
+                continue
+            slots = np.frombuffer(self._term_slots[term_id], dtype=np.uint32)
+            idf = math.log(1 + self.posts / self._term_posts[term_id])
+            scores += idf * np.bincount(np.frombuffer(self._cols, dtype=np.uint32)[slots],
+                                        weights=np.frombuffer(self._counts, dtype=np.uint32)[slots],
+                                        minlength=len(scores))
+        return scores
+
+    def suggest(self, topic: str, limit: int = 5, exclude: Sequence[str] = ()) -> List[Tuple[str, float]]:
+        """Best tags for a topic, highest score first"""
+        with self._lock:
+            if not self._tag_names:
+                return []
+            scores = self._scores(topic)
+            for tag in exclude:
+                tag_id = self._tag_ids.get(normalize_tag(tag))
+                if tag_id is not None:
+                    scores[tag_id] = 0
+            top = np.argsort(-scores, kind="stable")[:limit]
+            return [(self._tag_names[i], float(scores[i])) for i in top if scores[i] > 0]
+
+    def complete(self, prefix: str, limit: int = 8) -> List[Tuple[str, int]]:
+        """Known tags starting with `prefix`, most used first"""
+        key = normalize_tag(prefix)
+        with self._lock:
+            start = bisect.bisect_left(self._sorted_tags, key)
+            end = bisect.bisect_left(self._sorted_tags, key + "\U0010ffff")
+            matches = [self._tag_ids[tag] for tag in self._sorted_tags[start:end]]
+            matches.sort(key=lambda tag_id: -self._tag_totals[tag_id])
+            return [(self._tag_names[i], self._tag_totals[i]) for i in matches[:limit]]
+
+    def validate(self, topic: str, tags: Iterable[str]) -> List[Dict]:
+        """How often each tag has been used, and whether it has gone with this topic's terms before"""
+        with self._lock:
+            scores = self._scores(topic) if self._tag_names else np.zeros(0)
+            report = []
+            for tag in tags:
+                tag_id = self._tag_ids.get(normalize_tag(tag))
+                report.append({
+                    "tag": tag,
+                    "uses": self._tag_totals[tag_id] if tag_id is not None else 0,
+                    "on_topic": bool(tag_id is not None and scores[tag_id] > 0)
+                })
+            return report
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "posts": self.posts,
+                "tags": len(self._tag_names),
+                "terms": len(self._term_slots),
+                "pairs": len(self._cols),
+                "last_id": self.last_id
+            }
+
+
+def main():
+    """Build the index from history and query it"""
+    parser = argparse.ArgumentParser(description="Hashtag suggestions from saved posts")
+    parser.add_argument("topic", nargs="?", default="", help="Suggest tags for this topic")
+    parser.add_argument("--complete", help="List known tags starting with this prefix")
+    parser.add_argument("--limit", type=int, default=8)
+    parser.add_argument("--tenant", default=DEFAULT_TENANT)
+    args = parser.parse_args()
+
+    index = HashtagIndex(get_backend(), args.tenant)
+    index.refresh()
+    print(index.stats())
+    if args.topic:
+        for tag, score in index.suggest(args.topic, args.limit):
+            print(f"{tag:<30} {score:8.2f}")
+    if args.complete:
+        for tag, uses in index.complete(args.complete, args.limit):
+            print(f"{tag:<30} {uses:8,} uses")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Deque, Dict, Optional
+from langchain_core.messages import AIMessage
+
+
+class _Attempt:
+    """One streamed call; records time to first token and can be abandoned mid-stream
+
+    Abandoning only takes effect when the next chunk arrives, and a hedge fires exactly when
+    no chunk is coming. So every attempt also carries a timeout on its HTTP reads: a stuck
+    loser gives back its thread and pooled connection after `timeout_s` of silence at most.
+    """
+
+    def __init__(self, client, input: Any, kwargs: Dict[str, Any], timeout_s: Optional[float] = None):
+        self.client = client
+        self.input = input
+        self.kwargs = kwargs if timeout_s is None else {"timeout": timeout_s, **kwargs}
+        self.first_token = threading.Event()
+        self.cancelled = threading.Event()
+        self.ttft_s: Optional[float] = None
+        self.started = time.perf_counter()
+
+    def run(self) -> AIMessage:
+        started = self.started = time.perf_counter()
+        stream = self.client.stream(self.input, **self.kwargs)
+        parts = []
+        try:
+            for chunk in stream:
+                if self.ttft_s is None:
+                    self.ttft_s = time.perf_counter() - started
+                    self.first_token.set()
+                if self.cancelled.is_set():
+                    raise RuntimeError("hedged attempt cancelled")
+                parts.append(chunk.content if hasattr(chunk, "content") else str(chunk))
+        finally:
+            # Closing the generator aborts the underlying HTTP stream for the loser
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+            self.first_token.set()
+        return AIMessage(content="".join(parts))
+
+
+class HedgedInvoker:
+    """Fires a backup request when the first token is late, and keeps whichever finishes first"""
+
+    def __init__(self, quantile: float = 0.9, default_threshold_s: float = 4.0, min_samples: int = 20,
+                 window: int = 200, max_hedge_ratio: float = 0.1, burst: float = 3.0,
+                 executor: Optional[ThreadPoolExecutor] = None, attempt_timeout_s: Optional[float] = 30.0):
+        self.quantile = quantile
+        self.attempt_timeout_s = attempt_timeout_s
+        self.default_threshold_s = default_threshold_s
+        self.min_samples = min_samples
+        self.max_hedge_ratio = max_hedge_ratio
+        self.burst = burst
+        self.executor = executor or ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedge")
+
+        self._lock = threading.Lock()
+        self._ttft: Dict[str, Deque[float]] = {}
+        self._window = window
+        # Every request earns `max_hedge_ratio` of a hedge, so hedges stay under that share of traffic
+        self._budget = burst
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.budget_denied = 0
+
+    def threshold(self, key: str) -> float:
+        """Adaptive hedge delay: the rolling time-to-first-token quantile for this model"""
+        with self._lock:
+            threshold = self._quantile_locked(self._ttft.get(key, ()))
+        return self.default_threshold_s if threshold is None else threshold
+
+    def _record_ttft(self, key: str, ttft_s: Optional[float]):
+        if ttft_s is None:
+            return
+        with self._lock:
+            self._ttft.setdefault(key, deque(maxlen=self._window)).append(ttft_s)
+
+    def _take_budget(self) -> bool:
+        with self._lock:
+            if self._budget >= 1.0:
+                self._budget -= 1.0
+                self.hedges += 1
+                return True
+            self.budget_denied += 1
+            return False
+
+    def invoke(self, client, input: Any, key: str = "default", **kwargs) -> AIMessage:
+        with self._lock:
+            self.requests += 1
+            self._budget = min(self.burst, self._budget + self.max_hedge_ratio)
+
+        primary = _Attempt(client, input, kwargs, self.attempt_timeout_s)
+        attempts = {self.executor.submit(primary.run): primary}
+
+        if not primary.first_token.wait(self.threshold(key)) and self._take_budget():
+            hedge = _Attempt(client, input, kwargs, self.attempt_timeout_s)
+            attempts[self.executor.submit(hedge.run)] = hedge
+
+        pending = set(attempts)
+        last_error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                attempt = attempts[future]
+                self._record_ttft(key, attempt.ttft_s)
+                if future.exception() is not None:
+                    last_error = future.exception()
+                    continue
+                for loser in pending:
+                    attempts[loser].cancelled.set()
+                    if attempts[loser].ttft_s is None:
+                        # Censored sample: the loser's first token took at least this long
+                        self._record_ttft(key, time.perf_counter() - attempts[loser].started)
+                if attempt is not primary:
+                    with self._lock:
+                        self.hedge_wins += 1
+                return future.result()
+        raise last_error
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedges": self.hedges,
+                "hedge_rate": self.hedges / self.requests if self.requests else 0.0,
+                "hedge_wins": self.hedge_wins,
+                "hedge_win_rate": self.hedge_wins / self.hedges if self.hedges else 0.0,
+                "budget_denied": self.budget_denied,
+                "thresholds_s": {key: self._quantile_locked(samples) for key, samples in self._ttft.items()}
+            }
+
+    def _quantile_locked(self, samples) -> Optional[float]:
+        if len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
@@ -0,0 +1,282 @@
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from Agents.Jobs import PRIORITY_LOW, JobQueue
+from Agents.PostAgent import LinkedInPostAgent
+from Agents.Quota import DEFAULT_TENANT
+from Agents.SharedState import DEFAULT_DB_PATH, StateBackend, get_backend
+
+# XLSX is optional; CSV and JSONL always work
+try:
+    import openpyxl
+    HAS_OPENPYXL = True
+except ImportError:
+    HAS_OPENPYXL = False
+
+
+FORMATS = ("csv", "jsonl", "xlsx")
+
+# Row columns besides "topic"; blank cells fall back to the import defaults
+SETTING_COLUMNS = ("audience", "template", "tone", "length")
+
+CUSTOM_TEMPLATE = "Custom"
+
+# Only the first few problems are kept for display; the counts cover every row
+MAX_ISSUES = 200
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_topic(topic: str) -> str:
+    """Case, punctuation and spacing differences don't make a topic new"""
+    topic = unicodedata.normalize("NFKC", topic).casefold()
+    return _SPACES.sub(" ", _PUNCTUATION.sub(" ", topic)).strip()
+
+
+def topic_key(topic: str) -> str:
+    return hashlib.blake2b(normalize_topic(topic).encode("utf-8"), digest_size=16).hexdigest()
+
+
+@dataclass
+class ImportIssue:
+    line: int
+    topic: str
+    message: str
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    queued: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    issues: List[ImportIssue] = field(default_factory=list)
+
+    def add_issue(self, line: int, topic: str, message: str):
+        if len(self.issues) < MAX_ISSUES:
+            self.issues.append(ImportIssue(line, topic, message))
+
+
+def _format_of(name: str) -> str:
+    fmt = os.path.splitext(name)[1].lstrip(".").lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported topic file '{name}'. Use one of: {', '.join(FORMATS)}")
+    return fmt
+
+
+def _clean(row: Dict[Any, Any]) -> Dict[str, str]:
+    return {str(key).strip().lower(): "" if value is None else str(value).strip()
+            for key, value in row.items() if key is not None}
+
+
+def _read_xlsx(stream: BinaryIO) -> Iterator[Tuple[int, Dict[str, str]]]:
+    if not HAS_OPENPYXL:
+        raise RuntimeError("XLSX import needs openpyxl. Install it with: pip install openpyxl")
+    # read_only mode streams rows from the sheet XML instead of loading the workbook
+    workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        for line, values in enumerate(rows, start=2):
+            yield line, _clean(dict(zip(header, values)))
+    finally:
+        workbook.close()
+
+
+def _json_row(raw: str) -> Dict[str, str]:
+    try:
+        value = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"invalid JSON ({e.msg})") from e
+    if not isinstance(value, dict):
+        raise ValueError("not a JSON object")
+    return _clean(value)
+
+
+def read_rows(stream: BinaryIO, fmt: str,
+              on_error: Optional[Callable[[int, str], None]] = None) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """Yield (line number, row) one at a time, with lower-cased column names
+
+    A JSONL line that isn't a JSON object is passed to `on_error` and skipped; without
+    one, it raises ValueError.
+    """
+    if fmt == "xlsx":
+        yield from _read_xlsx(stream)
+        return
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(text)
+            for row in reader:
+                yield reader.line_num, _clean(row)
+        else:
+            for line, raw in enumerate(text, start=1):
+                if not raw.strip():
+                    continue
+                try:
+                    row = _json_row(raw)
+                except ValueError as e:
+                    if on_error is None:
+                        raise ValueError(f"line {line}: {e}") from e
+                    on_error(line, str(e))
+                    continue
+                yield line, row
+    finally:
+        # Don't close the caller's stream along with the wrapper
+        text.detach()
+
+
+def _lookup(catalog: Dict[str, Any], value: str) -> Optional[str]:
+    if value in catalog:
+        return value
+    folded = value.casefold()
+    return next((name for name in catalog if name.casefold() == folded), None)
+
+
+def validate_row(agent: LinkedInPostAgent, row: Dict[str, str], defaults: Dict[str, str]) -> Dict[str, Any]:
+    """Turn a row into a queue payload, or raise ValueError naming the bad column"""
+    topic = row.get("topic", "")
+    if not topic:
+        raise ValueError("missing topic")
+
+    catalogs = {"audience": agent.audiences, "template": agent.prompt_templates,
+                "tone": agent.tones, "length": agent.lengths}
+    settings = {}
+    for column in SETTING_COLUMNS:
+        value = row.get(column) or defaults.get(column, "")
+        if column == "template" and value.casefold() == CUSTOM_TEMPLATE.casefold():
+            settings[column] = CUSTOM_TEMPLATE
+            continue
+        name = _lookup(catalogs[column], value)
+        if name is None:
+            raise ValueError(f"unknown {column} '{value}'")
+        settings[column] = name
+
+    if settings["template"] == CUSTOM_TEMPLATE:
+        instructions = row.get("instructions") or defaults.get("instructions", "")
+        if not instructions:
+            raise ValueError("custom template needs an instructions column")
+    else:
+        instructions = agent.prompt_templates[settings["template"]]
+
+    return {
+        "instructions": instructions,
+        "topic": topic,
+        "audience": settings["audience"],
+        "audience_desc": agent.audiences[settings["audience"]],
+        "template": settings["template"],
+        "tone": settings["tone"],
+        "length": settings["length"],
+        "tenant": defaults.get("tenant", DEFAULT_TENANT)
+    }
+
+
+def history_topic_keys(backend: StateBackend, user: str, chunk_size: int = 1000) -> Set[str]:
+    """Topic keys of everything already in the user's history, read a page at a time"""
+    keys: Set[str] = set()
+    after_id = 0
+    while True:
+        page = backend.history_page(user, after_id=after_id, limit=chunk_size)
+        if not page:
+            return keys
+        after_id = page[-1]["id"]
+        keys.update(topic_key(record["topic"]) for record in page if record.get("topic"))
+
+
+def import_topics(source: Union[str, BinaryIO], agent: LinkedInPostAgent, queue: JobQueue,
+                  backend: StateBackend, user: str, defaults: Dict[str, str], fmt: Optional[str] = None,
+                  run_at: Optional[float] = None, priority: int = PRIORITY_LOW, chunk_size: int = 500,
+                  dry_run: bool = False) -> ImportReport:
+    """Stream a topic file into the job queue, skipping invalid rows and topics seen before
+
+    Only one chunk of payloads is held at a time. Topics are deduplicated against the
+    user's history, their queued/running/done jobs, and earlier rows of the same file.
+    """
+    if isinstance(source, str):
+        with open(source, "rb") as stream:
+            return import_topics(stream, agent, queue, backend, user, defaults, fmt or _format_of(source),
+                                 run_at, priority, chunk_size, dry_run)
+    fmt = fmt or _format_of(getattr(source, "name", ""))
+
+    report = ImportReport()
+    # 32-char keys only, so even a 10k-row file costs well under a megabyte here
+    seen = history_topic_keys(backend, user)
+    chunk: List[Tuple[int, Dict[str, Any], str]] = []
+
+    def flush():
+        queued_before = queue.existing_keys(user, [key for _, _, key in chunk])
+        fresh = []
+        for line, payload, key in chunk:
+            if key in queued_before:
+                report.duplicates += 1
+                report.add_issue(line, payload["topic"], "already queued")
+            else:
+                fresh.append((payload, key))
+        if fresh and not dry_run:
+            queue.enqueue_many(fresh, user=user, run_at=run_at, priority=priority)
+        report.queued += len(fresh)
+        chunk.clear()
+
+    def unreadable(line: int, message: str):
+        report.rows += 1
+        report.invalid += 1
+        report.add_issue(line, "", message)
+
+    for line, row in read_rows(source, fmt, on_error=unreadable):
+        report.rows += 1
+        try:
+            payload = validate_row(agent, row, defaults)
+        except (ValueError, KeyError) as e:
+            report.invalid += 1
+            report.add_issue(line, row.get("topic", ""), str(e))
+            continue
+
+        key = topic_key(payload["topic"])
+        if key in seen:
+            report.duplicates += 1
+            report.add_issue(line, payload["topic"], "duplicate topic")
+            continue
+        seen.add(key)
+        chunk.append((line, payload, key))
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    return report
+
+
+def main():
+    """Queue every topic in a CSV/JSONL/XLSX file for background generation"""
+    parser = argparse.ArgumentParser(description="Import LinkedIn post topics into the job queue")
+    parser.add_argument("path")
+    parser.add_argument("--user", required=True, help="Whose history and queue the topics go to")
+    parser.add_argument("--tenant", default=DEFAULT_TENANT, help="Whose quota the generations count against")
+    parser.add_argument("--audience", default="General Professionals")
+    parser.add_argument("--template", default="Quick Tips List")
+    parser.add_argument("--tone", default="Professional")
+    parser.add_argument("--length", default="Medium")
+    parser.add_argument("--dry-run", action="store_true", help="Validate and dedup without queueing")
+    args = parser.parse_args()
+
+    defaults = {"audience": args.audience, "template": args.template, "tone": args.tone, "length": args.length,
+                "tenant": args.tenant}
+    report = import_topics(args.path, LinkedInPostAgent(), JobQueue(os.getenv("STATE_DB_PATH", DEFAULT_DB_PATH)),
+                           get_backend(), args.user, defaults, dry_run=args.dry_run)
+    print(f"{report.rows} rows: {report.queued} queued, {report.duplicates} duplicates, {report.invalid} invalid")
+    for issue in report.issues:
+        print(f"  line {issue.line}: {issue.message} ({issue.topic[:60]})")
+
+
+if __name__ == "__main__":
+    main()
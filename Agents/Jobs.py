@@ -0,0 +1,327 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from Agents.SharedState import DEFAULT_DB_PATH
+
+
+# Higher runs first; interactive work never goes through the queue
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 5
+PRIORITY_HIGH = 10
+
+STATUSES = ("queued", "running", "done", "dead", "cancelled")
+
+# Jobs in these states still count when deduplicating new work; failed and cancelled ones don't
+ACTIVE_STATUSES = ("queued", "running", "done")
+
+
+class Deferred(Exception):
+    """Raised by a handler to put its job back until `run_at` without using up an attempt"""
+
+    def __init__(self, run_at: float, reason: str = ""):
+        super().__init__(reason)
+        self.run_at = run_at
+
+
+@dataclass
+class Job:
+    """A queued generation request"""
+    id: int
+    user: str
+    status: str
+    priority: int
+    run_at: float
+    attempts: int
+    max_attempts: int
+    payload: Dict[str, Any]
+    result: Optional[str]
+    error: Optional[str]
+    created_at: float
+    updated_at: float
+    lease_until: Optional[float] = None  # set while running; proves which claim a worker holds
+
+
+class JobQueue:
+    """Persistent SQLite job queue with scheduling, priorities, retries and dead-lettering"""
+
+    COLUMNS = ("id, user, status, priority, run_at, attempts, max_attempts, payload, result, error, created_at, "
+               "updated_at, lease_until")
+
+    def __init__(self, path: str = DEFAULT_DB_PATH, lease_s: float = 300.0, backoff_s: float = 30.0):
+        self.path = path
+        self.lease_s = lease_s
+        self.backoff_s = backoff_s
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user TEXT NOT NULL,
+                status TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                run_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                lease_until REAL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority DESC, run_at, id);
+            CREATE INDEX IF NOT EXISTS jobs_user ON jobs (user, id);
+        """)
+        columns = {row[1] for row in self._conn().execute("PRAGMA table_info(jobs)")}
+        if "dedup_key" not in columns:
+            # Added after the first release; older queue files are upgraded in place
+            self._conn().execute("ALTER TABLE jobs ADD COLUMN dedup_key TEXT")
+        self._conn().execute("CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs (user, dedup_key)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row_to_job(row: Tuple) -> Job:
+        values = list(row)
+        values[7] = json.loads(values[7])
+        return Job(*values)
+
+    def enqueue(self, payload: Dict[str, Any], user: str = "", run_at: Optional[float] = None,
+                priority: int = PRIORITY_NORMAL, max_attempts: int = 3, dedup_key: Optional[str] = None) -> int:
+        now = time.time()
+        cursor = self._conn().execute(
+            "INSERT INTO jobs (user, status, priority, run_at, max_attempts, payload, dedup_key, created_at, updated_at) "
+            "VALUES (?, 'queued', ?, ?, ?, ?, ?, ?, ?)",
+            (user, priority, run_at or now, max_attempts, json.dumps(payload), dedup_key, now, now)
+        )
+        return cursor.lastrowid
+
+    def enqueue_many(self, jobs: Iterable[Tuple[Dict[str, Any], Optional[str]]], user: str = "",
+                     run_at: Optional[float] = None, priority: int = PRIORITY_NORMAL, max_attempts: int = 3) -> int:
+        """Insert (payload, dedup_key) pairs in one transaction; returns how many were queued"""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.executemany(
+                "INSERT INTO jobs (user, status, priority, run_at, max_attempts, payload, dedup_key, created_at, updated_at) "
+                "VALUES (?, 'queued', ?, ?, ?, ?, ?, ?, ?)",
+                ((user, priority, run_at or now, max_attempts, json.dumps(payload), dedup_key, now, now)
+                 for payload, dedup_key in jobs)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount
+
+    def existing_keys(self, user: str, keys: List[str]) -> Set[str]:
+        """Which of `keys` already belong to a queued, running or finished job of this user"""
+        found: Set[str] = set()
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            rows = self._conn().execute(
+                f"SELECT DISTINCT dedup_key FROM jobs WHERE user = ? AND dedup_key IN ({', '.join('?' * len(batch))}) "
+                f"AND status IN ({', '.join('?' * len(ACTIVE_STATUSES))})",
+                (user, *batch, *ACTIVE_STATUSES)
+            ).fetchall()
+            found.update(row[0] for row in rows)
+        return found
+
+    def claim(self, now: Optional[float] = None) -> Optional[Job]:
+        """Atomically lease the next due job, reclaiming any whose worker died"""
+        now = time.time() if now is None else now
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', lease_until = NULL, updated_at = ? "
+                "WHERE status = 'running' AND lease_until < ?",
+                (now, now)
+            )
+            row = conn.execute(
+                f"SELECT {self.COLUMNS} FROM jobs WHERE status = 'queued' AND run_at <= ? "
+                "ORDER BY priority DESC, run_at, id LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_until = ?, updated_at = ? "
+                "WHERE id = ?",
+                (now + self.lease_s, now, row[0])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        job = self._row_to_job(row)
+        job.status = "running"
+        job.attempts += 1
+        job.lease_until = now + self.lease_s
+        return job
+
+    # complete, fail and defer only apply while the caller's lease is the current one: a worker
+    # whose lease expired must not overwrite the result of whoever reclaimed the job
+
+    def complete(self, job_id: int, result: str, lease_until: float) -> bool:
+        """Mark done; False if the lease was lost and the job belongs to another worker now"""
+        cursor = self._conn().execute(
+            "UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_until = NULL, updated_at = ? "
+            "WHERE id = ? AND status = 'running' AND lease_until = ?",
+            (result, time.time(), job_id, lease_until)
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: int, error: str, lease_until: float) -> bool:
+        """Retry with exponential backoff, or dead-letter once attempts run out"""
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND status = 'running' AND lease_until = ?",
+            (job_id, lease_until)
+        ).fetchone()
+        if row is None:
+            return False
+        attempts, max_attempts = row
+        if attempts >= max_attempts:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'dead', error = ?, lease_until = NULL, updated_at = ? "
+                "WHERE id = ? AND status = 'running' AND lease_until = ?",
+                (error, now, job_id, lease_until)
+            )
+        else:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'queued', error = ?, run_at = ?, lease_until = NULL, updated_at = ? "
+                "WHERE id = ? AND status = 'running' AND lease_until = ?",
+                (error, now + self.backoff_s * 2 ** (attempts - 1), now, job_id, lease_until)
+            )
+        return cursor.rowcount == 1
+
+    def defer(self, job_id: int, run_at: float, lease_until: float, reason: str = "") -> bool:
+        """Requeue a claimed job for later; the attempt it was claimed with doesn't count"""
+        cursor = self._conn().execute(
+            "UPDATE jobs SET status = 'queued', attempts = MAX(attempts - 1, 0), run_at = ?, error = ?, "
+            "lease_until = NULL, updated_at = ? WHERE id = ? AND status = 'running' AND lease_until = ?",
+            (run_at, reason or None, time.time(), job_id, lease_until)
+        )
+        return cursor.rowcount == 1
+
+    def retry(self, job_id: int):
+        """Put a dead-lettered (or cancelled) job back in the queue with fresh attempts"""
+        now = time.time()
+        self._conn().execute(
+            "UPDATE jobs SET status = 'queued', attempts = 0, run_at = ?, updated_at = ? "
+            "WHERE id = ? AND status IN ('dead', 'cancelled')",
+            (now, now, job_id)
+        )
+
+    def cancel(self, job_id: int):
+        self._conn().execute(
+            "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE id = ? AND status = 'queued'",
+            (time.time(), job_id)
+        )
+
+    def get(self, job_id: int) -> Optional[Job]:
+        row = self._conn().execute(f"SELECT {self.COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def list(self, user: Optional[str] = None, status: Optional[str] = None, limit: int = 50) -> List[Job]:
+        clauses, params = [], []
+        if user is not None:
+            clauses.append("user = ?")
+            params.append(user)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._conn().execute(
+            f"SELECT {self.COLUMNS} FROM jobs {where} ORDER BY id DESC LIMIT ?", (*params, limit)
+        ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def counts(self, user: Optional[str] = None) -> Dict[str, int]:
+        where, params = ("WHERE user = ?", (user,)) if user is not None else ("", ())
+        rows = self._conn().execute(f"SELECT status, COUNT(*) FROM jobs {where} GROUP BY status", params).fetchall()
+        counts = {status: 0 for status in STATUSES}
+        counts.update(dict(rows))
+        return counts
+
+
+class WorkerPool:
+    """Background threads draining a JobQueue, optionally only during off-peak hours"""
+
+    def __init__(self, queue: JobQueue, handler: Callable[[Job], str], workers: int = 2,
+                 poll_s: float = 2.0, active_hours: Optional[Tuple[int, int]] = None):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.poll_s = poll_s
+        self.active_hours = active_hours
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self.processed = 0
+        self.failed = 0
+
+    def in_active_window(self, now: Optional[datetime] = None) -> bool:
+        """True when the pool may run; (22, 6) means 22:00-06:00 local time"""
+        if self.active_hours is None:
+            return True
+        start, end = self.active_hours
+        hour = (now or datetime.now()).hour
+        return start <= hour < end if start <= end else hour >= start or hour < end
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"queue-worker-{i}-{uuid.uuid4().hex[:6]}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def run_once(self) -> bool:
+        """Process one due job; returns False if there was nothing to do"""
+        job = self.queue.claim()
+        if job is None:
+            return False
+        try:
+            result = self.handler(job)
+        except Deferred as e:
+            self.queue.defer(job.id, e.run_at, job.lease_until, str(e))
+        except Exception as e:
+            self.failed += 1
+            self.queue.fail(job.id, str(e), job.lease_until)
+        else:
+            self.processed += 1
+            self.queue.complete(job.id, result, job.lease_until)
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self.in_active_window() or not self.run_once():
+                self._stop.wait(self.poll_s)
@@ -0,0 +1,283 @@
+import argparse
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from Agents.Parser import PostTree, parse_post
+from Agents.Quota import Caller
+from Agents.Scoring import BUZZWORDS
+
+
+# Buzzwords with a plain equivalent that reads right in the same place; the rest need a rewrite.
+# An empty replacement drops the phrase (and the comma after it).
+BUZZWORD_FIXES = {
+    "leveraging": "using", "seamless": "smooth", "seamlessly": "smoothly",
+    "robust": "solid", "empower": "help", "empowering": "helping", "holistic": "complete",
+    "world-class": "excellent", "best-in-class": "top", "unlock": "open up", "unlocking": "opening up",
+    "revolutionize": "transform", "delve": "dig", "elevate": "improve", "game changer": "big shift",
+    "game-changer": "big shift", "in today's fast-paced world": ""
+}
+
+# Tell-tale assistant phrasing; the whole sentence goes
+AI_ISMS = (
+    "i hope this helps", "hope this helps", "as an ai", "as a language model", "i'd be happy to",
+    "here's a linkedin post", "here is a linkedin post", "here's your linkedin post", "feel free to adjust",
+    "feel free to customize", "let that sink in"
+)
+
+MAX_PARAGRAPH_SENTENCES = 2
+MAX_SENTENCE_WORDS = 35
+MAX_HASHTAGS = 5
+
+# How many sections one repair may regenerate
+MAX_REPAIR_SECTIONS = 2
+
+# Flagged on their own here, though the score only counts the longer phrase ("paradigm shift")
+LINT_BUZZWORDS = ("paradigm",)
+
+_PHRASES = re.compile(
+    r"(?<![\w#])(?:" + "|".join(re.escape(phrase) for phrase in sorted(
+        {*BUZZWORDS, *LINT_BUZZWORDS, *AI_ISMS}, key=len, reverse=True
+    )) + r")(?!\w)"
+)
+_MARKDOWN = re.compile(r"\*\*(.+?)\*\*|__(.+?)__")
+# Punctuation only ends a sentence before whitespace, so "3.5x" and "example.com" stay in one piece
+_SENTENCE = re.compile(r"[^\n]*?(?:[.!?]+[\"'”’)]*(?=[ \t\n]|$)|(?=\n)|$)[ \t]*")
+_SENTENCE_BREAK = re.compile(r"[.!?]+[\"'”’)]*[ \t]+|\n[ \t]*")
+_SENTENCE_END = re.compile(r"[.!?:]+[\"'”’)]*(?:[ \t]+|(?=\n)|$)|(?=\n)|$")
+_TRAILING_PUNCT = re.compile(r"[ \t]*[,;:]?[ \t]*")
+_BLANK_RUNS = re.compile(r"\n[ \t]*\n(?:[ \t]*\n)+")
+_LEADING_SPACES = re.compile(r"[ \t]{2,}")
+_HASHTAG = re.compile(r"(?<![\w#])#(\w+)")
+
+
+@dataclass(frozen=True)
+class LintIssue:
+    """One rule violation at [start, end) of the post"""
+    rule: str
+    message: str
+    start: int
+    end: int
+    fixable: bool
+
+
+@dataclass
+class LintResult:
+    text: str
+    fixed: List[LintIssue] = field(default_factory=list)
+    remaining: List[LintIssue] = field(default_factory=list)
+    repaired: Tuple[str, ...] = ()
+
+
+def _lowered(post: str) -> str:
+    """Lower-case with offsets kept (a few characters lower-case to two)"""
+    lowered = post.lower()
+    if len(lowered) == len(post):
+        return lowered
+    return "".join(char if len(char.lower()) != 1 else char.lower() for char in post)
+
+
+def _sentences(text: str, start: int, end: int) -> List[Tuple[int, int]]:
+    return [match.span() for match in _SENTENCE.finditer(text, start, end) if text[match.start():match.end()].strip()]
+
+
+def lint_post(post: str) -> List[LintIssue]:
+    """Every rule violation in the post, in document order"""
+    tree = parse_post(post)
+    issues = []
+
+    for match in _PHRASES.finditer(_lowered(post)):
+        phrase = match.group()
+        if phrase in AI_ISMS:
+            issues.append(LintIssue("ai-ism", f"Remove \"{post[match.start():match.end()]}\"",
+                                    match.start(), match.end(), True))
+        else:
+            issues.append(LintIssue("buzzword", f"Replace the buzzword \"{post[match.start():match.end()]}\"",
+                                    match.start(), match.end(), phrase in BUZZWORD_FIXES))
+
+    for match in _MARKDOWN.finditer(post):
+        issues.append(LintIssue("markdown", "LinkedIn shows ** and __ literally", match.start(), match.end(), True))
+
+    tag_boundary = tree.content_end
+    for match in _HASHTAG.finditer(post, 0, tag_boundary):
+        issues.append(LintIssue("body-hashtag", f"Move {match.group()} to the hashtag line",
+                                match.start(), match.end(), True))
+    if len(tree.tags) > MAX_HASHTAGS:
+        issues.append(LintIssue("too-many-hashtags", f"Keep it to {MAX_HASHTAGS} hashtags",
+                                tree.hashtags.start, tree.hashtags.end, True))
+
+    for span in tree.blocks():
+        if span == tree.hashtags:
+            continue
+        sentences = _sentences(post, span.start, span.end)
+        single_line = "\n" not in post[span.start:span.end]
+        if len(sentences) > MAX_PARAGRAPH_SENTENCES:
+            issues.append(LintIssue("long-paragraph", f"Paragraph has {len(sentences)} sentences; keep it to 1–2",
+                                    span.start, span.end, single_line))
+        for start, end in sentences:
+            words = len(post[start:end].split())
+            if words > MAX_SENTENCE_WORDS:
+                issues.append(LintIssue("long-sentence", f"Sentence has {words} words; split or tighten it",
+                                        start, end, False))
+
+    issues.sort(key=lambda issue: (issue.start, issue.end))
+    return issues
+
+
+def _apply(text: str, edits: List[Tuple[int, int, str]]) -> str:
+    """Apply non-overlapping (start, end, replacement) edits; overlaps keep the first"""
+    parts, pos = [], 0
+    for start, end, replacement in sorted(edits):
+        if start < pos:
+            continue
+        parts.append(text[pos:start])
+        parts.append(replacement)
+        pos = end
+    parts.append(text[pos:])
+    return "".join(parts)
+
+
+def _at_sentence_start(text: str, pos: int) -> bool:
+    before = text[:pos].rstrip(" \t")
+    return not before or before[-1] in ".!?\n"
+
+
+def _phrase_edits(post: str, issues: List[LintIssue]) -> List[Tuple[int, int, str]]:
+    edits = []
+    for issue in issues:
+        if issue.rule == "ai-ism":
+            # Drop the sentence around it
+            start = max((match.end() for match in _SENTENCE_BREAK.finditer(post, 0, issue.start)), default=0)
+            end = _SENTENCE_END.search(post, issue.end).end()
+            edits.append((start, end, ""))
+        elif issue.rule == "buzzword" and issue.fixable:
+            original = post[issue.start:issue.end]
+            replacement = BUZZWORD_FIXES[original.lower()]
+            if replacement:
+                if _at_sentence_start(post, issue.start):
+                    replacement = replacement[:1].upper() + replacement[1:]
+                edits.append((issue.start, issue.end, replacement))
+                continue
+            end = _TRAILING_PUNCT.match(post, issue.end).end()
+            if _at_sentence_start(post, issue.start) and end < len(post):
+                # Re-capitalize what now opens the sentence
+                edits.append((issue.start, end + 1, post[end].upper()))
+            else:
+                edits.append((issue.start, end, ""))
+        elif issue.rule == "markdown":
+            match = _MARKDOWN.match(post, issue.start)
+            edits.append((issue.start, issue.end, match.group(1) or match.group(2)))
+    return edits
+
+
+def _fix_hashtags(post: str) -> str:
+    """Inline hashtags become plain words; the tags join the closing hashtag line"""
+    tree = parse_post(post)
+    body_tags = [match for match in _HASHTAG.finditer(post, 0, tree.content_end)]
+    if not body_tags and len(tree.tags) <= MAX_HASHTAGS:
+        return post
+
+    content = _apply(post[:tree.content_end], [(match.start(), match.start() + 1, "") for match in body_tags])
+    tags, seen = [], set()
+    for tag in [*tree.tags, *(match.group() for match in body_tags)]:
+        if tag.lower() not in seen:
+            seen.add(tag.lower())
+            tags.append(tag)
+    return f"{content.rstrip()}\n\n{' '.join(tags[:MAX_HASHTAGS])}"
+
+
+def _split_paragraphs(post: str) -> str:
+    """Regroup long single-line paragraphs into paragraphs of at most two sentences"""
+    tree = parse_post(post)
+    edits = []
+    for span in tree.blocks():
+        if span == tree.hashtags or "\n" in post[span.start:span.end]:
+            continue
+        sentences = _sentences(post, span.start, span.end)
+        if len(sentences) <= MAX_PARAGRAPH_SENTENCES:
+            continue
+        groups = [sentences[i:i + MAX_PARAGRAPH_SENTENCES] for i in range(0, len(sentences), MAX_PARAGRAPH_SENTENCES)]
+        edits.append((span.start, span.end, "\n\n".join(
+            post[group[0][0]:group[-1][1]].strip() for group in groups
+        )))
+    return _apply(post, edits)
+
+
+def _tidy(post: str) -> str:
+    lines = [_LEADING_SPACES.sub(" ", line).rstrip() for line in post.split("\n")]
+    return _BLANK_RUNS.sub("\n\n", "\n".join(lines)).strip()
+
+
+def fix_post(post: str) -> LintResult:
+    """Apply every deterministic fix; what's left needs a rewrite"""
+    issues = lint_post(post)
+    fixed = [issue for issue in issues if issue.fixable]
+    if not fixed:
+        return LintResult(post, [], issues)
+
+    text = _apply(post, _phrase_edits(post, fixed))
+    text = _split_paragraphs(_fix_hashtags(_tidy(text)))
+    text = _tidy(text)
+    return LintResult(text, fixed, lint_post(text))
+
+
+def section_of(tree: PostTree, issue: LintIssue) -> str:
+    """Which editor section an issue falls in"""
+    for name, span in (("hook", tree.hook), ("cta", tree.cta), ("hashtags", tree.hashtags)):
+        if span and span.start <= issue.start < span.end:
+            return name
+    return "body"
+
+
+def repair_post(agent, post: str, topic: str, audience: str, tone: str = "Professional",
+                caller: Optional[Caller] = None) -> LintResult:
+    """Fix what the rules can, then regenerate only the sections still in violation
+
+    Each regenerated section gets the specific problems as instructions, so one small
+    section call replaces a full regeneration.
+    """
+    first = fix_post(post)
+    if not first.remaining:
+        return first
+
+    tree = parse_post(first.text)
+    problems: Dict[str, List[str]] = {}
+    for issue in first.remaining:
+        problems.setdefault(section_of(tree, issue), []).append(issue.message)
+
+    text, repaired = first.text, []
+    for section, messages in list(problems.items())[:MAX_REPAIR_SECTIONS]:
+        text = agent.regenerate_section(text, section, topic, audience, tone, caller=caller,
+                                        instructions="Fix these problems: " + "; ".join(dict.fromkeys(messages)))
+        repaired.append(section)
+
+    final = fix_post(text)
+    return LintResult(final.text, first.fixed + final.fixed, final.remaining, tuple(repaired))
+
+
+def main():
+    """Lint a post from a file (or stdin)"""
+    parser = argparse.ArgumentParser(description="Check a LinkedIn post against the writing rules")
+    parser.add_argument("path", nargs="?", help="Post text file; stdin if omitted")
+    parser.add_argument("--fix", action="store_true", help="Print the post with deterministic fixes applied")
+    args = parser.parse_args()
+
+    if args.path:
+        with open(args.path, encoding="utf-8") as f:
+            post = f.read()
+    else:
+        post = sys.stdin.read()
+
+    result = fix_post(post) if args.fix else LintResult(post, [], lint_post(post))
+    for issue in result.fixed:
+        print(f"fixed    {issue.rule:<18} {issue.message}")
+    for issue in result.remaining:
+        print(f"{'fixable' if issue.fixable else 'rewrite':<8} {issue.rule:<18} {issue.message}")
+    if args.fix:
+        print()
+        print(result.text)
+
+
+if __name__ == "__main__":
+    main()
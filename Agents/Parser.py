@@ -0,0 +1,191 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+
+# Precompiled once; line patterns are anchored with match(pos, endpos), so no ^
+_WORD = re.compile(r"\S+")
+_HASHTAG = re.compile(r"(?<![\w#])#(\w+)")
+_HASHTAG_LINE = re.compile(r"\s*(?:#\w+[\s,]*)+$")
+_LIST_ITEM = re.compile(
+    r"\s*(?:[-*•▪►→✅✔️]|\d{1,2}[.)]|[\U0001F300-\U0001FAFF☀-➿]️?)\s+\S"
+)
+_CTA = re.compile(
+    r"\?\s*$|what do you think|comment below|share your (?:thoughts|experience)|let me know|"
+    r"drop (?:a|your)|tell me|agree or disagree|follow (?:me )?for|dm me|repost if|"
+    r"how do you|what's your|what would you",
+    re.IGNORECASE
+)
+
+MAX_HOOK_LINES = 2
+MAX_CTA_LINES = 3
+
+
+@dataclass(frozen=True)
+class Span:
+    """A [start, end) slice of the source post"""
+    start: int
+    end: int
+
+    def text(self, source: str) -> str:
+        return source[self.start:self.end]
+
+
+@dataclass(frozen=True)
+class PostTree:
+    """Compact parse tree of a post; all nodes are offsets into `source`"""
+    source: str
+    hook: Optional[Span]
+    paragraphs: Tuple[Span, ...]
+    list_items: Tuple[Span, ...]
+    cta: Optional[Span]
+    hashtags: Optional[Span]
+    tags: Tuple[str, ...]
+    body_tags: Tuple[str, ...]
+
+    def text(self, span: Optional[Span]) -> str:
+        return span.text(self.source) if span else ""
+
+    @property
+    def body(self) -> Optional[Span]:
+        """Everything between the hook and the CTA/hashtags"""
+        start = self.hook.end if self.hook else 0
+        end = (self.cta or self.hashtags or Span(len(self.source), len(self.source))).start
+        return Span(start, end) if self.source[start:end].strip() else None
+
+    @property
+    def content_end(self) -> int:
+        """Offset where the trailing hashtag block starts (or end of post)"""
+        return self.hashtags.start if self.hashtags else len(self.source)
+
+    def content(self) -> str:
+        """Post text without the trailing hashtag block"""
+        return self.source[:self.content_end].strip()
+
+    def sections(self) -> Dict[str, str]:
+        """hook/body/cta/hashtags/full mapping used by the section editor"""
+        return {
+            "hook": self.text(self.hook).strip(),
+            "body": self.text(self.body).strip(),
+            "cta": self.text(self.cta).strip(),
+            "hashtags": self.text(self.hashtags).strip(),
+            "full": self.source
+        }
+
+    def blocks(self) -> List[Span]:
+        """Hook, paragraphs, CTA and hashtag block in document order"""
+        spans = [self.hook, *self.paragraphs, self.cta, self.hashtags]
+        return sorted((span for span in spans if span), key=lambda span: span.start)
+
+    def word_count(self) -> int:
+        """Words outside the trailing hashtag block"""
+        return len(self.source[:self.content_end].split())
+
+
+def _scan_blocks(post: str) -> List[List[Tuple[int, int]]]:
+    """Single pass over the post, grouping non-blank lines into blank-line separated blocks"""
+    blocks: List[List[Tuple[int, int]]] = []
+    current: List[Tuple[int, int]] = []
+    pos, length = 0, len(post)
+
+    while pos <= length:
+        end = post.find("\n", pos)
+        if end == -1:
+            end = length
+        if post[pos:end].strip():
+            current.append((pos, end))
+        elif current:
+            blocks.append(current)
+            current = []
+        pos = end + 1
+
+    if current:
+        blocks.append(current)
+    return blocks
+
+
+def _parse(post: str) -> PostTree:
+    blocks = _scan_blocks(post)
+
+    # Trailing hashtag block: hashtag-only lines at the very end
+    hashtags = None
+    if blocks:
+        last = blocks[-1]
+        first_tag_line = len(last)
+        while first_tag_line > 0 and _HASHTAG_LINE.match(post, last[first_tag_line - 1][0], last[first_tag_line - 1][1]):
+            first_tag_line -= 1
+        if first_tag_line < len(last):
+            hashtags = Span(last[first_tag_line][0], last[-1][1])
+            if first_tag_line == 0:
+                blocks.pop()
+            else:
+                blocks[-1] = last[:first_tag_line]
+
+    # Hook: the opening block when it is short, otherwise just its first line
+    hook = None
+    if blocks:
+        first = blocks[0]
+        hook_lines = first if len(first) <= MAX_HOOK_LINES else first[:1]
+        hook = Span(hook_lines[0][0], hook_lines[-1][1])
+        if len(hook_lines) == len(first):
+            blocks = blocks[1:]
+        else:
+            blocks = [first[len(hook_lines):]] + blocks[1:]
+
+    # CTA: only the closing block can be a CTA, and only if it reads like one
+    cta = None
+    if blocks:
+        last = blocks[-1]
+        if len(last) <= MAX_CTA_LINES and _CTA.search(post, last[-1][0], last[-1][1]):
+            cta = Span(last[0][0], last[-1][1])
+            blocks = blocks[:-1]
+        elif _CTA.search(post, last[-1][0], last[-1][1]):
+            cta = Span(last[-1][0], last[-1][1])
+            blocks = blocks[:-1] + [last[:-1]]
+
+    paragraphs = tuple(Span(block[0][0], block[-1][1]) for block in blocks if block)
+    list_items = tuple(
+        Span(start, end)
+        for block in blocks for start, end in block
+        if _LIST_ITEM.match(post, start, end)
+    )
+
+    tag_boundary = hashtags.start if hashtags else len(post)
+    tags, body_tags = [], []
+    for match in _HASHTAG.finditer(post):
+        (tags if match.start() >= tag_boundary else body_tags).append(match.group(0))
+
+    return PostTree(
+        source=post,
+        hook=hook,
+        paragraphs=paragraphs,
+        list_items=list_items,
+        cta=cta,
+        hashtags=hashtags,
+        tags=tuple(tags),
+        body_tags=tuple(body_tags)
+    )
+
+
+@lru_cache(maxsize=512)
+def parse_post(post: str) -> PostTree:
+    """Parse a post once; the editor, analytics, trimming and preview share the result"""
+    return _parse(post)
+
+
+def trim_post(post: str, word_limit: int) -> str:
+    """Cut the content to `word_limit` words, keeping line breaks and the hashtag block"""
+    tree = parse_post(post)
+    content_end = tree.content_end
+
+    cut = content_end
+    for count, match in enumerate(_WORD.finditer(post, 0, content_end), start=1):
+        if count == word_limit:
+            cut = match.end()
+            break
+
+    trimmed = post[:cut].strip()
+    if tree.hashtags:
+        return f"{trimmed}\n\n{tree.text(tree.hashtags).strip()}"
+    return trimmed
@@ -0,0 +1,362 @@
+import os
+import time
+from typing import Dict, Optional
+from langchain_core.prompts import PromptTemplate
+from dotenv import load_dotenv
+from Agents import Sections
+from Agents.Router import CircuitBreaker, ModelProfile, ModelRouter, UpstreamUnavailable, factory_from_env
+from Agents.Hedging import HedgedInvoker
+from Agents.Quota import Caller, FairScheduler, QuotaExceeded, UsageMeter, prompt_tokens, usage_tokens
+from Agents.Parser import parse_post, trim_post
+from Agents.Lint import fix_post
+from Agents.Experiments import Experiment
+
+load_dotenv()
+
+# Fast model for short posts, heavier one for long-form; the router fails over on latency/errors
+MODEL_PROFILES = [
+    ModelProfile("gemini-2.5-flash-lite", "fast",
+                 temperature=0.7,  # Reduced for better control
+                 max_output_tokens=1500),  # Reduced to prevent overly long outputs
+    ModelProfile("gemini-2.5-flash", "quality", temperature=0.7, max_output_tokens=1500)
+]
+
+
+# Prompt variants for generate_post; "full" is the production prompt, the others are A/B candidates
+FULL_PROMPT = """
+You are a seasoned LinkedIn content creator known for high-engagement, human-sounding posts.
+
+CRITICAL: You MUST strictly follow the word count limit specified below. This is non-negotiable.
+
+CONTEXT & GOAL:
+Write a LinkedIn post that aligns with the user's intent and feels authentic, thoughtful, and platform-native.
+
+USER INSTRUCTIONS:
+{user_instructions}
+
+POST DETAILS:
+- Topic: {topic}
+- Target Audience: {audience}
+- Tone: {tone_guide}
+
+LENGTH REQUIREMENT (STRICTLY ENFORCE):
+{length_desc}
+ABSOLUTE WORD LIMIT: {word_limit}
+You MUST stay within this word count. Count your words as you write. Do NOT exceed this limit under any circumstances.
+
+CONTENT RULES:
+{rules}
+
+STRUCTURE & STYLE GUIDELINES:
+- Open with a strong hook in the first 1–2 lines (bold statement, question, or insight)
+- Use short paragraphs (1–2 sentences max) with frequent line breaks
+- Avoid emojis unless they naturally fit the selected tone
+- Avoid generic phrases, clichés, and obvious AI patterns
+- Use clear, simple language—write like a real LinkedIn creator, not a blog
+- Be concise and punchy - every word must earn its place
+
+ENGAGEMENT OPTIMIZATION:
+- Share a clear insight, lesson, or takeaway
+- Encourage interaction with a thoughtful question or call-to-action
+- Do not over-sell or sound promotional
+
+HASHTAGS & ENDING:
+- End the post with 3–5 relevant, niche-specific hashtags
+- Place hashtags on a new line at the very end
+- Do not include hashtags within the main content
+
+FINAL CHECK BEFORE SUBMITTING:
+1. Count the total words (excluding hashtags)
+2. Ensure you are UNDER the {word_limit} word limit
+3. The post should feel human, credible, and experience-driven
+4. Prioritize clarity, relatability, and skimmability
+5. If you're over the limit, cut content aggressively - quality over quantity
+
+Write the LinkedIn post now. Remember: STAY UNDER {word_limit} WORDS.
+"""
+
+# The shorter prompt from Agents/Generator.py, with the length and tone lines it lacks
+COMPACT_PROMPT = """
+You are an expert LinkedIn content creator known for viral, engaging posts.
+
+USER'S PROMPT/INSTRUCTIONS:
+{user_instructions}
+
+TOPIC: {topic}
+
+TARGET AUDIENCE: {audience}
+
+TONE: {tone_guide}
+
+LENGTH: {length_desc} Stay under {word_limit} words.
+
+{rules}
+
+IMPORTANT FORMATTING:
+- Start with a strong hook (first 1-2 lines)
+- Use line breaks every 2-3 sentences
+- Add emojis sparingly if they fit naturally
+- End with a clear call-to-action (question, invitation to comment, etc.)
+- Include 3-5 relevant hashtags at the end
+
+Generate a complete LinkedIn post that follows these guidelines and sounds authentically human.
+"""
+
+TERSE_PROMPT = """
+Write a LinkedIn post for {audience} about: {topic}
+Instructions: {user_instructions}
+Tone: {tone_guide}
+Under {word_limit} words. Hook in the first line, 1–2 sentence paragraphs, no buzzwords,
+a question or call-to-action at the end, then 3–5 hashtags on their own last line and none elsewhere.
+"""
+
+PROMPT_VARIANTS = {"full": FULL_PROMPT, "compact": COMPACT_PROMPT, "terse": TERSE_PROMPT}
+
+
+class LinkedInPostAgent:
+    """Agent for generating LinkedIn posts"""
+
+    def __init__(self, api_key: Optional[str] = None, router: Optional[ModelRouter] = None,
+                 meter: Optional[UsageMeter] = None):
+        if api_key:
+            os.environ["GOOGLE_API_KEY"] = api_key
+
+        self.router = router or ModelRouter(
+            MODEL_PROFILES,
+            factory=factory_from_env(),
+            hedger=HedgedInvoker(attempt_timeout_s=float(os.getenv("HEDGE_ATTEMPT_TIMEOUT_S", "30")))
+            if os.getenv("HEDGE_REQUESTS") == "1" else None,
+            scheduler=FairScheduler(slots=int(os.getenv("LLM_CONCURRENCY", "4"))),
+            meter=meter,
+            breaker=CircuitBreaker.from_env()
+        )
+        self.llm = self.router
+
+        self.prompt_templates = self._load_prompt_templates()
+        self.audiences = self._load_audiences()
+        self.tones = self._load_tones()
+        self.lengths = self._load_lengths()
+        self.default_tone = "Professional"
+        self.default_length = "Medium"
+        self.experiment = Experiment.from_env()
+        if self.experiment:
+            unknown = set(self.experiment.variants) - set(PROMPT_VARIANTS)
+            if unknown:
+                raise ValueError(f"Unknown prompt variants: {', '.join(sorted(unknown))}")
+
+    def _load_prompt_templates(self) -> Dict[str, str]:
+        return {
+            "Personal Story": (
+                "Write a LinkedIn post sharing a personal or experiential story related to {topic}. "
+                "Start with a relatable moment or challenge. "
+                "Build the narrative with specific details. "
+                "Highlight growth or learning. "
+                "End with a takeaway or reflective question."
+            ),
+            "Quick Tips List": (
+                "Write a LinkedIn post offering actionable tips about {topic}. "
+                "Open with a bold hook. "
+                "List 3–5 concise tips. "
+                "End with a question."
+            ),
+            "Controversial Opinion": (
+                "Challenge common beliefs about {topic}. "
+                "Open with a respectful hot take. "
+                "Explain your reasoning. "
+                "End with a discussion-driving question."
+            ),
+            "Behind-the-Scenes": (
+                "Reveal behind-the-scenes insights about {topic}. "
+                "Explain processes and trade-offs. "
+                "Share why it matters."
+            ),
+            "Trend Analysis": (
+                "Analyze a trend related to {topic}. "
+                "Explain what's changing, why it matters, and what to do next."
+            ),
+            "Motivational Message": (
+                "Write an uplifting post about {topic}. "
+                "Acknowledge a challenge. "
+                "Shift to growth and encouragement."
+            ),
+            "Lesson Learned": (
+                "Share a clear lesson learned about {topic}. "
+                "Explain briefly how it was learned. "
+                "End with a reflective question."
+            ),
+            "Myth vs Reality": (
+                "Debunk a common myth about {topic}. "
+                "Contrast myth vs reality clearly."
+            ),
+            "How-To / Framework": (
+                "Explain how to approach {topic} using a simple framework."
+            )
+        }
+
+    def _load_audiences(self) -> Dict[str, str]:
+        return {
+            "Startup Founders": "Entrepreneurs building or scaling startups",
+            "Marketing Professionals": "Marketers focused on growth and branding",
+            "Software Developers": "Engineers focused on tech and career growth",
+            "AI / ML / GenAI Professionals": (
+                "Professionals working with AI, ML, GenAI, and LLM systems"
+            ),
+            "Data Analysts & Data Scientists": (
+                "Professionals focused on analytics, insights, and data-driven decisions"
+            ),
+            "Sales Professionals": "Sales professionals focused on revenue",
+            "Job Seekers": "Professionals exploring new roles",
+            "Business Leaders": "Managers and executives",
+            "Freelancers": "Independent professionals building a brand",
+            "Students & Early Career": "Students and early professionals",
+            "Creators & Builders": "Content creators and builders",
+            "General Professionals": "Broad professional audience"
+        }
+
+    def _load_tones(self) -> Dict[str, str]:
+        return {
+            "Professional": (
+                "Formal, polished, and business-appropriate. "
+                "Clear and confident language with a respectful, authoritative voice."
+            ),
+            "Casual": (
+                "Relaxed and conversational. "
+                "Friendly, natural, and approachable—like talking to a colleague over coffee."
+            ),
+            "Conversational": (
+                "Personal and engaging. "
+                "Uses simple language, short sentences, and direct questions to involve the reader."
+            ),
+            "Controversial": (
+                "Bold and thought-provoking while remaining respectful. "
+                "Challenges conventional wisdom and invites discussion without being offensive."
+            ),
+            "Empathetic": (
+                "Warm, supportive, and emotionally intelligent. "
+                "Acknowledges challenges, validates experiences, and builds human connection."
+            ),
+            "Educational": (
+                "Informative and insight-driven. "
+                "Explains concepts clearly, shares practical examples, and focuses on learning value."
+            ),
+            "Inspirational": (
+                "Motivational and uplifting. "
+                "Encourages growth, confidence, and action through positive messaging."
+            ),
+            "Storytelling": (
+                "Narrative-driven and relatable. "
+                "Uses real-life experiences, lessons, and reflections to deliver a message."
+            ),
+            "Direct": (
+                "Clear, concise, and to the point. "
+                "Minimal fluff, strong statements, and actionable takeaways."
+            )
+        }
+
+    def _load_lengths(self) -> Dict[str, Dict]:
+        return {
+            "Short": {
+                "description": "Very concise and skimmable. 1–2 short paragraphs.",
+                "word_count": "50–100 words MAXIMUM",
+                "strict_limit": 100
+            },
+            "Medium": {
+                "description": "Standard LinkedIn post. 3–5 short paragraphs with line breaks.",
+                "word_count": "150–250 words MAXIMUM",
+                "strict_limit": 250
+            },
+            "Long": {
+                "description": "In-depth, value-driven. 6–10 short paragraphs with strong spacing.",
+                "word_count": "300–500 words MAXIMUM",
+                "strict_limit": 500
+            }
+        }
+
+    def _humanization_rules(self) -> str:
+        return """
+AI WRITING RULES (TRANSPARENT & LINKEDIN-NATIVE):
+- Write clearly and professionally.
+- Do not pretend to be a specific human.
+- Keep paragraphs short (1–2 sentences).
+- Avoid buzzwords and clichés.
+- No fake personal experiences.
+- Focus on usefulness and clarity.
+"""
+
+    def generate_post(self, user_instructions: str, topic: str, audience: str, tone: str = "Professional", length: str = "Medium",
+                      caller: Optional[Caller] = None, variant: Optional[str] = None) -> str:
+        tone_instructions = self.tones
+        length_instructions = self.lengths
+
+        length_config = length_instructions.get(length, length_instructions["Medium"])
+        
+        # An explicit variant wins; otherwise a running experiment picks one for this user
+        if variant is None:
+            variant = self.experiment.assign(caller.user if caller else None) if self.experiment else "full"
+        final_prompt = PromptTemplate.from_template(PROMPT_VARIANTS[variant])
+
+        try:
+            prompt_value = final_prompt.invoke({
+                "user_instructions": user_instructions.strip(),
+                "topic": topic.strip(),
+                "audience": audience.strip(),
+                "rules": self._humanization_rules(),
+                "tone_guide": tone_instructions.get(tone, tone_instructions["Professional"]),
+                "length_desc": length_config["description"],
+                "word_limit": length_config["strict_limit"]
+            })
+            started = time.perf_counter()
+            try:
+                result = self.router.invoke(prompt_value, length=length, tone=tone, caller=caller)
+            except Exception:
+                if self.experiment and variant in self.experiment.variants:
+                    self.experiment.record_error(variant)
+                raise
+            latency_s = time.perf_counter() - started
+
+            # Handle different response types
+            if hasattr(result, "content"):
+                content = result.content
+            elif isinstance(result, str):
+                content = result
+            else:
+                content = str(result)
+            
+            if self.experiment and variant in self.experiment.variants:
+                # Constraint hits are judged on the raw output, before the fixes below hide misses
+                raw = parse_post(content)
+                self.experiment.record(
+                    variant, latency_s,
+                    prompt_tokens=prompt_tokens(prompt_value, result),
+                    total_tokens=usage_tokens(prompt_value, result),
+                    word_limit_hit=raw.word_count() <= length_config["strict_limit"],
+                    hashtags_at_end=bool(raw.tags) and not raw.body_tags
+                )
+
+            # Deterministic rule fixes (inline hashtags, stock AI phrases, ...) instead of a regeneration
+            content = fix_post(content.strip()).text
+            
+            # Validate and trim if necessary
+            tree = parse_post(content)
+            if tree.word_count() > length_config["strict_limit"] * 1.2:  # If 20% over limit
+                content = trim_post(content, length_config["strict_limit"])
+            
+            return content
+            
+        except (QuotaExceeded, UpstreamUnavailable):
+            raise
+        except Exception as e:
+            raise Exception(f"Error generating post: {str(e)}")
+
+    def regenerate_section(self, post: str, section: str, topic: str, audience: str, tone: str = "Professional",
+                           caller: Optional[Caller] = None, instructions: str = "") -> str:
+        """Rewrite only one section of the post, keeping the rest frozen"""
+        try:
+            return Sections.regenerate_section(
+                self.router.for_caller(caller) if caller else self.llm, post, section, topic, audience,
+                instructions=f"Tone: {tone}. {instructions}".strip()
+            )
+        except (QuotaExceeded, UpstreamUnavailable):
+            raise
+        except Exception as e:
+            raise Exception(f"Error regenerating {section}: {str(e)}")
@@ -0,0 +1,123 @@
+import hashlib
+import html
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional
+from Agents.Parser import parse_post
+
+
+# LinkedIn cuts the feed view after roughly three lines / ~210 characters
+FOLD_CHARS = 210
+FOLD_LINES = 3
+
+SEE_MORE_LABEL = "…see more"
+
+
+def content_hash(text: str) -> str:
+    """Short, stable hash used as memo and diff key"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=12).hexdigest()
+
+
+class _BlockCache:
+    """Thread-safe LRU of escaped HTML blocks, shared by every renderer"""
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._items: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key: str, text: str, css_class: str) -> str:
+        with self._lock:
+            cached = self._items.get(key)
+            if cached is not None:
+                self._items.move_to_end(key)
+                return cached
+
+        # Newlines become <br> so the block stays a single raw HTML line for markdown
+        rendered = f'<div class="{css_class}">{html.escape(text).replace(chr(10), "<br>")}</div>'
+
+        with self._lock:
+            self._items[key] = rendered
+            if len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+        return rendered
+
+
+_BLOCK_CACHE = _BlockCache()
+
+
+@dataclass
+class PreviewResult:
+    """Rendered preview split into blocks, with a content key per block"""
+    blocks: List[str]
+    keys: List[str]
+    folded: bool
+
+
+@dataclass
+class PreviewRenderer:
+    """Per-session preview renderer; memoizes the last post and every block"""
+    fold_chars: int = FOLD_CHARS
+    fold_lines: int = FOLD_LINES
+    _last_text: Optional[str] = field(default=None, repr=False)
+    _last_result: Optional[PreviewResult] = field(default=None, repr=False)
+
+    def _fold_offset(self, text: str) -> Optional[int]:
+        """Character offset where LinkedIn would show "see more", or None"""
+        line_end = -1
+        for _ in range(self.fold_lines):
+            line_end = text.find("\n", line_end + 1)
+            if line_end == -1:
+                break
+        else:
+            if line_end < len(text.rstrip()):
+                return min(line_end, self.fold_chars)
+
+        if len(text) <= self.fold_chars:
+            return None
+
+        # Back off to a word boundary so the fold never splits a word
+        space = text.rfind(" ", 0, self.fold_chars)
+        return space if space > 0 else self.fold_chars
+
+    def _split_blocks(self, text: str) -> tuple[List[tuple[str, str]], bool]:
+        """Split the post into (text, css_class) blocks around the fold"""
+        tree = parse_post(text)
+        fold_at = self._fold_offset(text)
+        fold_at = len(text) if fold_at is None else fold_at
+
+        blocks = [(text[span.start:min(span.end, fold_at)], "preview-para")
+                  for span in tree.blocks() if span.start < fold_at]
+        hidden = text[fold_at:]
+        if hidden.strip():
+            blocks.append((hidden.lstrip("\n "), "preview-folded"))
+        return blocks, bool(hidden.strip())
+
+    def render(self, text: str) -> PreviewResult:
+        """Render the preview, reusing the last result and any cached blocks"""
+        if text == self._last_text and self._last_result is not None:
+            return self._last_result
+
+        parts, folded = self._split_blocks(text)
+        keys = [content_hash(css_class + ":" + part) for part, css_class in parts]
+        blocks = [_BLOCK_CACHE.get_or_render(key, part, css_class)
+                  for key, (part, css_class) in zip(keys, parts)]
+
+        result = PreviewResult(blocks, keys, folded)
+        self._last_text = text
+        self._last_result = result
+        return result
+
+    def html_blocks(self, result: PreviewResult) -> List[str]:
+        """One HTML snippet per block, with the fold wrapped in a <details> toggle"""
+        if not result.folded:
+            return list(result.blocks)
+        hidden = result.blocks[-1]
+        return result.blocks[:-1] + [
+            f'<details class="preview-fold"><summary>{SEE_MORE_LABEL}</summary>{hidden}</details>'
+        ]
+
+    def to_html(self, result: PreviewResult) -> str:
+        """Whole post body as a single HTML string"""
+        return "".join(self.html_blocks(result))
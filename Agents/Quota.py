@@ -0,0 +1,223 @@
+import argparse
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from Agents.SharedState import StateBackend, get_backend
+
+
+DEFAULT_TENANT = "default"
+
+# Share of LLM slots each kind of work earns while others are waiting
+CLASS_WEIGHTS = {"interactive": 8.0, "speculative": 2.0, "batch": 1.0}
+
+
+@dataclass(frozen=True)
+class Caller:
+    """Who a model call is for, and what kind of work it is"""
+    user: str = "anonymous"
+    tenant: str = DEFAULT_TENANT
+    klass: str = "interactive"
+
+
+class QuotaExceeded(Exception):
+    """A user or tenant has used up its allowance for the current period"""
+
+
+@dataclass
+class QuotaLimits:
+    """Daily allowances; 0 means unlimited"""
+    user_requests: int = 0
+    user_tokens: int = 0
+    tenant_requests: int = 0
+    tenant_tokens: int = 0
+
+    @classmethod
+    def from_env(cls) -> "QuotaLimits":
+        return cls(
+            user_requests=int(os.getenv("USER_DAILY_REQUESTS", "0")),
+            user_tokens=int(os.getenv("USER_DAILY_TOKENS", "0")),
+            tenant_requests=int(os.getenv("TENANT_DAILY_REQUESTS", "0")),
+            tenant_tokens=int(os.getenv("TENANT_DAILY_TOKENS", "0"))
+        )
+
+
+def usage_tokens(input: Any, result: Any) -> int:
+    """Tokens a call used: the model's own count when reported, else ~4 characters per token"""
+    usage = getattr(result, "usage_metadata", None)
+    if usage and usage.get("total_tokens"):
+        return int(usage["total_tokens"])
+    prompt = input.to_string() if hasattr(input, "to_string") else str(input)
+    content = result.content if hasattr(result, "content") else str(result)
+    return max(1, round((len(prompt) + len(content)) / 4))
+
+
+def prompt_tokens(input: Any, result: Any) -> int:
+    """Input tokens of a call, counted the same way as `usage_tokens`"""
+    usage = getattr(result, "usage_metadata", None)
+    if usage and usage.get("input_tokens"):
+        return int(usage["input_tokens"])
+    prompt = input.to_string() if hasattr(input, "to_string") else str(input)
+    return max(1, round(len(prompt) / 4))
+
+
+class UsageMeter:
+    """Per-user and per-tenant request/token accounting, persisted in the shared state backend"""
+
+    def __init__(self, backend: StateBackend, limits: Optional[QuotaLimits] = None):
+        self.backend = backend
+        self.limits = limits or QuotaLimits()
+
+    @staticmethod
+    def period(now: Optional[float] = None) -> str:
+        """Quotas reset at midnight UTC"""
+        return datetime.fromtimestamp(time.time() if now is None else now, tz=timezone.utc).strftime("%Y-%m-%d")
+
+    @staticmethod
+    def period_end(now: Optional[float] = None) -> float:
+        """When the current period's quotas reset"""
+        day = datetime.fromtimestamp(time.time() if now is None else now, tz=timezone.utc)
+        return (day.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)).timestamp()
+
+    @staticmethod
+    def subjects(caller: Caller) -> Tuple[str, str]:
+        return f"user:{caller.user}", f"tenant:{caller.tenant}"
+
+    def reserve(self, caller: Caller):
+        """Count one request against the caller's user and tenant, or raise QuotaExceeded
+
+        Checking and counting are a single atomic step in the backend, so concurrent requests
+        can't all slip past the limit. Tokens are only known afterwards (see `record`), so the
+        token limit stops the first request that starts after it has been reached.
+        """
+        user_subject, tenant_subject = self.subjects(caller)
+        limits = {
+            user_subject: [self.limits.user_requests, self.limits.user_tokens],
+            tenant_subject: [self.limits.tenant_requests, self.limits.tenant_tokens]
+        }
+        exceeded = self.backend.usage_add([user_subject, tenant_subject], self.period(), 1, 0, limits=limits)
+        if exceeded:
+            subject, unit = exceeded
+            whose = "Your" if subject == user_subject else "Your team's"
+            limit = limits[subject][0 if unit == "requests" else 1]
+            raise QuotaExceeded(f"{whose} daily {unit[:-1]} quota ({limit:,}) is used up; it resets at midnight UTC")
+
+    def release(self, caller: Caller):
+        """Give back a reserved request whose call failed"""
+        self.backend.usage_add(list(self.subjects(caller)), self.period(), -1, 0)
+
+    def record(self, caller: Caller, tokens: int, requests: int = 0):
+        """Add the tokens a finished call used; its request was counted by `reserve`"""
+        self.backend.usage_add(list(self.subjects(caller)), self.period(), requests, tokens)
+
+    def usage(self, caller: Caller) -> Dict[str, Dict[str, int]]:
+        user_subject, tenant_subject = self.subjects(caller)
+        usage = self.backend.usage_get([user_subject, tenant_subject], self.period())
+        return {"user": usage[user_subject], "tenant": usage[tenant_subject]}
+
+    def report(self, period: Optional[str] = None, kind: str = "", limit: int = 100) -> List[Dict[str, Any]]:
+        """Heaviest consumers first; `kind` is "user", "tenant" or "" for both"""
+        return self.backend.usage_list(period or self.period(), prefix=f"{kind}:" if kind else "", limit=limit)
+
+
+class FairScheduler:
+    """Weighted fair queueing over a fixed number of concurrent model calls
+
+    Each (tenant, user, class) is a flow. A request's finish tag is its flow's previous
+    finish (or the current virtual time, if later) plus cost / class weight, and the
+    smallest tag goes next. A user with a backlog of batch jobs therefore only delays
+    their own queue; a fresh interactive request lands near the front.
+    """
+
+    def __init__(self, slots: int = 4, weights: Optional[Dict[str, float]] = None):
+        self.slots = slots
+        self.weights = dict(weights or CLASS_WEIGHTS)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiting: List[list] = []  # heap of [finish tag, seq, start tag, class, queued at, event]
+        self._finish: Dict[Tuple[str, str, str], float] = {}
+        self._virtual = 0.0
+        self._seq = itertools.count()
+        self._dispatched = {klass: 0 for klass in self.weights}
+        self._waited_s = {klass: 0.0 for klass in self.weights}
+
+    def _tag_locked(self, caller: Caller, cost: float) -> Tuple[float, float]:
+        flow = (caller.tenant, caller.user, caller.klass)
+        start = max(self._virtual, self._finish.get(flow, 0.0))
+        finish = start + cost / self.weights.get(caller.klass, 1.0)
+        self._finish[flow] = finish
+        if len(self._finish) > 10000:
+            # Flows behind virtual time behave exactly like new ones, so forget them
+            self._finish = {key: tag for key, tag in self._finish.items() if tag > self._virtual}
+        return start, finish
+
+    def _grant_locked(self, klass: str, start: float, waited_s: float):
+        self._virtual = max(self._virtual, start)
+        self._dispatched[klass] = self._dispatched.get(klass, 0) + 1
+        self._waited_s[klass] = self._waited_s.get(klass, 0.0) + waited_s
+
+    def acquire(self, caller: Caller, cost: float = 1.0):
+        with self._lock:
+            start, finish = self._tag_locked(caller, cost)
+            if self._in_flight < self.slots and not self._waiting:
+                self._in_flight += 1
+                self._grant_locked(caller.klass, start, 0.0)
+                return
+            event = threading.Event()
+            heapq.heappush(self._waiting, [finish, next(self._seq), start, caller.klass, time.monotonic(), event])
+        event.wait()
+
+    def release(self):
+        with self._lock:
+            if self._waiting:
+                # Hand the slot straight to the next request, so in-flight stays the same
+                _, _, start, klass, queued_at, event = heapq.heappop(self._waiting)
+                self._grant_locked(klass, start, time.monotonic() - queued_at)
+                event.set()
+            else:
+                self._in_flight -= 1
+
+    @contextmanager
+    def slot(self, caller: Caller, cost: float = 1.0) -> Iterator[None]:
+        self.acquire(caller, cost)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waiting = {klass: 0 for klass in self.weights}
+            for entry in self._waiting:
+                waiting[entry[3]] = waiting.get(entry[3], 0) + 1
+            return {
+                "slots": self.slots,
+                "in_flight": self._in_flight,
+                "waiting": waiting,
+                "dispatched": dict(self._dispatched),
+                "mean_wait_s": {klass: self._waited_s[klass] / count if count else 0.0
+                                for klass, count in self._dispatched.items()}
+            }
+
+
+def main():
+    """Print today's (or a given day's) consumption"""
+    parser = argparse.ArgumentParser(description="LLM usage per tenant and user")
+    parser.add_argument("--period", help="YYYY-MM-DD (UTC); default today")
+    parser.add_argument("--kind", choices=("user", "tenant"), default="")
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    meter = UsageMeter(get_backend(), QuotaLimits.from_env())
+    for row in meter.report(args.period, args.kind, args.limit):
+        print(f"{row['subject']:<45} {row['requests']:>8,} requests {row['tokens']:>12,} tokens")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+import os
+import random
+import socket
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional
+import httpx
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_google_genai import ChatGoogleGenerativeAI
+from Agents.Hedging import HedgedInvoker
+from Agents.Cassette import cassette_factory
+from Agents.Quota import Caller, FairScheduler, UsageMeter, usage_tokens
+from Agents.Transport import shared_transport
+
+
+# Lengths / tones that benefit from the heavier model; everything else starts on the fast one
+QUALITY_LENGTHS = {"Long"}
+QUALITY_TONES = {"Storytelling", "Controversial", "Empathetic"}
+
+
+@dataclass(frozen=True)
+class ModelProfile:
+    """A model the router may send requests to"""
+    name: str
+    tier: str  # "fast" or "quality"
+    temperature: float = 0.7
+    max_output_tokens: int = 1500
+
+
+# Older langchain-google-genai releases build their own transport and have no client_args
+SUPPORTS_CLIENT_ARGS = "client_args" in getattr(ChatGoogleGenerativeAI, "model_fields", {})
+
+
+def default_factory(profile: ModelProfile):
+    """Build the real Gemini client for a profile; every profile shares one connection pool"""
+    kwargs = {"client_args": {"transport": shared_transport()}} if SUPPORTS_CLIENT_ARGS else {}
+    return ChatGoogleGenerativeAI(
+        model=profile.name,
+        temperature=profile.temperature,
+        max_output_tokens=profile.max_output_tokens,
+        **kwargs
+    )
+
+
+def factory_from_env() -> Callable[[ModelProfile], Any]:
+    """Real clients, or clients behind a record/replay cassette when LLM_CASSETTE is set"""
+    path = os.getenv("LLM_CASSETTE")
+    if not path:
+        return default_factory
+    return cassette_factory(
+        default_factory, path,
+        mode=os.getenv("LLM_CASSETTE_MODE", "auto"),
+        speed=float(os.getenv("LLM_CASSETTE_SPEED", "1.0"))
+    )
+
+
+class RollingStats:
+    """Latency and error window for one model"""
+
+    def __init__(self, window: int = 100):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+
+    def record(self, latency_s: float, ok: bool):
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(latency_s)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1.0 - sum(self.outcomes) / len(self.outcomes)
+
+
+class UpstreamUnavailable(Exception):
+    """The circuit breaker is open: the model API has been failing, so calls fail fast until `retry_at`"""
+
+    def __init__(self, retry_at: float):
+        super().__init__(f"The model API is unavailable; retrying in {max(0, round(retry_at - time.time()))}s")
+        self.retry_at = retry_at
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    for value in (getattr(error, "status_code", None), getattr(error, "code", None),
+                  getattr(getattr(error, "response", None), "status_code", None)):
+        if isinstance(value, int) and 100 <= value < 600:
+            return value
+    return None
+
+
+def is_outage(error: BaseException) -> bool:
+    """Whether an error means the model API is down or unreachable, rather than the request being wrong
+
+    Walks the exception chain, since client libraries wrap the HTTP error: a 5xx, a timeout or a
+    transport failure is an outage; a 4xx (bad key, rejected prompt) or a local bug is not.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, (UpstreamUnavailable, TimeoutError, ConnectionError, socket.gaierror,
+                              httpx.TransportError)):
+            return True
+        status = _status_code(error)
+        if status is not None:
+            return status >= 500
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class CircuitBreaker:
+    """Stops calling an upstream that keeps failing or crawling, then lets one probe through
+
+    Closed: calls pass. After `failure_threshold` consecutive failures (or calls slower than
+    `slow_call_s`) it opens and every call fails fast for `cooldown_s`. Then it half-opens
+    and allows a single probe; success closes it, failure opens it for another cooldown.
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown_s: float = 30.0, slow_call_s: float = 20.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self.slow_call_s = slow_call_s
+        self.failures = 0
+        self.opened = 0
+        self._opened_at: Optional[float] = None
+        self._probe_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "CircuitBreaker":
+        return cls(
+            failure_threshold=int(os.getenv("BREAKER_FAILURES", "5")),
+            cooldown_s=float(os.getenv("BREAKER_COOLDOWN_S", "30")),
+            slow_call_s=float(os.getenv("BREAKER_SLOW_S", "20"))
+        )
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state_locked(time.time())
+
+    def _state_locked(self, now: float) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "open" if now < self._opened_at + self.cooldown_s else "half-open"
+
+    @property
+    def retry_at(self) -> float:
+        with self._lock:
+            return (self._opened_at or 0.0) + self.cooldown_s
+
+    def allow(self) -> bool:
+        now = time.time()
+        with self._lock:
+            state = self._state_locked(now)
+            if state == "closed":
+                return True
+            if state == "open":
+                return False
+            # One probe at a time; a probe that never reported back stops counting after a cooldown
+            if self._probe_at is not None and now < self._probe_at + self.cooldown_s:
+                return False
+            self._probe_at = now
+            return True
+
+    def record(self, ok: bool, latency_s: float = 0.0):
+        with self._lock:
+            self._probe_at = None
+            if ok and latency_s <= self.slow_call_s:
+                self.failures = 0
+                self._opened_at = None
+                return
+            self.failures += 1
+            if self._opened_at is not None or self.failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    self.opened += 1
+                self._opened_at = time.time()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.time()
+            state = self._state_locked(now)
+            return {
+                "state": state,
+                "failures": self.failures,
+                "opened": self.opened,
+                "retry_in_s": max(0.0, self._opened_at + self.cooldown_s - now) if state == "open" else 0.0
+            }
+
+
+class ModelRouter:
+    """Picks a model per request and fails over when the primary is slow or erroring"""
+
+    def __init__(self, profiles: List[ModelProfile], factory: Callable[[ModelProfile], Any] = default_factory,
+                 slow_p95_s: float = 15.0, max_error_rate: float = 0.3, min_samples: int = 5,
+                 window: int = 100, hedger: Optional[HedgedInvoker] = None,
+                 scheduler: Optional[FairScheduler] = None, meter: Optional[UsageMeter] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        if not profiles:
+            raise ValueError("ModelRouter needs at least one model profile")
+        self.profiles = profiles
+        self.factory = factory
+        self.slow_p95_s = slow_p95_s
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self.hedger = hedger
+        self.scheduler = scheduler
+        self.meter = meter
+        self.breaker = breaker
+        self._clients: Dict[str, Any] = {}
+        self._stats: Dict[str, RollingStats] = {p.name: RollingStats(window) for p in profiles}
+        self._lock = threading.Lock()
+
+    def client(self, profile: ModelProfile):
+        with self._lock:
+            if profile.name not in self._clients:
+                self._clients[profile.name] = self.factory(profile)
+            return self._clients[profile.name]
+
+    def record(self, model: str, latency_s: float, ok: bool):
+        with self._lock:
+            self._stats[model].record(latency_s, ok)
+
+    def is_healthy(self, model: str) -> bool:
+        with self._lock:
+            stats = self._stats[model]
+            if len(stats.outcomes) < self.min_samples:
+                return True
+            p95 = stats.quantile(0.95)
+            return stats.error_rate <= self.max_error_rate and (p95 is None or p95 <= self.slow_p95_s)
+
+    def choose(self, length: str = "Medium", tone: str = "Professional",
+               prefer: Optional[str] = None) -> List[ModelProfile]:
+        """Candidates in the order they should be tried; `prefer` forces a tier first"""
+        wants_quality = length in QUALITY_LENGTHS or (length != "Short" and tone in QUALITY_TONES)
+        preferred = prefer or ("quality" if wants_quality else "fast")
+        ordered = sorted(self.profiles, key=lambda p: p.tier != preferred)
+        # Unhealthy models keep their relative order but move behind healthy ones
+        return sorted(ordered, key=lambda p: not self.is_healthy(p.name))
+
+    def invoke(self, input: Any, length: str = "Medium", tone: str = "Professional",
+               prefer: Optional[str] = None, caller: Optional[Caller] = None, **kwargs) -> Any:
+        """Check quotas, wait for a fair-share slot, then call the best model and account for it"""
+        caller = caller or Caller()
+        if self.meter:
+            self.meter.reserve(caller)
+        if self.breaker and not self.breaker.allow():
+            if self.meter:
+                self.meter.release(caller)
+            raise UpstreamUnavailable(self.breaker.retry_at)
+        try:
+            if self.scheduler:
+                with self.scheduler.slot(caller):
+                    result = self._invoke_with_failover(input, length, tone, prefer, **kwargs)
+            else:
+                result = self._invoke_with_failover(input, length, tone, prefer, **kwargs)
+        except Exception as e:
+            if self.meter:
+                self.meter.release(caller)
+            if self.breaker:
+                # A rejected request still means the API answered; only outages count against it
+                self.breaker.record(not is_outage(e))
+            raise
+        if self.meter:
+            self.meter.record(caller, usage_tokens(input, result))
+        return result
+
+    def _invoke_with_failover(self, input: Any, length: str, tone: str, prefer: Optional[str], **kwargs) -> Any:
+        """Try candidates in order, recording latency and errors; raise the last error if all fail"""
+        first_started = time.perf_counter()
+        last_error: Optional[Exception] = None
+        for profile in self.choose(length, tone, prefer):
+            started = time.perf_counter()
+            try:
+                client = self.client(profile)
+                if self.hedger:
+                    result = self.hedger.invoke(client, input, key=profile.name, **kwargs)
+                else:
+                    result = client.invoke(input, **kwargs)
+            except Exception as e:
+                self.record(profile.name, time.perf_counter() - started, ok=False)
+                last_error = e
+                continue
+            self.record(profile.name, time.perf_counter() - started, ok=True)
+            if self.breaker:
+                # Failover time counts too: a call that only succeeded on the backup was still slow
+                self.breaker.record(True, time.perf_counter() - first_started)
+            return result
+        raise last_error
+
+    def __call__(self, input: Any) -> Any:
+        # Used when piped into a chain without hints (e.g. section rewrites): small, so fast-first
+        return self.invoke(input, length="Short")
+
+    def for_caller(self, caller: Caller) -> "_CallerRouter":
+        """A pipeable stand-in for this router whose calls are scheduled and billed to `caller`"""
+        return _CallerRouter(self, caller)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                name: {
+                    "calls": len(stats.outcomes),
+                    "p50_s": stats.quantile(0.5),
+                    "p95_s": stats.quantile(0.95),
+                    "error_rate": stats.error_rate
+                }
+                for name, stats in self._stats.items()
+            }
+
+
+class _CallerRouter:
+    def __init__(self, router: ModelRouter, caller: Caller):
+        self.router = router
+        self.caller = caller
+
+    def __call__(self, input: Any) -> Any:
+        return self.router.invoke(input, length="Short", caller=self.caller)
+
+
+class FakeBackend:
+    """Local stand-in for a chat model: fixed response, configurable latency and failure rate"""
+
+    def __init__(self, response: str = "Fake post.\n\n#fake", latency_s: float = 0.0,
+                 jitter_s: float = 0.0, error_rate: float = 0.0, seed: Optional[int] = None):
+        self.response = response
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.error_rate = error_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+
+    def _wait_and_maybe_fail(self):
+        self.calls += 1
+        time.sleep(self.latency_s + self._random.uniform(0, self.jitter_s))
+        if self._random.random() < self.error_rate:
+            raise RuntimeError("fake backend error")
+
+    def invoke(self, input: Any, **kwargs) -> Any:
+        self._wait_and_maybe_fail()
+        return AIMessage(content=self.response)
+
+    def stream(self, input: Any, **kwargs):
+        # The configured latency is the time to first token; the rest streams immediately
+        self._wait_and_maybe_fail()
+        for word in self.response.split(" "):
+            yield AIMessageChunk(content=word + " ")
@@ -0,0 +1,269 @@
+import re
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from Agents.Preview import FOLD_CHARS, FOLD_LINES
+
+
+# What "avoid buzzwords and clichés" in the humanization rules means in practice
+BUZZWORDS = (
+    "synergy", "synergies", "leverage", "leveraging", "game changer", "game-changer", "paradigm shift",
+    "disrupt", "disruptive", "circle back", "move the needle", "thought leader", "thought leadership",
+    "best-in-class", "world-class", "cutting-edge", "next-level", "unlock", "unlocking", "empower",
+    "empowering", "holistic", "seamless", "seamlessly", "robust", "deep dive", "low-hanging fruit",
+    "rockstar", "ninja", "guru", "revolutionize", "revolutionary", "delve", "tapestry", "elevate",
+    "in today's fast-paced world", "let that sink in", "hustle", "value-add", "ecosystem"
+)
+
+FEATURES = (
+    "chars", "words", "paragraphs", "hook_chars", "fold_at", "hook_before_fold", "questions", "has_cta",
+    "mean_paragraph_words", "max_paragraph_words", "paragraph_rhythm", "readability_grade",
+    "buzzwords", "buzzword_density", "emojis", "emoji_ratio", "score"
+)
+
+# Openers that ask the reader to respond
+CTA_PHRASES = (
+    "what do you think", "comment below", "share your thoughts", "share your experience", "let me know",
+    "drop a", "drop your", "tell me", "agree or disagree", "follow for", "follow me for", "dm me",
+    "repost if", "how do you", "what's your", "what would you"
+)
+
+_SEPARATOR = "\x00"
+_BLANK_LINES = re.compile(r"\n[ \t]*\n\s*")
+
+# Per-character classes for ASCII; anything wider is classified with str.isalpha
+_LETTER, _VOWEL, _MARK, _SPACE, _WORD, _APOSTROPHE = 1, 2, 4, 8, 16, 32
+_ASCII_CLASSES = np.zeros(128, dtype=np.uint8)
+for _code in range(128):
+    _char = chr(_code)
+    _ASCII_CLASSES[_code] = (
+        _LETTER * _char.isalpha() | _VOWEL * (_char in "aeiouyAEIOUY") | _MARK * (_char in ".!?")
+        | _SPACE * (_char in " \t\r\n\x00") | _WORD * (_char.isalnum() or _char == "_")
+        | _APOSTROPHE * (_char == "'")
+    )
+_EMOJI_RANGES = ((0x1F300, 0x1FAFF), (0x2600, 0x27BF), (0x2B50, 0x2B50), (0x2B55, 0x2B55),
+                 (0x203C, 0x203C), (0x2049, 0x2049))
+
+
+# Phrases are prefiltered on their first characters, so none may be shorter than this
+_PREFIX_CHARS = 4
+
+
+def _prefix_keys(codes: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """The first four characters at each position packed into one uint64 (low 16 bits of each)
+
+    Only the characters at the positions are gathered and widened, never the whole array;
+    positions past the end read as zero.
+    """
+    keys = np.zeros(len(positions), dtype=np.uint64)
+    for offset in range(_PREFIX_CHARS):
+        at = positions + offset
+        chars = np.zeros(len(positions), dtype=np.uint64)
+        inside = at < len(codes)
+        chars[inside] = codes[at[inside]] & 0xFFFF
+        keys = (keys << np.uint64(16)) | chars
+    return keys
+
+
+def _phrase_matcher(phrases: Sequence[str]) -> Tuple[re.Pattern, np.ndarray]:
+    """A regex for the phrases plus the prefix key of each, for prefiltering"""
+    pattern = re.compile(
+        "(?:" + "|".join(re.escape(phrase) for phrase in sorted(phrases, key=len, reverse=True)) + r")\b"
+    )
+    heads = np.array([ord(char) for phrase in phrases for char in phrase[:_PREFIX_CHARS]], dtype=np.uint32)
+    return pattern, np.unique(_prefix_keys(heads, np.arange(0, len(heads), _PREFIX_CHARS)))
+
+
+_BUZZWORDS = _phrase_matcher(BUZZWORDS)
+_CTAS = _phrase_matcher(CTA_PHRASES)
+
+
+def _shift(mask: np.ndarray, by: int) -> np.ndarray:
+    """mask[i - by] at i (so by=1 is "previous character"), False off either end"""
+    shifted = np.zeros_like(mask)
+    if by > 0:
+        shifted[by:] = mask[:-by]
+    else:
+        shifted[:by] = mask[-by:]
+    return shifted
+
+
+def _classes(codes: np.ndarray) -> np.ndarray:
+    classes = _ASCII_CLASSES[np.minimum(codes, 127)]
+    wide = np.flatnonzero(codes >= 128)
+    if len(wide):
+        distinct, index = np.unique(codes[wide], return_inverse=True)
+        alpha = np.array([chr(code).isalpha() for code in distinct.tolist()], dtype=np.uint8)
+        classes[wide] = (_LETTER | _WORD) * alpha[index]
+        classes[wide[codes[wide] == ord("’")]] = _APOSTROPHE
+    return classes
+
+
+def _phrase_starts(lowered: str, word_pos: np.ndarray, word_keys: np.ndarray,
+                   matcher: Tuple[re.Pattern, np.ndarray]) -> np.ndarray:
+    """Word starts where one of the phrases begins
+
+    Only words whose first four characters open some phrase reach the regex, so the
+    Python-level work is proportional to near-misses rather than to text length.
+    word_keys are the _prefix_keys of word_pos, computed once and shared by every matcher.
+    """
+    pattern, prefixes = matcher
+    candidates = word_pos[np.isin(word_keys, prefixes)]
+    return np.array([pos for pos in candidates.tolist() if pattern.match(lowered, pos)], dtype=np.int64)
+
+
+def _per_draft(positions: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """How many matches fall inside each draft"""
+    owners = np.searchsorted(starts, positions, side="right") - 1
+    return np.bincount(owners, minlength=len(starts))
+
+
+def score_drafts(texts: Sequence[str]) -> Dict[str, np.ndarray]:
+    """Engagement features for many drafts at once; each array has one entry per draft
+
+    All drafts are joined into one string and scanned as a code-point array: words,
+    syllables, sentences, hashtags and emojis are boolean masks, and offsets are
+    bucketed back into drafts with searchsorted/bincount. The cost is a fixed number
+    of array passes however many drafts there are.
+    """
+    n = len(texts)
+    if n == 0:
+        return {name: np.zeros(0) for name in FEATURES}
+
+    lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=n)
+    starts = np.concatenate(([0], np.cumsum(lengths + 1)[:-1]))
+    joined = _SEPARATOR.join(texts)
+    lowered = joined.lower()
+    if len(lowered) != len(joined):
+        # A few characters (e.g. "İ") lower-case to two; keep offsets aligned by leaving those alone
+        lowered = "".join(char if len(char.lower()) != 1 else char.lower() for char in joined)
+    codes = np.frombuffer(lowered.encode("utf-32-le"), dtype=np.uint32)
+    classes = _classes(codes)
+    word_chars = (classes & _WORD) > 0
+
+    # Hashtags: "#" opening a run of word characters; their letters aren't words or syllables
+    hashes = (codes == ord("#")) & _shift(word_chars, -1) & ~_shift(word_chars | (codes == ord("#")), 1)
+    run_ids = np.cumsum(word_chars & ~_shift(word_chars, 1))
+    tagged = np.zeros(len(codes) + 1, dtype=bool)
+    tagged[run_ids[np.flatnonzero(hashes) + 1]] = True
+    in_tag = word_chars & tagged[run_ids]
+
+    # A word is a run of letters; an apostrophe between letters ("don't") joins the run
+    letters = ((classes & _LETTER) > 0) & ~in_tag
+    letters |= ((classes & _APOSTROPHE) > 0) & _shift(letters, 1) & _shift(letters, -1)
+    word_pos = np.flatnonzero(letters & ~_shift(letters, 1))
+    word_keys = _prefix_keys(codes, word_pos)
+    words = _per_draft(word_pos, starts)
+    safe_words = np.maximum(words, 1)
+
+    # Paragraphs: blank-line breaks plus draft starts; only paragraphs with words count
+    break_spans = np.array([match.span() for match in _BLANK_LINES.finditer(joined)], dtype=np.int64).reshape(-1, 2)
+    para_starts = np.unique(np.concatenate((starts, break_spans[:, 1])))
+    para_words = np.bincount(np.searchsorted(para_starts, word_pos, side="right") - 1, minlength=len(para_starts))
+    para_owner = np.searchsorted(starts, para_starts, side="right") - 1
+    real = para_words > 0
+    paragraphs = np.bincount(para_owner[real], minlength=n)
+    safe_paragraphs = np.maximum(paragraphs, 1)
+    mean_para = np.bincount(para_owner[real], weights=para_words[real], minlength=n) / safe_paragraphs
+    mean_sq = np.bincount(para_owner[real], weights=para_words[real] ** 2, minlength=n) / safe_paragraphs
+    rhythm = np.sqrt(np.maximum(mean_sq - mean_para ** 2, 0)) / np.maximum(mean_para, 1)
+    max_para = np.zeros(n, dtype=np.int64)
+    np.maximum.at(max_para, para_owner[real], para_words[real])
+
+    # Hook: from the draft start to the end of its first paragraph with words
+    ends = np.sort(np.concatenate((break_spans[:, 0], starts[1:] - 1, [len(joined)])))
+    para_ends = ends[np.searchsorted(ends, para_starts, side="left")]
+    real_idx = np.flatnonzero(real)
+    owners, first = np.unique(para_owner[real_idx], return_index=True)
+    hook_chars = np.zeros(n, dtype=np.int64)
+    hook_chars[owners] = para_ends[real_idx[first]] - starts[owners]
+    hook_chars = np.minimum(hook_chars, lengths)
+
+    # Fold: LinkedIn cuts after FOLD_LINES lines or FOLD_CHARS characters, whichever comes first
+    newline_pos = np.flatnonzero(codes == ord("\n"))
+    newline_owner = np.searchsorted(starts, newline_pos, side="right") - 1
+    rank = np.arange(len(newline_pos)) - np.searchsorted(newline_owner, newline_owner, side="left")
+    fold_at = np.minimum(lengths, FOLD_CHARS)
+    nth = rank == FOLD_LINES - 1
+    fold_at[newline_owner[nth]] = np.minimum(fold_at[newline_owner[nth]], newline_pos[nth] - starts[newline_owner[nth]])
+    hook_before_fold = hook_chars <= fold_at
+
+    questions = _per_draft(np.flatnonzero(codes == ord("?")), starts)
+    has_cta = (_per_draft(_phrase_starts(lowered, word_pos, word_keys, _CTAS), starts) > 0) | (questions > 0)
+
+    # A sentence ends at a run of .!? followed by whitespace or the end of the draft
+    marks = (classes & _MARK) > 0
+    followed = np.append((classes[1:] & _SPACE) > 0, True)
+    sentence_pos = np.flatnonzero(marks & ~_shift(marks, -1) & followed)
+    sentences = np.maximum(_per_draft(sentence_pos, starts), paragraphs)
+    # Syllables: vowel groups, less a silent final "e" after a consonant
+    vowels = ((classes & _VOWEL) > 0) & letters
+    silent_e = (codes == ord("e")) & _shift(letters & ~vowels, 1) & ~_shift(letters, -1)
+    syllables = (_per_draft(np.flatnonzero(vowels & ~_shift(vowels, 1)), starts)
+                 - _per_draft(np.flatnonzero(silent_e), starts))
+    syllables = np.maximum(syllables, words)
+    # Flesch-Kincaid grade level
+    grade = 0.39 * words / np.maximum(sentences, 1) + 11.8 * syllables / safe_words - 15.59
+    grade = np.where(words > 0, grade, 0.0)
+
+    buzzwords = _per_draft(_phrase_starts(lowered, word_pos, word_keys, _BUZZWORDS), starts)
+    buzzword_density = buzzwords / safe_words
+    emoji = np.zeros(len(codes), dtype=bool)
+    for low, high in _EMOJI_RANGES:
+        emoji |= (codes >= low) & (codes <= high)
+    emojis = _per_draft(np.flatnonzero(emoji), starts)
+    emoji_ratio = emojis / safe_words
+
+    score = (
+        20 * hook_before_fold
+        + 15 * has_cta
+        + 20 * np.clip(1 - (mean_para - 25) / 50, 0, 1)
+        + 20 * np.clip((16 - grade) / 8, 0, 1)
+        + 15 * np.clip(1 - buzzword_density * 50, 0, 1)
+        + 10 * np.clip(1 - (emoji_ratio - 0.05) / 0.15, 0, 1)
+    )
+    score = np.where(words > 0, score, 0.0)
+
+    return {
+        "chars": lengths,
+        "words": words,
+        "paragraphs": paragraphs,
+        "hook_chars": hook_chars,
+        "fold_at": fold_at,
+        "hook_before_fold": hook_before_fold,
+        "questions": questions,
+        "has_cta": has_cta,
+        "mean_paragraph_words": mean_para,
+        "max_paragraph_words": max_para,
+        "paragraph_rhythm": rhythm,
+        "readability_grade": grade,
+        "buzzwords": buzzwords,
+        "buzzword_density": buzzword_density,
+        "emojis": emojis,
+        "emoji_ratio": emoji_ratio,
+        "score": score
+    }
+
+
+def score_draft(text: str) -> Dict[str, float]:
+    """Features of a single draft as plain Python numbers"""
+    return {name: values[0].item() for name, values in score_drafts([text]).items()}
+
+
+def tips(features: Dict[str, float]) -> List[str]:
+    """Short suggestions for the weakest features of one draft"""
+    suggestions = []
+    if not features["hook_before_fold"]:
+        suggestions.append("Shorten the opening so the hook shows before “…see more”.")
+    if not features["has_cta"]:
+        suggestions.append("End with a question or call-to-action to invite comments.")
+    if features["mean_paragraph_words"] > 35:
+        suggestions.append("Break long paragraphs up; 1–2 sentences each reads best on mobile.")
+    if features["readability_grade"] > 10:
+        suggestions.append(f"Simplify wording (grade {features['readability_grade']:.0f}); aim for 8 or below.")
+    if features["buzzwords"]:
+        suggestions.append(f"Cut buzzwords ({int(features['buzzwords'])} found).")
+    if features["emoji_ratio"] > 0.08:
+        suggestions.append("Use fewer emojis.")
+    return suggestions
@@ -0,0 +1,133 @@
+from typing import Dict, Optional, Tuple
+from langchain_core.prompts import PromptTemplate
+from Agents.Parser import parse_post
+
+
+SECTION_NAMES = ("hook", "body", "cta", "hashtags")
+
+SECTION_GUIDES = {
+    "hook": "the opening hook: 1-2 short lines that stop the scroll (bold statement, question, or insight)",
+    "body": "the main body: short paragraphs of 1-2 sentences with line breaks, delivering the core insight",
+    "cta": "the closing call-to-action: one thoughtful question or invitation to comment",
+    "hashtags": "the hashtag line: 3-5 relevant, niche-specific hashtags on a single line"
+}
+
+SECTION_PROMPT = PromptTemplate(
+    input_variables=["section", "guide", "topic", "audience", "instructions", "hook", "body", "cta", "hashtags"],
+    template="""
+You are editing ONE section of an existing LinkedIn post. Rewrite only the {section}.
+
+SECTION TO REWRITE: {guide}
+TOPIC: {topic}
+TARGET AUDIENCE: {audience}
+EXTRA INSTRUCTIONS: {instructions}
+
+The other sections are FROZEN. Keep the new {section} consistent with them, and do not repeat them.
+
+HOOK:
+{hook}
+
+BODY:
+{body}
+
+CALL-TO-ACTION:
+{cta}
+
+HASHTAGS:
+{hashtags}
+
+Return ONLY the new {section} text. No labels, no quotes, no other sections.
+"""
+)
+
+
+def parse_post_sections(post: str) -> Dict[str, str]:
+    """Parse post into sections for editing"""
+    return parse_post(post).sections()
+
+
+def reconstruct_post(sections: Dict[str, str]) -> str:
+    """Reconstruct the post from edited sections"""
+    parts = []
+
+    if sections["hook"]:
+        parts.append(sections["hook"])
+
+    if sections["body"]:
+        parts.append(sections["body"])
+
+    if sections["cta"]:
+        parts.append(sections["cta"])
+
+    if sections["hashtags"]:
+        parts.append(sections["hashtags"])
+
+    # If no sections were parsed, return original
+    if not any(sections[key] for key in SECTION_NAMES):
+        return sections["full"]
+
+    return "\n\n".join(parts)
+
+
+def _section_span(post: str, section: str) -> Optional[Tuple[int, int]]:
+    """[start, end) of a section's text in the post, without surrounding whitespace"""
+    tree = parse_post(post)
+    span = {"hook": tree.hook, "body": tree.body, "cta": tree.cta, "hashtags": tree.hashtags}[section]
+    if span is None:
+        return None
+    text = span.text(post)
+    return span.start + len(text) - len(text.lstrip()), span.start + len(text.rstrip())
+
+
+def _insertion_point(post: str, section: str) -> int:
+    """Where a section the post doesn't have yet belongs"""
+    tree = parse_post(post)
+    if section == "hook":
+        return 0
+    if section == "body":
+        return tree.hook.end if tree.hook else 0
+    if section == "cta":
+        return tree.content_end
+    return len(post)
+
+
+def splice_section(post: str, section: str, text: str) -> str:
+    """Replace one section in place; every other character of the post stays as it was"""
+    span = _section_span(post, section)
+    if span is not None:
+        return post[:span[0]] + text + post[span[1]:]
+
+    if not text:
+        return post
+    pos = _insertion_point(post, section)
+    before, after = post[:pos], post[pos:]
+    # A new section gets a blank line on each side, counting newlines that are already there
+    lead = "" if not before.strip() else "\n" * max(0, 2 - (len(before) - len(before.rstrip("\n"))))
+    trail = "" if not after.strip() else "\n" * max(0, 2 - (len(after) - len(after.lstrip("\n"))))
+    return before + lead + text + trail + after
+
+
+def regenerate_section(llm, post: str, section: str, topic: str, audience: str,
+                       instructions: Optional[str] = None) -> str:
+    """Rewrite a single section with a small LLM call and splice it back in"""
+    if section not in SECTION_NAMES:
+        raise ValueError(f"Unknown section '{section}'. Choose one of: {', '.join(SECTION_NAMES)}")
+
+    sections = parse_post_sections(post)
+    frozen = {
+        key: ("(to be rewritten)" if key == section else sections[key] or "(none)")
+        for key in SECTION_NAMES
+    }
+
+    chain = SECTION_PROMPT | llm
+    result = chain.invoke({
+        "section": section,
+        "guide": SECTION_GUIDES[section],
+        "topic": topic.strip(),
+        "audience": audience.strip(),
+        "instructions": (instructions or "").strip() or "(none)",
+        **frozen
+    })
+
+    content = result.content if hasattr(result, "content") else str(result)
+    return splice_section(post, section, content.strip())
@@ -0,0 +1,130 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from Agents.Compression import Codec
+
+
+DEFAULT_SPILL_DIR = os.path.join(".state", "posts")
+
+# Spilled posts no session has read or written for this long are deleted, like stale checkpoints
+DEFAULT_SPILL_MAX_AGE_S = 7 * 24 * 3600
+
+
+def post_id(text: str) -> str:
+    """Content address: identical posts across sessions share one stored copy"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=12).hexdigest()
+
+
+class PostStore:
+    """Process-wide compressed post bodies, LRU-capped in memory and spilled to disk beyond that"""
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, spill_dir: str = DEFAULT_SPILL_DIR,
+                 codec: Optional[Codec] = None, max_age_s: float = DEFAULT_SPILL_MAX_AGE_S):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.max_age_s = max_age_s
+        self._next_prune = 0.0
+        self.codec = codec or Codec()
+        self._lock = threading.Lock()
+        self._hot: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self.spills = 0
+        self.disk_reads = 0
+
+    def _spill_path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, key[:2], key + ".z")
+
+    def put(self, text: str) -> str:
+        key = post_id(text)
+        with self._lock:
+            if key in self._hot:
+                self._hot.move_to_end(key)
+                return key
+        blob = self.codec.compress(text)
+        with self._lock:
+            self._insert_locked(key, blob)
+        if time.time() >= self._next_prune:
+            self.prune()
+        return key
+
+    def get(self, key: Optional[str]) -> str:
+        """The post for `key`; an unknown or empty key reads as an empty post"""
+        if not key:
+            return ""
+        with self._lock:
+            blob = self._hot.get(key)
+            if blob is not None:
+                self._hot.move_to_end(key)
+        if blob is None:
+            path = self._spill_path(key)
+            try:
+                with open(path, "rb") as f:
+                    blob = f.read()
+                os.utime(path)  # still in use, so not for pruning
+            except FileNotFoundError:
+                return ""
+            with self._lock:
+                self.disk_reads += 1
+                self._insert_locked(key, blob)
+        return self.codec.decompress(blob)
+
+    def _insert_locked(self, key: str, blob: bytes):
+        if key in self._hot:
+            return
+        self._hot[key] = blob
+        self._bytes += len(blob)
+        while self._bytes > self.max_bytes and len(self._hot) > 1:
+            old_key, old_blob = self._hot.popitem(last=False)
+            self._bytes -= len(old_blob)
+            path = self._spill_path(old_key)
+            # Content-addressed, so a file that already exists already holds this blob
+            if os.path.exists(path):
+                os.utime(path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(old_blob)
+            self.spills += 1
+
+    def prune(self) -> int:
+        """Delete spilled posts untouched for `max_age_s`; returns how many went"""
+        now = time.time()
+        self._next_prune = now + min(self.max_age_s, 3600)
+        cutoff = now - self.max_age_s
+        removed = 0
+        if not os.path.isdir(self.spill_dir):
+            return 0
+        for bucket in os.scandir(self.spill_dir):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                try:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass  # another process pruned it first
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._hot), "bytes": self._bytes, "spills": self.spills,
+                    "disk_reads": self.disk_reads}
+
+
+@dataclass(slots=True)
+class SessionState:
+    """Everything a browser session keeps besides widget values; posts are held by id only"""
+    user_id: str
+    post_id: Optional[str] = None
+
+    def set_post(self, store: PostStore, text: str):
+        self.post_id = store.put(text) if text else None
+
+    def post(self, store: PostStore) -> str:
+        return store.get(self.post_id)
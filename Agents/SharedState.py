@@ -0,0 +1,484 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from Agents.Compression import DICT_SIZE, Codec, train_dictionary
+
+
+DEFAULT_DB_PATH = os.path.join(".state", "linkedin_post.db")
+
+# Expired cache rows are deleted at most this often per process, piggybacking on writes
+CACHE_PURGE_INTERVAL_S = 300
+
+
+def post_hash(post: str) -> str:
+    """Identity of a post for history dedup"""
+    return hashlib.sha256(post.strip().encode("utf-8")).hexdigest()
+
+
+class StateBackend:
+    """Shared state for every worker: response cache, history, rate limits and locks"""
+
+    def cache_get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def cache_set(self, key: str, value: str, ttl_s: float):
+        raise NotImplementedError
+
+    def history_append(self, user: str, record: Dict[str, Any]) -> Optional[int]:
+        """Append a record (must contain "post"); returns its id, or None if already saved"""
+        raise NotImplementedError
+
+    def history_list(self, user: str, limit: int = 5, offset: int = 0) -> List[Dict[str, Any]]:
+        """Most recent first"""
+        raise NotImplementedError
+
+    def history_count(self, user: str) -> int:
+        raise NotImplementedError
+
+    def history_page(self, user: Optional[str], after_id: int = 0, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Oldest first, ids greater than `after_id`; keyset pagination for streaming every record"""
+        raise NotImplementedError
+
+    def take_token(self, bucket: str, rate_per_s: float, capacity: float, cost: float = 1.0) -> bool:
+        """Token-bucket rate limit; True if `cost` tokens were available and taken"""
+        raise NotImplementedError
+
+    def usage_add(self, subjects: List[str], period: str, requests: int, tokens: int,
+                  limits: Optional[Dict[str, List[int]]] = None) -> Optional[Tuple[str, str]]:
+        """Add to the request/token counters of each subject (e.g. "user:<id>") for a period
+
+        `limits` maps a subject to its [requests, tokens] allowance (0 = unlimited). If any
+        subject has already reached one, nothing is added and (subject, "requests" or
+        "tokens") comes back; the check and the add are one atomic step.
+        """
+        raise NotImplementedError
+
+    def usage_get(self, subjects: List[str], period: str) -> Dict[str, Dict[str, int]]:
+        """Counters per subject; subjects with no usage yet read as zero"""
+        raise NotImplementedError
+
+    def usage_list(self, period: str, prefix: str = "", limit: int = 100) -> List[Dict[str, Any]]:
+        """Subjects starting with `prefix`, heaviest token use first"""
+        raise NotImplementedError
+
+    def acquire_lock(self, name: str, owner: str, ttl_s: float) -> bool:
+        raise NotImplementedError
+
+    def release_lock(self, name: str, owner: str):
+        raise NotImplementedError
+
+    def single_flight(self, key: str, compute: Callable[[], str], ttl_s: float = 600.0,
+                      lock_ttl_s: float = 60.0, poll_s: float = 0.25) -> str:
+        """Return the cached value, or compute it in exactly one worker while others wait"""
+        cached = self.cache_get(key)
+        if cached is not None:
+            return cached
+
+        owner = uuid.uuid4().hex
+        lock_name = f"flight:{key}"
+        deadline = time.monotonic() + lock_ttl_s
+        while not self.acquire_lock(lock_name, owner, lock_ttl_s):
+            time.sleep(poll_s)
+            cached = self.cache_get(key)
+            if cached is not None:
+                return cached
+            if time.monotonic() > deadline:
+                # The owner died or is stuck; stop waiting and do the work ourselves
+                break
+
+        try:
+            # The owner may have finished between our cache miss and taking the lock
+            cached = self.cache_get(key)
+            if cached is not None:
+                return cached
+            value = compute()
+            self.cache_set(key, value, ttl_s)
+            return value
+        finally:
+            self.release_lock(lock_name, owner)
+
+
+class SQLiteBackend(StateBackend):
+    """Local file-backed implementation; safe across processes on one host
+
+    History records and cached values are stored compressed (see Agents.Compression),
+    with the newest trained dictionary; rows written as plain text still read back.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH, codec: Optional[Codec] = None):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._next_purge = 0.0
+        self._create_schema()
+        self.codec = codec or Codec(loader=self._load_dictionary)
+        if codec is None:
+            row = self._conn().execute("SELECT data FROM dictionaries ORDER BY created_at DESC LIMIT 1").fetchone()
+            if row:
+                self.codec.use_dictionary(row[0])
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        self._conn().executescript("""
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires_at);
+            CREATE TABLE IF NOT EXISTS history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user TEXT NOT NULL,
+                post_hash TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                record TEXT NOT NULL,
+                UNIQUE (user, post_hash)
+            );
+            CREATE INDEX IF NOT EXISTS history_user_id ON history (user, id);
+            CREATE TABLE IF NOT EXISTS buckets (
+                name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS locks (
+                name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS usage (
+                subject TEXT NOT NULL, period TEXT NOT NULL,
+                requests INTEGER NOT NULL, tokens INTEGER NOT NULL,
+                PRIMARY KEY (subject, period)
+            );
+            CREATE TABLE IF NOT EXISTS dictionaries (
+                id INTEGER PRIMARY KEY, data BLOB NOT NULL, created_at REAL NOT NULL
+            );
+        """)
+
+    def _load_dictionary(self, dict_id: int) -> Optional[bytes]:
+        # Another process may have retrained since this one started
+        row = self._conn().execute("SELECT data FROM dictionaries WHERE id = ?", (dict_id,)).fetchone()
+        return row[0] if row else None
+
+    def cache_get(self, key: str) -> Optional[str]:
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return self.codec.decode(row[0]) if row else None
+
+    def cache_set(self, key: str, value: str, ttl_s: float):
+        now = time.time()
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, self.codec.encode(value), now + ttl_s)
+        )
+        if now >= self._next_purge:
+            self.purge_expired(now)
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        """Delete expired cache entries; reads already skip them, this just stops the table growing"""
+        now = time.time() if now is None else now
+        self._next_purge = now + CACHE_PURGE_INTERVAL_S
+        return self._conn().execute("DELETE FROM cache WHERE expires_at <= ?", (now,)).rowcount
+
+    def history_append(self, user: str, record: Dict[str, Any]) -> Optional[int]:
+        record = dict(record)
+        record.setdefault("created_at", time.time())
+        cursor = self._conn().execute(
+            "INSERT OR IGNORE INTO history (user, post_hash, created_at, record) VALUES (?, ?, ?, ?)",
+            (user, post_hash(record["post"]), record["created_at"], self.codec.encode(json.dumps(record)))
+        )
+        return cursor.lastrowid if cursor.rowcount else None
+
+    def history_list(self, user: str, limit: int = 5, offset: int = 0) -> List[Dict[str, Any]]:
+        rows = self._conn().execute(
+            "SELECT id, record FROM history WHERE user = ? ORDER BY id DESC LIMIT ? OFFSET ?",
+            (user, limit, offset)
+        ).fetchall()
+        return [{"id": row_id, **json.loads(self.codec.decode(record))} for row_id, record in rows]
+
+    def history_count(self, user: str) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM history WHERE user = ?", (user,)).fetchone()[0]
+
+    def history_page(self, user: Optional[str], after_id: int = 0, limit: int = 1000) -> List[Dict[str, Any]]:
+        if user is None:
+            rows = self._conn().execute(
+                "SELECT id, user, record FROM history WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit)
+            ).fetchall()
+        else:
+            rows = self._conn().execute(
+                "SELECT id, user, record FROM history WHERE user = ? AND id > ? ORDER BY id LIMIT ?",
+                (user, after_id, limit)
+            ).fetchall()
+        return [{"id": row_id, "user": row_user, **json.loads(self.codec.decode(record))}
+                for row_id, row_user, record in rows]
+
+    def retrain_dictionary(self, samples: int = 2000, size: int = DICT_SIZE) -> int:
+        """Train a dictionary on recent history and cache entries and compress new data with it"""
+        conn = self._conn()
+        rows = conn.execute("SELECT record FROM history ORDER BY id DESC LIMIT ?", (samples,)).fetchall()
+        rows += conn.execute(
+            "SELECT value FROM cache WHERE expires_at > ? ORDER BY expires_at DESC LIMIT ?", (time.time(), samples)
+        ).fetchall()
+        texts = [self.codec.decode(value) for value, in rows]
+        data = train_dictionary([text for text in texts if len(text) >= self.codec.min_size], size)
+        dict_id = self.codec.use_dictionary(data)
+        conn.execute("INSERT OR REPLACE INTO dictionaries (id, data, created_at) VALUES (?, ?, ?)",
+                     (dict_id, data, time.time()))
+        return dict_id
+
+    def recompress_history(self, batch: int = 500) -> int:
+        """Rewrite stored history with the current dictionary; returns how many rows were rewritten"""
+        conn = self._conn()
+        rewritten, after_id = 0, 0
+        while True:
+            rows = conn.execute(
+                "SELECT id, record FROM history WHERE id > ? ORDER BY id LIMIT ?", (after_id, batch)
+            ).fetchall()
+            if not rows:
+                return rewritten
+            after_id = rows[-1][0]
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("UPDATE history SET record = ? WHERE id = ?",
+                                 [(self.codec.encode(self.codec.decode(record)), row_id) for row_id, record in rows])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            rewritten += len(rows)
+
+    def take_token(self, bucket: str, rate_per_s: float, capacity: float, cost: float = 1.0) -> bool:
+        conn = self._conn()
+        now = time.time()
+        # IMMEDIATE takes the write lock up front, so refill-and-take is atomic across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE name = ?", (bucket,)).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate_per_s)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                (bucket, tokens, now)
+            )
+            conn.execute("COMMIT")
+            return allowed
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def usage_add(self, subjects: List[str], period: str, requests: int, tokens: int,
+                  limits: Optional[Dict[str, List[int]]] = None) -> Optional[Tuple[str, str]]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for subject in subjects:
+                request_limit, token_limit = (limits or {}).get(subject) or (0, 0)
+                conn.execute("INSERT OR IGNORE INTO usage (subject, period, requests, tokens) VALUES (?, ?, 0, 0)",
+                             (subject, period))
+                # Only adds while the subject is under both limits; the write lock makes this
+                # atomic with every other worker's reservation
+                cursor = conn.execute(
+                    "UPDATE usage SET requests = requests + ?, tokens = tokens + ? "
+                    "WHERE subject = ? AND period = ? AND (? = 0 OR requests < ?) AND (? = 0 OR tokens < ?)",
+                    (requests, tokens, subject, period, request_limit, request_limit, token_limit, token_limit)
+                )
+                if cursor.rowcount == 0:
+                    used_requests, _ = conn.execute("SELECT requests, tokens FROM usage WHERE subject = ? AND period = ?",
+                                                    (subject, period)).fetchone()
+                    conn.execute("ROLLBACK")
+                    return subject, "requests" if request_limit and used_requests >= request_limit else "tokens"
+            conn.execute("COMMIT")
+            return None
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def usage_get(self, subjects: List[str], period: str) -> Dict[str, Dict[str, int]]:
+        usage = {subject: {"requests": 0, "tokens": 0} for subject in subjects}
+        rows = self._conn().execute(
+            f"SELECT subject, requests, tokens FROM usage WHERE period = ? "
+            f"AND subject IN ({', '.join('?' * len(subjects))})",
+            (period, *subjects)
+        ).fetchall()
+        for subject, requests, tokens in rows:
+            usage[subject] = {"requests": requests, "tokens": tokens}
+        return usage
+
+    def usage_list(self, period: str, prefix: str = "", limit: int = 100) -> List[Dict[str, Any]]:
+        rows = self._conn().execute(
+            "SELECT subject, requests, tokens FROM usage WHERE period = ? AND substr(subject, 1, ?) = ? "
+            "ORDER BY tokens DESC, subject LIMIT ?",
+            (period, len(prefix), prefix, limit)
+        ).fetchall()
+        return [{"subject": subject, "requests": requests, "tokens": tokens} for subject, requests, tokens in rows]
+
+    def acquire_lock(self, name: str, owner: str, ttl_s: float) -> bool:
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM locks WHERE name = ? AND expires_at <= ?", (name, now))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO locks (name, owner, expires_at) VALUES (?, ?, ?)",
+                (name, owner, now + ttl_s)
+            )
+            conn.execute("COMMIT")
+            return cursor.rowcount == 1
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def release_lock(self, name: str, owner: str):
+        self._conn().execute("DELETE FROM locks WHERE name = ? AND owner = ?", (name, owner))
+
+
+class HttpBackend(StateBackend):
+    """Networked implementation talking to a `serve()` process (or anything speaking its JSON)"""
+
+    OPERATIONS = (
+        "cache_get", "cache_set", "history_append", "history_list", "history_count",
+        "history_page", "take_token", "usage_add", "usage_get", "usage_list", "acquire_lock", "release_lock"
+    )
+
+    def __init__(self, base_url: str, timeout_s: float = 5.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout_s = timeout_s
+
+    def _call(self, op: str, **kwargs) -> Any:
+        request = urllib.request.Request(
+            f"{self.base_url}/{op}",
+            data=json.dumps(kwargs).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout_s) as response:
+            return json.loads(response.read())["result"]
+
+    def cache_get(self, key):
+        return self._call("cache_get", key=key)
+
+    def cache_set(self, key, value, ttl_s):
+        self._call("cache_set", key=key, value=value, ttl_s=ttl_s)
+
+    def history_append(self, user, record):
+        return self._call("history_append", user=user, record=record)
+
+    def history_list(self, user, limit=5, offset=0):
+        return self._call("history_list", user=user, limit=limit, offset=offset)
+
+    def history_count(self, user):
+        return self._call("history_count", user=user)
+
+    def history_page(self, user, after_id=0, limit=1000):
+        return self._call("history_page", user=user, after_id=after_id, limit=limit)
+
+    def take_token(self, bucket, rate_per_s, capacity, cost=1.0):
+        return self._call("take_token", bucket=bucket, rate_per_s=rate_per_s, capacity=capacity, cost=cost)
+
+    def usage_add(self, subjects, period, requests, tokens, limits=None):
+        exceeded = self._call("usage_add", subjects=subjects, period=period, requests=requests, tokens=tokens,
+                              limits=limits)
+        return tuple(exceeded) if exceeded else None
+
+    def usage_get(self, subjects, period):
+        return self._call("usage_get", subjects=subjects, period=period)
+
+    def usage_list(self, period, prefix="", limit=100):
+        return self._call("usage_list", period=period, prefix=prefix, limit=limit)
+
+    def acquire_lock(self, name, owner, ttl_s):
+        return self._call("acquire_lock", name=name, owner=owner, ttl_s=ttl_s)
+
+    def release_lock(self, name, owner):
+        self._call("release_lock", name=name, owner=owner)
+
+
+class _StateServer(ThreadingHTTPServer):
+    # The default listen backlog (5) resets connections when many workers call at once
+    request_queue_size = 128
+
+
+def serve(backend: StateBackend, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    """HTTP front for a backend, so several app workers can share one state process"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            op = self.path.strip("/")
+            if op not in HttpBackend.OPERATIONS:
+                self.send_error(404, f"Unknown operation '{op}'")
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            kwargs = json.loads(self.rfile.read(length) or b"{}")
+            try:
+                body = json.dumps({"result": getattr(backend, op)(**kwargs)}).encode("utf-8")
+                status = 200
+            except Exception as e:
+                body = json.dumps({"error": str(e)}).encode("utf-8")
+                status = 500
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return _StateServer((host, port), Handler)
+
+
+_BACKEND: Optional[StateBackend] = None
+_BACKEND_LOCK = threading.Lock()
+
+
+def get_backend() -> StateBackend:
+    """Process-wide backend: STATE_BACKEND_URL for a shared server, else a local SQLite file"""
+    global _BACKEND
+    with _BACKEND_LOCK:
+        if _BACKEND is None:
+            url = os.getenv("STATE_BACKEND_URL")
+            _BACKEND = HttpBackend(url) if url else SQLiteBackend(os.getenv("STATE_DB_PATH", DEFAULT_DB_PATH))
+        return _BACKEND
+
+
+def main():
+    """Run the shared state server"""
+    parser = argparse.ArgumentParser(description="Shared state server for LinkedIn Post Generator workers")
+    parser.add_argument("--db", default=os.getenv("STATE_DB_PATH", DEFAULT_DB_PATH))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--retrain", action="store_true",
+                        help="Train a new compression dictionary from stored posts, recompress history and exit")
+    args = parser.parse_args()
+
+    if args.retrain:
+        backend = SQLiteBackend(args.db)
+        dict_id = backend.retrain_dictionary()
+        print(f"Trained dictionary {dict_id}; recompressed {backend.recompress_history()} history rows")
+        return
+
+    server = serve(SQLiteBackend(args.db), args.host, args.port)
+    print(f"Shared state server on http://{args.host}:{args.port} (db: {args.db})")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import hashlib
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Optional
+
+from Agents.SharedState import StateBackend
+
+
+# One small pool shared by every session, so speculation can never fan out unbounded
+_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="speculate")
+
+
+@dataclass(frozen=True)
+class GenerationSettings:
+    """Everything that determines a generated post"""
+    instructions: str
+    topic: str
+    audience: str
+    tone: str
+    length: str
+
+    def key(self) -> str:
+        raw = "\x1f".join((self.instructions.strip(), self.topic.strip().lower(), self.audience, self.tone, self.length))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def is_complete(self) -> bool:
+        return bool(self.topic.strip() and self.instructions.strip())
+
+
+class SpeculativeGenerator:
+    """Starts a background generation once the settings have been stable for a while
+
+    With a backend, the budget is a token bucket there under `budget_key`, so every tab and
+    worker of one user draws on the same allowance; without one it is local to this instance.
+    """
+
+    def __init__(self, generate: Callable[[GenerationSettings], str], debounce_s: float = 1.5,
+                 budget: int = 5, budget_window_s: float = 3600.0,
+                 executor: Optional[ThreadPoolExecutor] = None,
+                 backend: Optional[StateBackend] = None, budget_key: str = ""):
+        self.generate = generate
+        self.debounce_s = debounce_s
+        self.budget = budget
+        self.budget_window_s = budget_window_s
+        self.executor = executor or _EXECUTOR
+        self.backend = backend
+        self.budget_key = budget_key
+
+        self._lock = threading.Lock()
+        self._settings: Optional[GenerationSettings] = None
+        self._changed_at = 0.0
+        self._inflight: Optional[tuple[str, Future]] = None
+        self._results: Dict[str, str] = {}
+        self._started: Deque[float] = deque()
+        self._denied_at: Optional[float] = None
+
+    def observe(self, settings: GenerationSettings, now: Optional[float] = None):
+        """Record the current settings; a change restarts the debounce and cancels stale work"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if settings == self._settings:
+                return
+            self._settings = settings
+            self._changed_at = now
+            key = settings.key()
+            if self._inflight and self._inflight[0] != key:
+                # A running call cannot be interrupted; its result is simply dropped
+                self._inflight[1].cancel()
+                self._inflight = None
+            # Only the latest settings are worth keeping
+            self._results = {k: v for k, v in self._results.items() if k == key}
+
+    def budget_exhausted(self, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self.backend is not None:
+                # The shared bucket can't be read without spending; assume empty until one refill after a refusal
+                refill_s = self.budget_window_s / max(self.budget, 1)
+                return self._denied_at is not None and now - self._denied_at < refill_s
+            self._expire(now)
+            return len(self._started) >= self.budget
+
+    def _expire(self, now: float):
+        while self._started and now - self._started[0] > self.budget_window_s:
+            self._started.popleft()
+
+    def _spend_budget(self, now: float) -> bool:
+        if self.backend is not None:
+            allowed = self.backend.take_token(f"speculate:{self.budget_key}",
+                                              self.budget / self.budget_window_s, self.budget)
+            self._denied_at = None if allowed else now
+            return allowed
+        self._expire(now)
+        if len(self._started) >= self.budget:
+            return False
+        self._started.append(now)
+        return True
+
+    def maybe_start(self, now: Optional[float] = None) -> bool:
+        """Start speculating if the settings have settled; returns True if work was started"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            settings = self._settings
+            if settings is None or not settings.is_complete():
+                return False
+            if now - self._changed_at < self.debounce_s:
+                return False
+            key = settings.key()
+            if key in self._results or (self._inflight and self._inflight[0] == key):
+                return False
+            if not self._spend_budget(now):
+                return False
+
+            future = self.executor.submit(self.generate, settings)
+            self._inflight = (key, future)
+
+        future.add_done_callback(lambda done: self._finish(key, done))
+        return True
+
+    def _finish(self, key: str, future: Future):
+        with self._lock:
+            if self._inflight and self._inflight[1] is future:
+                self._inflight = None
+            if future.cancelled() or future.exception() is not None:
+                return
+            if self._settings is not None and self._settings.key() == key:
+                self._results[key] = future.result()
+
+    def status(self) -> str:
+        """'idle', 'running' or 'ready' for the current settings"""
+        with self._lock:
+            if self._settings is None:
+                return "idle"
+            key = self._settings.key()
+            if key in self._results:
+                return "ready"
+            if self._inflight and self._inflight[0] == key:
+                return "running"
+            return "idle"
+
+    def take(self, settings: GenerationSettings, timeout: Optional[float] = None) -> Optional[str]:
+        """Serve a speculative result for these settings, waiting on a matching in-flight call"""
+        key = settings.key()
+        with self._lock:
+            if key in self._results:
+                return self._results.pop(key)
+            inflight = self._inflight if self._inflight and self._inflight[0] == key else None
+
+        if inflight is None:
+            return None
+        try:
+            result = inflight[1].result(timeout=timeout)
+        except Exception:
+            return None
+        with self._lock:
+            self._results.pop(key, None)
+        return result
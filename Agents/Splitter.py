@@ -0,0 +1,201 @@
+import argparse
+import re
+import sys
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Tuple
+
+from langchain_core.prompts import PromptTemplate
+
+from Agents.Parser import parse_post
+from Agents.PostAgent import LinkedInPostAgent
+
+
+# LinkedIn's limit for one post
+POST_CHAR_LIMIT = 3000
+
+
+@dataclass(frozen=True)
+class SplitFormat:
+    """Per-item budget, and how items are numbered"""
+    name: str
+    max_chars: int
+    counter: str  # appended to each item; {i} and {n} are filled in
+    bridge_chars: int = 0  # kept free at the end of every item but the last, for a bridging line
+
+
+FORMATS = {
+    "thread": SplitFormat("thread", POST_CHAR_LIMIT, "\n\n({i}/{n})", bridge_chars=120),
+    "carousel": SplitFormat("carousel", 350, "\n\n{i}/{n}", bridge_chars=60)
+}
+
+BRIDGE_PROMPT = PromptTemplate(
+    input_variables=["kind", "topic", "boundaries", "max_chars"],
+    template="""
+A long LinkedIn post has been split into a {kind}. For each numbered break below, write ONE short
+line (under {max_chars} characters) that ends the earlier part and makes the reader continue to the
+next. Don't repeat the next part's content, don't use hashtags, and vary the wording.
+
+TOPIC: {topic}
+
+{boundaries}
+
+Return exactly one line per break, formatted as "[number] line". Nothing else.
+"""
+)
+
+# Only whitespace after terminal punctuation ends a sentence, so "3.5x" and "example.com" stay whole
+_SENTENCE_BREAK = re.compile(r"(?:(?<=[.!?])|(?<=[.!?][\"'”’)]))\s+")
+_BLANK = re.compile(r"\n[ \t]*\n\s*")
+_HEADING = re.compile(r"#{1,6} ")
+_BRIDGE_LINE = re.compile(r"^\s*\[(\d+)\]\s*(.+?)\s*$", re.MULTILINE)
+
+# Finer and finer places to break a paragraph that doesn't fit: lines, sentences, words
+_LEVELS = (re.compile(r"[ \t]*\n\s*"), _SENTENCE_BREAK, re.compile(r"\s+"))
+
+
+def _units(text: str, budget: int, joiner: str, level: int = 0) -> Iterator[Tuple[str, str]]:
+    """(joiner, piece) pairs that each fit the budget, split no finer than needed
+
+    Pieces are slices of the text and each joiner is the whitespace that stood before its
+    piece, so joining them back gives the original. Each level looks at each character
+    once, so this stays linear.
+    """
+    text = text.strip()
+    if not text:
+        return
+    if len(text) <= budget:
+        yield joiner, text
+        return
+    if level == len(_LEVELS):
+        # A single word longer than an item (e.g. a URL); cut it rather than lose it
+        for start in range(0, len(text), budget):
+            yield (joiner if start == 0 else ""), text[start:start + budget]
+        return
+    start = 0
+    for match in _LEVELS[level].finditer(text):
+        yield from _units(text[start:match.start()], budget, joiner, level + 1)
+        joiner, start = match.group(), match.end()
+    yield from _units(text[start:], budget, joiner, level + 1)
+
+
+def split_text(text: str, fmt: SplitFormat, bridge: bool = False) -> List[str]:
+    """Pack a long post or document into items within `fmt.max_chars`, without counters
+
+    Breaks fall between paragraphs where possible, then between sentences. A markdown heading
+    always starts a new carousel slide. The trailing hashtag line goes on the last item. One
+    greedy pass over the paragraphs, so time is linear in the length of the text.
+    """
+    tree = parse_post(text)
+    tags = tree.text(tree.hashtags).strip()
+    content = tree.content() if tags else text.strip()
+    # Room for the longest counter is kept up front, so numbering never pushes an item over
+    budget = fmt.max_chars - len(fmt.counter.format(i=999, n=999)) - (fmt.bridge_chars if bridge else 0)
+    if budget <= 0:
+        raise ValueError(f"{fmt.name} items are too small to split into")
+
+    items: List[str] = []
+    parts: List[str] = []
+    size = 0
+    for block in _BLANK.split(content):
+        block = block.strip()
+        if not block:
+            continue
+        if fmt.name == "carousel" and _HEADING.match(block) and parts:
+            items.append("".join(parts))
+            parts, size = [], 0
+        for joiner, unit in _units(block, budget, "\n\n"):
+            joiner = joiner if parts else ""
+            if parts and size + len(joiner) + len(unit) > budget:
+                items.append("".join(parts))
+                parts, size, joiner = [], 0, ""
+            parts.append(joiner + unit)
+            size += len(joiner) + len(unit)
+    if parts:
+        items.append("".join(parts))
+
+    if tags:
+        # Hashtags close the series; they get their own item only if the last one is full
+        if items and len(items[-1]) + 2 + len(tags) <= budget + (fmt.bridge_chars if bridge else 0):
+            items[-1] = f"{items[-1]}\n\n{tags}"
+        else:
+            items.append(tags)
+    return items
+
+
+def number_items(items: List[str], fmt: SplitFormat) -> List[str]:
+    if len(items) < 2:
+        return list(items)
+    return [item + fmt.counter.format(i=i, n=len(items)) for i, item in enumerate(items, 1)]
+
+
+def _first_sentence(text: str) -> str:
+    return _SENTENCE_BREAK.split(text.strip(), 1)[0]
+
+
+def _last_sentence(text: str) -> str:
+    return _SENTENCE_BREAK.split(text.strip())[-1]
+
+
+def add_bridges(llm, items: List[str], fmt: SplitFormat, topic: str = "") -> List[str]:
+    """Bridging lines between consecutive items, all written in a single model call
+
+    Items must have been split with `bridge=True`, which leaves room for the lines. A break
+    the model skips, or answers too long, is left without a bridge.
+    """
+    if len(items) < 2:
+        return list(items)
+    boundaries = "\n\n".join(
+        f"BREAK {i}:\nEnd of part {i}: {_last_sentence(parse_post(before).content() or before)}\n"
+        f"Start of part {i + 1}: {_first_sentence(after)}"
+        for i, (before, after) in enumerate(zip(items, items[1:]), 1)
+    )
+    chain = BRIDGE_PROMPT | llm
+    result = chain.invoke({"kind": "series of posts" if fmt.name == "thread" else "carousel",
+                           "topic": topic.strip() or "(not given)", "boundaries": boundaries,
+                           "max_chars": fmt.bridge_chars - 2})
+    content = result.content if hasattr(result, "content") else str(result)
+
+    bridges: Dict[int, str] = {}
+    for match in _BRIDGE_LINE.finditer(content):
+        line = match.group(2).strip().strip("\"'")
+        if len(line) + 2 <= fmt.bridge_chars:
+            bridges[int(match.group(1))] = line
+    return [f"{item}\n\n{bridges[i]}" if i in bridges else item for i, item in enumerate(items, 1)]
+
+
+def split_post(text: str, fmt: SplitFormat, llm=None, topic: str = "") -> List[str]:
+    """Split, optionally bridge (one call), then number"""
+    items = split_text(text, fmt, bridge=llm is not None)
+    if llm is not None:
+        items = add_bridges(llm, items, fmt, topic)
+    return number_items(items, fmt)
+
+
+def main():
+    """Split a long post or document from a file (or stdin)"""
+    parser = argparse.ArgumentParser(description="Split long content into a series of posts or carousel slides")
+    parser.add_argument("path", nargs="?", help="Text or markdown file; stdin if omitted")
+    parser.add_argument("--format", choices=list(FORMATS), default="thread")
+    parser.add_argument("--max-chars", type=int, help="Override the per-item budget")
+    parser.add_argument("--bridge", action="store_true", help="Add model-written bridging lines (one call)")
+    parser.add_argument("--topic", default="")
+    args = parser.parse_args()
+
+    if args.path:
+        with open(args.path, encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = sys.stdin.read()
+
+    fmt = FORMATS[args.format]
+    if args.max_chars:
+        fmt = SplitFormat(fmt.name, args.max_chars, fmt.counter, fmt.bridge_chars)
+    llm = LinkedInPostAgent().llm if args.bridge else None
+    for item in split_post(text, fmt, llm, args.topic):
+        print(f"--- {len(item)} chars")
+        print(item)
+        print()
+
+
+if __name__ == "__main__":
+    main()
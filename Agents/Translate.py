@@ -0,0 +1,151 @@
+import argparse
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence
+
+from langchain_core.prompts import PromptTemplate
+
+from Agents.PostAgent import LinkedInPostAgent
+from Agents.Sections import parse_post_sections, reconstruct_post
+from Agents.SharedState import StateBackend, get_backend, post_hash
+
+
+LANGUAGES = ("Spanish", "French", "German", "Portuguese", "Italian", "Dutch", "Polish", "Turkish",
+             "Arabic", "Hindi", "Indonesian", "Japanese", "Korean", "Chinese (Simplified)")
+
+# Translations of a given post text never change, so they can be kept for a while
+TRANSLATION_CACHE_TTL_S = 7 * 24 * 3600
+
+# One pool shared by every session; the router's scheduler still caps how many calls run at once
+_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="translate")
+
+# Hashtags stay as they are (they're how the post is found), so only these sections are translated
+TRANSLATED_SECTIONS = ("hook", "body", "cta")
+
+TRANSLATE_PROMPT = PromptTemplate(
+    input_variables=["language", "sections"],
+    template="""
+Translate this LinkedIn post into {language}. It is split into sections, each starting with a
+marker line such as [HOOK].
+
+RULES:
+- Keep every marker line exactly as it is, and translate the text under each marker
+- Keep the same line breaks, paragraphs and list items within each section
+- Keep #hashtags, @mentions, URLs, numbers and emojis unchanged
+- Sound natural to a native {language}-speaking LinkedIn audience, not word-for-word
+- Keep the tone and roughly the same length
+
+{sections}
+
+Return ONLY the marked sections in {language}. No notes, no quotes.
+"""
+)
+
+_MARKER = re.compile(r"^\[(" + "|".join(name.upper() for name in TRANSLATED_SECTIONS) + r")\][ \t]*$", re.MULTILINE)
+
+
+@dataclass
+class Translation:
+    language: str
+    text: str = ""
+    cached: bool = False
+    error: Optional[str] = None
+    latency_s: float = 0.0
+
+
+def cache_key(post: str, language: str) -> str:
+    return f"translation:{post_hash(post)}:{language.lower()}"
+
+
+def _split_marked(output: str, expected: Sequence[str]) -> Dict[str, str]:
+    """Sections back out of the marked model output; every expected one must be there"""
+    matches = list(_MARKER.finditer(output))
+    sections = {}
+    for match, following in zip(matches, matches[1:] + [None]):
+        end = following.start() if following else len(output)
+        sections[match.group(1).lower()] = output[match.end():end].strip()
+    missing = [name for name in expected if not sections.get(name)]
+    if missing:
+        raise ValueError(f"Translation lost the {', '.join(missing)} section(s)")
+    return sections
+
+
+def translate_post(llm, post: str, language: str) -> str:
+    """One post into one language, section by section, hashtags untouched"""
+    sections = parse_post_sections(post)
+    present = [name for name in TRANSLATED_SECTIONS if sections[name]]
+    if not present:
+        return post
+
+    chain = TRANSLATE_PROMPT | llm
+    result = chain.invoke({
+        "language": language,
+        "sections": "\n\n".join(f"[{name.upper()}]\n{sections[name]}" for name in present)
+    })
+    content = result.content if hasattr(result, "content") else str(result)
+    translated = _split_marked(content, present)
+    return reconstruct_post({**sections, **translated, "full": post})
+
+
+def translate_all(llm, post: str, languages: Sequence[str], backend: Optional[StateBackend] = None,
+                  executor: Optional[ThreadPoolExecutor] = None) -> Dict[str, Translation]:
+    """Translate into every language at once
+
+    Each language is cached under (post hash, language), so repeating a request or adding a
+    language only pays for what's new, and concurrent identical requests run once.
+    The rest go out in parallel, so the round takes about as long as the slowest one.
+    """
+    executor = executor or _EXECUTOR
+
+    def one(language: str) -> Translation:
+        started = time.perf_counter()
+        key = cache_key(post, language)
+        try:
+            if backend is None:
+                return Translation(language, translate_post(llm, post, language),
+                                   latency_s=time.perf_counter() - started)
+            cached = backend.cache_get(key)
+            if cached is not None:
+                return Translation(language, cached, cached=True, latency_s=time.perf_counter() - started)
+            text = backend.single_flight(key, lambda: translate_post(llm, post, language),
+                                         ttl_s=TRANSLATION_CACHE_TTL_S)
+            return Translation(language, text, latency_s=time.perf_counter() - started)
+        except Exception as e:
+            return Translation(language, error=str(e), latency_s=time.perf_counter() - started)
+
+    unique = list(dict.fromkeys(languages))
+    return dict(zip(unique, executor.map(one, unique)))
+
+
+def main():
+    """Translate a post from a file (or stdin) into several languages"""
+    parser = argparse.ArgumentParser(description="Translate a LinkedIn post, keeping its sections")
+    parser.add_argument("path", nargs="?", help="Post text file; stdin if omitted")
+    parser.add_argument("--to", required=True, help=f"Comma-separated languages, e.g. {','.join(LANGUAGES[:3])}")
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args()
+
+    if args.path:
+        with open(args.path, encoding="utf-8") as f:
+            post = f.read()
+    else:
+        post = sys.stdin.read()
+
+    agent = LinkedInPostAgent()
+    started = time.perf_counter()
+    results = translate_all(agent.llm, post, [language.strip() for language in args.to.split(",") if language.strip()],
+                            backend=None if args.no_cache else get_backend())
+    for translation in results.values():
+        status = "cached" if translation.cached else f"{translation.latency_s:.1f}s"
+        print(f"=== {translation.language} ({translation.error or status})")
+        if not translation.error:
+            print(translation.text)
+        print()
+    print(f"{len(results)} languages in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+import os
+import ssl
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+import anyio
+import httpx
+
+# HTTP/2 needs the h2 package; without it connections are HTTP/1.1 keep-alive
+try:
+    import h2  # noqa: F401
+    HAS_H2 = True
+except ImportError:
+    HAS_H2 = False
+
+try:
+    import certifi
+    _CA_FILE = certifi.where()
+except ImportError:
+    _CA_FILE = None
+
+
+# Cheap unauthenticated endpoint on the Gemini API host, for health checks
+HEALTH_URL = "https://generativelanguage.googleapis.com/$discovery/rest?version=v1beta"
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    max_connections: int = 20
+    max_keepalive: int = 10
+    keepalive_expiry_s: float = 60.0
+    max_in_flight: int = 16
+    acquire_timeout_s: float = 30.0
+    http2: bool = HAS_H2
+
+    @classmethod
+    def from_env(cls) -> "PoolSettings":
+        return cls(
+            max_connections=int(os.getenv("LLM_POOL_CONNECTIONS", "20")),
+            max_keepalive=int(os.getenv("LLM_POOL_KEEPALIVE", "10")),
+            keepalive_expiry_s=float(os.getenv("LLM_KEEPALIVE_S", "60")),
+            max_in_flight=int(os.getenv("LLM_MAX_IN_FLIGHT", "16")),
+            http2=HAS_H2 and os.getenv("LLM_HTTP2", "1") != "0"
+        )
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Response body that gives back its in-flight slot when closed"""
+
+    def __init__(self, stream: httpx.SyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._release()
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+class PooledTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """One bounded keep-alive connection pool for every model client in the process
+
+    Plugs into httpx as a transport (sync and async), so each SDK client keeps its own
+    `httpx.Client` but they all share these connections. A request holds an in-flight
+    slot until its response is closed; beyond `max_in_flight` callers wait, rather than
+    opening ever more connections. Connection setup is counted through httpcore's trace
+    hook, which is what makes reuse visible in `stats()`.
+    """
+
+    def __init__(self, settings: Optional[PoolSettings] = None, verify: Any = None):
+        self.settings = settings or PoolSettings()
+        if verify is None:
+            verify = ssl.create_default_context(cafile=os.environ.get("SSL_CERT_FILE", _CA_FILE),
+                                                capath=os.environ.get("SSL_CERT_DIR"))
+        limits = httpx.Limits(max_connections=self.settings.max_connections,
+                              max_keepalive_connections=self.settings.max_keepalive,
+                              keepalive_expiry=self.settings.keepalive_expiry_s)
+        self._sync = httpx.HTTPTransport(verify=verify, limits=limits, http2=self.settings.http2)
+        self._async = httpx.AsyncHTTPTransport(verify=verify, limits=limits, http2=self.settings.http2)
+        self._slots = threading.BoundedSemaphore(self.settings.max_in_flight)
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "errors": 0, "connections": 0, "tls_handshakes": 0, "waited": 0}
+        self._wait_s = 0.0
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self.last_health: Optional[Dict[str, Any]] = None
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def _on_trace(self, event: str):
+        if event == "connection.connect_tcp.complete":
+            self._count("connections")
+        elif event == "connection.start_tls.complete":
+            self._count("tls_handshakes")
+
+    def _acquired(self, started: float):
+        with self._lock:
+            self._wait_s += time.monotonic() - started
+            self._counters["requests"] += 1
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+
+    def _timeout(self) -> httpx.PoolTimeout:
+        return httpx.PoolTimeout(f"No free LLM connection slot within {self.settings.acquire_timeout_s}s")
+
+    def _acquire(self):
+        started = time.monotonic()
+        if not self._slots.acquire(blocking=False):
+            self._count("waited")
+            if not self._slots.acquire(timeout=self.settings.acquire_timeout_s):
+                raise self._timeout()
+        self._acquired(started)
+
+    async def _aacquire(self):
+        # A blocking acquire would stall the event loop, so poll instead
+        started = time.monotonic()
+        if not self._slots.acquire(blocking=False):
+            self._count("waited")
+            while not self._slots.acquire(blocking=False):
+                if time.monotonic() - started > self.settings.acquire_timeout_s:
+                    raise self._timeout()
+                await anyio.sleep(0.01)
+        self._acquired(started)
+
+    def _releaser(self) -> Callable[[], None]:
+        released = []
+
+        def release():
+            # Closing twice must not free two slots
+            if released:
+                return
+            released.append(True)
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+        return release
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self._acquire()
+        release = self._releaser()
+        outer = request.extensions.get("trace")
+
+        def trace(event: str, info: Dict[str, Any]):
+            self._on_trace(event)
+            if outer:
+                outer(event, info)
+
+        request.extensions = {**request.extensions, "trace": trace}
+        try:
+            response = self._sync.handle_request(request)
+        except BaseException:
+            self._count("errors")
+            release()
+            raise
+        return httpx.Response(response.status_code, headers=response.headers,
+                              stream=_ReleasingStream(response.stream, release), extensions=response.extensions)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await self._aacquire()
+        release = self._releaser()
+        outer = request.extensions.get("trace")
+
+        async def trace(event: str, info: Dict[str, Any]):
+            self._on_trace(event)
+            if outer:
+                await outer(event, info)
+
+        request.extensions = {**request.extensions, "trace": trace}
+        try:
+            response = await self._async.handle_async_request(request)
+        except BaseException:
+            self._count("errors")
+            release()
+            raise
+        return httpx.Response(response.status_code, headers=response.headers,
+                              stream=_AsyncReleasingStream(response.stream, release), extensions=response.extensions)
+
+    def check(self, url: str = HEALTH_URL, timeout_s: float = 5.0) -> Dict[str, Any]:
+        """One small request through the pool: is the API host reachable, and how fast"""
+        started = time.perf_counter()
+        try:
+            with httpx.Client(transport=self, timeout=timeout_s) as client:
+                response = client.get(url)
+            result = {"ok": response.status_code < 500, "status": response.status_code}
+        except httpx.HTTPError as e:
+            result = {"ok": False, "error": str(e)}
+        result["latency_ms"] = (time.perf_counter() - started) * 1000
+        result["checked_at"] = time.time()
+        self.last_health = result
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            requests = counters["requests"]
+            return {
+                **counters,
+                "in_flight": self._in_flight,
+                "peak_in_flight": self._peak_in_flight,
+                "max_in_flight": self.settings.max_in_flight,
+                "max_connections": self.settings.max_connections,
+                "http2": self.settings.http2,
+                "reuse_ratio": 1 - counters["connections"] / requests if requests else 0.0,
+                "mean_wait_ms": self._wait_s / requests * 1000 if requests else 0.0,
+                "health": self.last_health
+            }
+
+    # httpx closes a client's transport along with the client, but the pool outlives any one client
+    def close(self):
+        pass
+
+    async def aclose(self):
+        pass
+
+    def shutdown(self):
+        """Really close the pooled connections"""
+        self._sync.close()
+
+
+_SHARED: Optional[PooledTransport] = None
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_transport() -> PooledTransport:
+    """Process-wide pool, configured from the environment"""
+    global _SHARED
+    with _SHARED_LOCK:
+        if _SHARED is None:
+            _SHARED = PooledTransport(PoolSettings.from_env())
+        return _SHARED
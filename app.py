@@ -1,9 +1,33 @@
 import os
+import html
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 import streamlit as st
-from typing import Dict, Optional
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import PromptTemplate
 from dotenv import load_dotenv
+from Agents.Preview import PreviewRenderer
+from Agents.PostAgent import LinkedInPostAgent
+from Agents.Parser import parse_post
+from Agents.Speculation import GenerationSettings, SpeculativeGenerator
+from Agents.Session import PostStore, SessionState
+from Agents.SharedState import DEFAULT_DB_PATH, StateBackend, get_backend, post_hash
+from Agents.Export import HAS_PYARROW, ExportFilter, commit_watermark, export_history
+from Agents.Importer import HAS_OPENPYXL, import_topics, topic_key
+from Agents.Jobs import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, Deferred, Job, JobQueue, WorkerPool
+from Agents.Quota import DEFAULT_TENANT, Caller, QuotaExceeded, QuotaLimits, UsageMeter
+from Agents.Scoring import score_draft, score_drafts, tips
+from Agents.Lint import fix_post, lint_post, repair_post
+from Agents.Hashtags import HashtagIndex
+from Agents.Checkpoint import DEFAULT_CHECKPOINT_DIR, CheckpointStore
+from Agents.Transport import shared_transport
+from Agents.Experiments import MIN_SAMPLES
+from Agents.Fallback import fallback_post
+from Agents.Router import UpstreamUnavailable, is_outage
+from Agents.Translate import LANGUAGES, translate_all
+from Agents.Splitter import FORMATS, split_post
 
 # Try to import pyperclip, fallback if not available
 try:
@@ -216,6 +240,37 @@ st.markdown("""
         margin: 0 auto;
     }
     
+    /* Block-rendered preview card */
+    .st-key-preview_card {
+        background: white;
+        padding: 24px;
+        border-radius: 12px;
+        border: 1px solid #e0e0e0;
+        box-shadow: 0 4px 12px rgba(0,0,0,0.08);
+        max-width: 600px;
+        margin: 0 auto;
+        gap: 0;
+    }
+    
+    .preview-para, .preview-folded {
+        white-space: pre-wrap;
+        color: #1d1d1f;
+        font-size: 15px;
+        line-height: 1.6;
+        margin-bottom: 12px;
+    }
+    
+    .preview-fold summary {
+        color: #666666;
+        cursor: pointer;
+        list-style: none;
+        margin-bottom: 12px;
+    }
+    
+    .preview-fold[open] summary {
+        display: none;
+    }
+    
     /* Responsive adjustments */
     @media (max-width: 768px) {
         h1 {
@@ -233,282 +288,1030 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-class LinkedInPostAgent:
-    """Agent for generating LinkedIn posts"""
+# --- CACHED RESOURCES ---
 
-    def __init__(self, api_key: Optional[str] = None):
-        if api_key:
-            os.environ["GOOGLE_API_KEY"] = api_key
+@st.cache_resource(show_spinner=False)
+def get_agent(api_key: str) -> LinkedInPostAgent:
+    """Share one agent (and its catalogs) across reruns and sessions"""
+    return LinkedInPostAgent(api_key=api_key, meter=UsageMeter(get_backend(), QuotaLimits.from_env()))
 
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash-lite",
-            temperature=0.7,  # Reduced for better control
-            max_output_tokens=1500  # Reduced to prevent overly long outputs
-        )
 
-        self.prompt_templates = self._load_prompt_templates()
-        self.audiences = self._load_audiences()
-        self.default_tone = "Professional"
-        self.default_length = "Medium"
-
-    def _load_prompt_templates(self) -> Dict[str, str]:
-        return {
-            "Personal Story": (
-                "Write a LinkedIn post sharing a personal or experiential story related to {topic}. "
-                "Start with a relatable moment or challenge. "
-                "Build the narrative with specific details. "
-                "Highlight growth or learning. "
-                "End with a takeaway or reflective question."
-            ),
-            "Quick Tips List": (
-                "Write a LinkedIn post offering actionable tips about {topic}. "
-                "Open with a bold hook. "
-                "List 3–5 concise tips. "
-                "End with a question."
-            ),
-            "Controversial Opinion": (
-                "Challenge common beliefs about {topic}. "
-                "Open with a respectful hot take. "
-                "Explain your reasoning. "
-                "End with a discussion-driving question."
-            ),
-            "Behind-the-Scenes": (
-                "Reveal behind-the-scenes insights about {topic}. "
-                "Explain processes and trade-offs. "
-                "Share why it matters."
-            ),
-            "Trend Analysis": (
-                "Analyze a trend related to {topic}. "
-                "Explain what's changing, why it matters, and what to do next."
-            ),
-            "Motivational Message": (
-                "Write an uplifting post about {topic}. "
-                "Acknowledge a challenge. "
-                "Shift to growth and encouragement."
-            ),
-            "Lesson Learned": (
-                "Share a clear lesson learned about {topic}. "
-                "Explain briefly how it was learned. "
-                "End with a reflective question."
-            ),
-            "Myth vs Reality": (
-                "Debunk a common myth about {topic}. "
-                "Contrast myth vs reality clearly."
-            ),
-            "How-To / Framework": (
-                "Explain how to approach {topic} using a simple framework."
-            )
-        }
+@st.cache_resource(show_spinner=False)
+def get_post_store() -> PostStore:
+    """Post bodies for every session in this process; sessions only hold ids into it"""
+    backend = get_backend()
+    # Share the backend's trained dictionary when it has one
+    return PostStore(max_bytes=POST_STORE_MAX_BYTES, codec=getattr(backend, "codec", None))
 
-    def _load_audiences(self) -> Dict[str, str]:
-        return {
-            "Startup Founders": "Entrepreneurs building or scaling startups",
-            "Marketing Professionals": "Marketers focused on growth and branding",
-            "Software Developers": "Engineers focused on tech and career growth",
-            "AI / ML / GenAI Professionals": (
-                "Professionals working with AI, ML, GenAI, and LLM systems"
-            ),
-            "Data Analysts & Data Scientists": (
-                "Professionals focused on analytics, insights, and data-driven decisions"
-            ),
-            "Sales Professionals": "Sales professionals focused on revenue",
-            "Job Seekers": "Professionals exploring new roles",
-            "Business Leaders": "Managers and executives",
-            "Freelancers": "Independent professionals building a brand",
-            "Students & Early Career": "Students and early professionals",
-            "Creators & Builders": "Content creators and builders",
-            "General Professionals": "Broad professional audience"
-        }
 
-    def _humanization_rules(self) -> str:
-        return """
-AI WRITING RULES (TRANSPARENT & LINKEDIN-NATIVE):
-- Write clearly and professionally.
-- Do not pretend to be a specific human.
-- Keep paragraphs short (1–2 sentences).
-- Avoid buzzwords and clichés.
-- No fake personal experiences.
-- Focus on usefulness and clarity.
-"""
+@st.cache_resource(show_spinner=False)
+def get_checkpoints() -> CheckpointStore:
+    store = CheckpointStore(CHECKPOINT_DIR)
+    store.prune()
+    return store
 
-    def generate_post(self, user_instructions: str, topic: str, audience: str, tone: str = "Professional", length: str = "Medium") -> str:
-        tone_instructions = {
-            "Professional": (
-                "Formal, polished, and business-appropriate. "
-                "Clear and confident language with a respectful, authoritative voice."
-            ),
-            "Casual": (
-                "Relaxed and conversational. "
-                "Friendly, natural, and approachable—like talking to a colleague over coffee."
-            ),
-            "Conversational": (
-                "Personal and engaging. "
-                "Uses simple language, short sentences, and direct questions to involve the reader."
-            ),
-            "Controversial": (
-                "Bold and thought-provoking while remaining respectful. "
-                "Challenges conventional wisdom and invites discussion without being offensive."
-            ),
-            "Empathetic": (
-                "Warm, supportive, and emotionally intelligent. "
-                "Acknowledges challenges, validates experiences, and builds human connection."
-            ),
-            "Educational": (
-                "Informative and insight-driven. "
-                "Explains concepts clearly, shares practical examples, and focuses on learning value."
-            ),
-            "Inspirational": (
-                "Motivational and uplifting. "
-                "Encourages growth, confidence, and action through positive messaging."
-            ),
-            "Storytelling": (
-                "Narrative-driven and relatable. "
-                "Uses real-life experiences, lessons, and reflections to deliver a message."
-            ),
-            "Direct": (
-                "Clear, concise, and to the point. "
-                "Minimal fluff, strong statements, and actionable takeaways."
-            )
-        }
 
-        length_instructions = {
-            "Short": {
-                "description": "Very concise and skimmable. 1–2 short paragraphs.",
-                "word_count": "50–100 words MAXIMUM",
-                "strict_limit": 100
-            },
-            "Medium": {
-                "description": "Standard LinkedIn post. 3–5 short paragraphs with line breaks.",
-                "word_count": "150–250 words MAXIMUM",
-                "strict_limit": 250
-            },
-            "Long": {
-                "description": "In-depth, value-driven. 6–10 short paragraphs with strong spacing.",
-                "word_count": "300–500 words MAXIMUM",
-                "strict_limit": 500
-            }
-        }
+@st.cache_resource(show_spinner=False)
+def _tenant_hashtag_index(tenant: str) -> HashtagIndex:
+    return HashtagIndex(get_backend(), tenant)
 
-        length_config = length_instructions.get(length, length_instructions["Medium"])
-        
-        final_prompt = PromptTemplate(
-            input_variables=["user_instructions", "topic", "audience", "rules", "tone_guide", "length_desc", "word_limit"],
-            template="""
-You are a seasoned LinkedIn content creator known for high-engagement, human-sounding posts.
-
-CRITICAL: You MUST strictly follow the word count limit specified below. This is non-negotiable.
-
-CONTEXT & GOAL:
-Write a LinkedIn post that aligns with the user's intent and feels authentic, thoughtful, and platform-native.
-
-USER INSTRUCTIONS:
-{user_instructions}
-
-POST DETAILS:
-- Topic: {topic}
-- Target Audience: {audience}
-- Tone: {tone_guide}
-
-LENGTH REQUIREMENT (STRICTLY ENFORCE):
-{length_desc}
-ABSOLUTE WORD LIMIT: {word_limit}
-You MUST stay within this word count. Count your words as you write. Do NOT exceed this limit under any circumstances.
-
-CONTENT RULES:
-{rules}
-
-STRUCTURE & STYLE GUIDELINES:
-- Open with a strong hook in the first 1–2 lines (bold statement, question, or insight)
-- Use short paragraphs (1–2 sentences max) with frequent line breaks
-- Avoid emojis unless they naturally fit the selected tone
-- Avoid generic phrases, clichés, and obvious AI patterns
-- Use clear, simple language—write like a real LinkedIn creator, not a blog
-- Be concise and punchy - every word must earn its place
-
-ENGAGEMENT OPTIMIZATION:
-- Share a clear insight, lesson, or takeaway
-- Encourage interaction with a thoughtful question or call-to-action
-- Do not over-sell or sound promotional
-
-HASHTAGS & ENDING:
-- End the post with 3–5 relevant, niche-specific hashtags
-- Place hashtags on a new line at the very end
-- Do not include hashtags within the main content
-
-FINAL CHECK BEFORE SUBMITTING:
-1. Count the total words (excluding hashtags)
-2. Ensure you are UNDER the {word_limit} word limit
-3. The post should feel human, credible, and experience-driven
-4. Prioritize clarity, relatability, and skimmability
-5. If you're over the limit, cut content aggressively - quality over quantity
-
-Write the LinkedIn post now. Remember: STAY UNDER {word_limit} WORDS.
+
+def get_hashtag_index() -> HashtagIndex:
+    """Hashtag co-occurrence index over the tenant's saved posts; catches up incrementally"""
+    return _tenant_hashtag_index(get_tenant_id())
+
+
+@st.cache_data(show_spinner=False)
+def preview_header_html(initial: str, audience_name: str) -> str:
+    """Static profile header of the preview card"""
+    return f"""
+            <div style="display: flex; align-items: center; margin-bottom: 16px; padding-bottom: 16px; border-bottom: 1px solid #e0e0e0;">
+                <div style="
+                    width: 56px; 
+                    height: 56px; 
+                    background: linear-gradient(135deg, #0a66c2, #004182); 
+                    border-radius: 50%; 
+                    margin-right: 12px;
+                    display: flex;
+                    align-items: center;
+                    justify-content: center;
+                    color: white;
+                    font-weight: bold;
+                    font-size: 24px;
+                    box-shadow: 0 2px 8px rgba(10, 102, 194, 0.3);
+                ">
+                    {html.escape(initial)}
+                </div>
+                <div>
+                    <div style="font-weight: 700; color: #000000; font-size: 16px; margin-bottom: 2px;">Your Profile Name</div>
+                    <div style="font-size: 13px; color: #666666;">{html.escape(audience_name)} • Just now</div>
+                </div>
+            </div>
+    """
+
+
+PREVIEW_FOOTER_HTML = """
+            <div style="
+                display: flex; 
+                justify-content: space-around; 
+                padding-top: 12px; 
+                border-top: 1px solid #e0e0e0;
+                color: #666666;
+                font-size: 14px;
+                font-weight: 600;
+            ">
+                <span>👍 Like</span>
+                <span>💬 Comment</span>
+                <span>🔁 Repost</span>
+                <span>📤 Send</span>
+            </div>
 """
-        )
 
-        chain = final_prompt | self.llm
+SPECULATION_DEBOUNCE_S = 1.5
+SPECULATION_BUDGET_PER_HOUR = 5
+
+# Per-user generation rate limit, shared by every worker through the state backend
+GENERATION_RATE_PER_MIN = 10
+GENERATION_BURST = 10
+RESPONSE_CACHE_TTL_S = 600
+
+# Past this wait (or while the circuit breaker is open) the user gets an offline draft and the real
+# generation is queued to replace it; the abandoned call keeps running and fills the response cache
+DEGRADE_AFTER_S = float(os.getenv("DEGRADE_AFTER_S", "25"))
+# How long Generate waits on a matching speculative call before generating normally
+SPECULATION_TAKE_TIMEOUT_S = DEGRADE_AFTER_S / 5
+DEGRADED_POLL_S = 5
+
+# Scheduled posts run on a small background pool, e.g. QUEUE_ACTIVE_HOURS=22-6 for off-peak only
+QUEUE_WORKERS = int(os.getenv("QUEUE_WORKERS", "1"))
+QUEUE_ACTIVE_HOURS = os.getenv("QUEUE_ACTIVE_HOURS")
+PRIORITY_LABELS = {"Low": PRIORITY_LOW, "Normal": PRIORITY_NORMAL, "High": PRIORITY_HIGH}
+
+# Compressed post bodies kept in memory per process; older ones spill to .state/posts
+POST_STORE_MAX_BYTES = int(os.getenv("POST_STORE_MAX_MB", "16")) * 1024 * 1024
+
+# Session checkpoints, so a restart or reconnect resumes where the user was
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", DEFAULT_CHECKPOINT_DIR)
+
+# Identity set by an authenticating reverse proxy; without these, users are only ?uid= bookmarks
+AUTH_USER_HEADER = os.getenv("AUTH_USER_HEADER")
+AUTH_TENANT_HEADER = os.getenv("AUTH_TENANT_HEADER")
+CONFIG_KEYS = ("cfg_audience", "cfg_tone", "cfg_length", "cfg_use_custom", "cfg_speculative", "cfg_template",
+               "cfg_instructions", "cfg_topic", "cfg_languages")
+
+
+def get_session() -> SessionState:
+    if 'session' not in st.session_state:
+        st.session_state.session = SessionState(get_user_id())
+    return st.session_state.session
+
+
+def get_current_post() -> str:
+    return get_session().post(get_post_store())
+
+
+def set_current_post(post: str):
+    """Make a post the current one and reset the editor to it"""
+    get_session().set_post(get_post_store(), post)
+    st.session_state.edit_area = post
+
+
+def checkpoint_session():
+    """Persist this session's settings, post, editor text and any in-flight generation (only if changed)"""
+    get_checkpoints().save(get_user_id(), {
+        "config": {key: st.session_state[key] for key in CONFIG_KEYS if key in st.session_state},
+        "post": get_current_post(),
+        "editor": st.session_state.get("edit_area"),
+        "pending": st.session_state.get("pending_generation"),
+        "degraded": st.session_state.get("degraded")
+    })
+
+
+def restore_session(agent: LinkedInPostAgent, backend: StateBackend):
+    """First run of a session: resume this uid's checkpoint, delivering a generation that finished unseen"""
+    if st.session_state.get("restored"):
+        return
+    st.session_state.restored = True
+    st.session_state.cfg_length = "Medium" if "Medium" in agent.lengths else next(iter(agent.lengths))
+
+    state = get_checkpoints().load(get_user_id())
+    if not state:
+        return
+    catalogs = {"cfg_audience": agent.audiences, "cfg_tone": agent.tones, "cfg_length": agent.lengths,
+                "cfg_template": agent.prompt_templates}
+    for key, value in state.get("config", {}).items():
+        # Catalog entries may have been renamed since the checkpoint
+        if key in CONFIG_KEYS and (key not in catalogs or value in catalogs[key]):
+            st.session_state[key] = value
+    if "cfg_languages" in st.session_state:
+        st.session_state.cfg_languages = [language for language in st.session_state.cfg_languages
+                                          if language in LANGUAGES]
+    if state.get("post"):
+        set_current_post(state["post"])
+    if state.get("editor") is not None:
+        st.session_state.edit_area = state["editor"]
+
+    if state.get("degraded"):
+        # Still waiting on the queued real generation; the status fragment picks it up
+        st.session_state.degraded = state["degraded"]
+    pending = state.get("pending")
+    if pending:
+        # The response cache outlives the process, so a finished generation costs nothing to recover
+        post = backend.cache_get(response_key(agent, pending, get_user_id()))
+        # A fresh take on the same settings finds the post it was replacing still cached; that's no recovery
+        if post and post != state.get("post"):
+            set_current_post(post)
+            st.session_state.restore_notice = "✅ Recovered the post that finished generating while you were away"
+        else:
+            st.session_state.restore_notice = "ℹ️ Your last generation was interrupted. Press Generate to run it again"
+        checkpoint_session()
+    elif state.get("post"):
+        st.session_state.restore_notice = "✅ Restored your last session"
+
+
+SECTION_LABELS = {"hook": "Hook", "body": "Body", "cta": "Call-to-Action", "hashtags": "Hashtags"}
+
+
+def regenerate_section_callback(agent: LinkedInPostAgent, topic: str, audience_desc: str, tone: str):
+    """Button callback: splice a regenerated section into the editor before it renders"""
+    section = st.session_state.regen_section
+    try:
+        new_post = agent.regenerate_section(st.session_state.edit_area, section, topic or "", audience_desc, tone,
+                                            caller=get_caller())
+        st.session_state.edit_area = new_post
+        st.session_state.regen_notice = ("success", f"✅ {SECTION_LABELS[section]} regenerated!")
+    except Exception as e:
+        st.session_state.regen_notice = ("error", f"❌ {str(e)}")
+
+
+def add_hashtag_callback(tag: str):
+    """Button callback: append a suggested tag to the post's hashtag line"""
+    tree = parse_post(st.session_state.edit_area)
+    if tree.hashtags:
+        st.session_state.edit_area = f"{tree.source[:tree.hashtags.end].rstrip()} {tag}{tree.source[tree.hashtags.end:]}"
+    else:
+        st.session_state.edit_area = f"{tree.source.rstrip()}\n\n{tag}"
+
+
+def autofix_callback():
+    """Button callback: apply the deterministic rule fixes to the editor"""
+    result = fix_post(st.session_state.edit_area)
+    st.session_state.edit_area = result.text
+    st.session_state.lint_notice = ("success", f"✅ Fixed {len(result.fixed)} issue(s)")
+
+
+def repair_callback(agent: LinkedInPostAgent, topic: str, audience_desc: str, tone: str):
+    """Button callback: fix what the rules can, and regenerate only the sections still breaking them"""
+    try:
+        result = repair_post(agent, st.session_state.edit_area, topic or "", audience_desc, tone, caller=get_caller())
+        st.session_state.edit_area = result.text
+        repaired = ", ".join(SECTION_LABELS[section] for section in result.repaired) or "nothing"
+        st.session_state.lint_notice = ("success", f"✅ Fixed {len(result.fixed)} issue(s); rewrote {repaired}")
+    except Exception as e:
+        st.session_state.lint_notice = ("error", f"❌ {str(e)}")
+
+
+@st.cache_resource(show_spinner=False)
+def get_worker_pool(api_key: str) -> WorkerPool:
+    """One background pool per process; jobs are claimed atomically, so workers can share a queue"""
+    agent = get_agent(api_key)
+    backend = get_backend()
+
+    def handle(job: Job) -> str:
+        payload = job.payload
+        caller = Caller(job.user, payload.get("tenant", DEFAULT_TENANT), "batch")
+
+        def compute() -> str:
+            return agent.generate_post(payload["instructions"], payload["topic"], payload["audience_desc"],
+                                       payload["tone"], payload["length"], caller=caller)
 
         try:
-            result = chain.invoke({
-                "user_instructions": user_instructions.strip(),
-                "topic": topic.strip(),
-                "audience": audience.strip(),
-                "rules": self._humanization_rules(),
-                "tone_guide": tone_instructions.get(tone, tone_instructions["Professional"]),
-                "length_desc": length_config["description"],
-                "word_limit": length_config["strict_limit"]
+            if payload.get("replace_key"):
+                # Replacing an offline draft: the interactive call it stood in for may still finish first
+                post = backend.single_flight(response_key(agent, payload["replace_key"], job.user), compute,
+                                             ttl_s=RESPONSE_CACHE_TTL_S)
+            else:
+                post = compute()
+        except QuotaExceeded as e:
+            # Out of quota isn't a failure; try again once the quota resets
+            raise Deferred(UsageMeter.period_end(), str(e))
+        except UpstreamUnavailable as e:
+            # Nor is an outage; wait for the circuit breaker's next probe
+            raise Deferred(e.retry_at, str(e))
+        backend.history_append(job.user, {
+            "post": post,
+            "topic": payload["topic"],
+            "audience": payload["audience"],
+            "template": payload["template"],
+            "tone": payload["tone"],
+            "length": payload["length"],
+            "tenant": payload.get("tenant", DEFAULT_TENANT),
+            "job_id": job.id,
+            "created_at": time.time()
+        })
+        return post
+
+    active_hours = tuple(int(h) for h in QUEUE_ACTIVE_HOURS.split("-")) if QUEUE_ACTIVE_HOURS else None
+    pool = WorkerPool(JobQueue(os.getenv("STATE_DB_PATH", DEFAULT_DB_PATH)), handle,
+                      workers=QUEUE_WORKERS, active_hours=active_hours)
+    pool.start()
+    return pool
+
+
+def get_user_id() -> str:
+    """The signed-in user when an auth proxy vouches for one, else a stable id kept in the URL
+
+    A `?uid=` is only a bookmark: anyone with the link shares its state, and a new one starts
+    a fresh per-user quota. Deployments that enforce per-user quotas set AUTH_USER_HEADER to
+    the header their auth proxy fills in.
+    """
+    if AUTH_USER_HEADER:
+        user = st.context.headers.get(AUTH_USER_HEADER)
+        if not user:
+            st.error("🔒 Sign-in required.")
+            st.stop()
+        return user
+    uid = st.query_params.get("uid")
+    if not uid:
+        uid = uuid.uuid4().hex
+        st.query_params["uid"] = uid
+    return uid
+
+
+def get_tenant_id() -> str:
+    """Tenant from the auth proxy's header when configured, else the deployment's; never the URL"""
+    if AUTH_TENANT_HEADER:
+        return st.context.headers.get(AUTH_TENANT_HEADER) or DEFAULT_TENANT
+    return os.getenv("TENANT_ID", DEFAULT_TENANT)
+
+
+def get_caller(klass: str = "interactive") -> Caller:
+    return Caller(get_user_id(), get_tenant_id(), klass)
+
+
+def response_key(agent: LinkedInPostAgent, settings_key: str, user: str) -> str:
+    """Shared response-cache key; while an experiment runs, each arm caches its own posts"""
+    if agent.experiment:
+        return f"post:{settings_key}:{agent.experiment.assign(user)}"
+    return f"post:{settings_key}"
+
+
+def cached_generate(agent: LinkedInPostAgent, backend: StateBackend, settings: GenerationSettings,
+                    caller: Caller, fresh: bool = False) -> str:
+    """Generate through the shared response cache; concurrent identical requests run once"""
+    key = response_key(agent, settings.key(), caller.user)
+    variant = agent.experiment.assign(caller.user) if agent.experiment else None
+
+    def compute() -> str:
+        return agent.generate_post(settings.instructions, settings.topic, settings.audience,
+                                   settings.tone, settings.length, caller=caller, variant=variant)
+
+    if fresh:
+        post = compute()
+        backend.cache_set(key, post, RESPONSE_CACHE_TTL_S)
+        return post
+    return backend.single_flight(key, compute, ttl_s=RESPONSE_CACHE_TTL_S)
+
+
+@st.cache_resource(show_spinner=False)
+def get_generation_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="generate")
+
+
+def generate_with_deadline(agent: LinkedInPostAgent, backend: StateBackend, settings: GenerationSettings,
+                           caller: Caller, fresh: bool = False) -> str:
+    """cached_generate, but give up waiting after DEGRADE_AFTER_S (the call itself carries on)"""
+    future = get_generation_executor().submit(cached_generate, agent, backend, settings, caller, fresh)
+    return future.result(timeout=DEGRADE_AFTER_S)
+
+
+def serve_degraded(agent: LinkedInPostAgent, backend: StateBackend, queue: JobQueue, user_id: str,
+                   settings: GenerationSettings, payload: dict, reason: str):
+    """Show an offline draft now and queue the real generation to replace it"""
+    draft = fallback_post(backend, user_id, settings.topic, payload["template"],
+                          agent.prompt_templates.get(payload["template"], settings.instructions),
+                          settings.tone, settings.length, get_hashtag_index())
+    key = settings.key()
+    degraded = st.session_state.get("degraded")
+    if not degraded or degraded["key"] != key:
+        job_id = queue.enqueue({**payload, "replace_key": key}, user=user_id, priority=PRIORITY_HIGH)
+        degraded = {"key": key, "job_id": job_id}
+    st.session_state.degraded = {**degraded, "draft": draft.text, "source": draft.source,
+                                 "detail": draft.detail, "reason": reason}
+    set_current_post(draft.text)
+
+
+def get_speculator(agent: LinkedInPostAgent, backend: StateBackend) -> SpeculativeGenerator:
+    """Per-session speculative generator; its budget is per user, shared through the backend"""
+    if 'speculator' not in st.session_state:
+        caller = get_caller("speculative")
+        st.session_state.speculator = SpeculativeGenerator(
+            lambda s: cached_generate(agent, backend, s, caller),
+            debounce_s=SPECULATION_DEBOUNCE_S,
+            budget=SPECULATION_BUDGET_PER_HOUR,
+            backend=backend,
+            budget_key=caller.user
+        )
+    return st.session_state.speculator
+
+
+def run_translations(agent: LinkedInPostAgent, backend: StateBackend, post: str, languages: list):
+    """Fan the post out to every selected language in one parallel round"""
+    st.session_state.translations = {
+        "source": post_hash(post),
+        "results": translate_all(agent.router.for_caller(get_caller()), post, languages, backend)
+    }
+
+
+def run_split(agent: LinkedInPostAgent, text: str, fmt_name: str, bridge: bool, topic: str):
+    """Split locally; bridging lines, if asked for, cost one model call for the whole series"""
+    fmt = FORMATS[fmt_name]
+    error = None
+    try:
+        items = split_post(text, fmt, agent.router.for_caller(get_caller()) if bridge else None, topic or "")
+    except (QuotaExceeded, UpstreamUnavailable) as e:
+        items, error = split_post(text, fmt), str(e)
+    except Exception as e:
+        items, error = split_post(text, fmt), f"Bridging lines failed: {e}"
+    # Keyed on the result, so the text areas refresh whenever the format or bridging changes it
+    st.session_state.split = {"key": post_hash("\n".join(items)), "format": fmt_name, "items": items, "error": error}
+
+
+# --- FRAGMENTS ---
+
+@st.fragment(run_every=SPECULATION_DEBOUNCE_S)
+def render_speculation_status(speculator: SpeculativeGenerator):
+    """Ticks while speculative mode is on, starting a draft once the settings settle"""
+    speculator.maybe_start()
+    status = speculator.status()
+    if status == "running":
+        st.caption("⚡ Drafting in the background...")
+    elif status == "ready":
+        st.caption("⚡ Draft ready. Generate will be instant.")
+    elif speculator.budget_exhausted():
+        st.caption("⚡ Speculation budget used up for this hour.")
+
+
+def replace_draft(post: str):
+    """Swap the offline draft for the real post"""
+    st.session_state.pop("degraded", None)
+    set_current_post(post)
+
+
+@st.fragment(run_every=DEGRADED_POLL_S)
+def render_degraded_status(queue: JobQueue):
+    """Labels an offline draft, and swaps in the real post once its queued generation finishes"""
+    degraded = st.session_state.get("degraded")
+    if not degraded:
+        return
+    job = queue.get(degraded["job_id"])
+    if job and job.status == "done" and job.result:
+        untouched = get_current_post() == degraded["draft"] and st.session_state.get("edit_area") == degraded["draft"]
+        if untouched:
+            replace_draft(job.result)
+            st.session_state.restore_notice = "✅ The real post is ready and has replaced the offline draft"
+            st.rerun()
+        st.success("✅ The real post is ready. You've edited the offline draft, so it wasn't replaced.")
+        if st.button("Use the generated post", key="degraded_use", on_click=replace_draft, args=(job.result,)):
+            # The editor lives in another fragment, so refresh the whole page
+            st.rerun()
+        return
+
+    source = (f"your earlier post on \"{degraded['detail']}\"" if degraded["source"] == "similar"
+              else "the template's structure and your past posts")
+    st.warning(f"⚠️ **Offline draft.** Gemini isn't answering right now ({degraded['reason']}). "
+               f"This draft was put together from {source}, without the model.")
+    if job is None or job.status in ("dead", "cancelled"):
+        outcome = {"dead": "failed", "cancelled": "was cancelled"}.get(job.status) if job else "is gone"
+        st.caption(f"The queued generation {outcome}{f': {job.error}' if job and job.error else ''}. "
+                   "Press Generate to try again.")
+    else:
+        st.caption(f"The real post is queued as job #{job.id} and will replace this draft when it finishes"
+                   f"{f' (last attempt: {job.error})' if job.error else ''}.")
+
+
+@st.fragment
+def render_workspace(agent: LinkedInPostAgent, backend: StateBackend, user_id: str, topic: str,
+                     audience_name: str, audience_desc: str, template_name: str, tone: str, length: str,
+                     languages: list):
+    """Analytics, editor and preview; reruns on its own while the post is edited"""
+    if 'edit_area' not in st.session_state:
+        st.session_state.edit_area = get_current_post()
+
+    st.markdown("---")
+
+    # Metrics Dashboard
+    st.markdown('<div class="section-badge">Post Analytics</div>', unsafe_allow_html=True)
+    metrics_slot = st.container()
+
+    st.markdown("---")
+
+    # Edit Section
+    st.markdown('<div class="section-badge">Edit & Refine</div>', unsafe_allow_html=True)
+    edited_post = st.text_area(
+        "Make any changes below:",
+        height=300,
+        help="Edit the generated post to match your style",
+        label_visibility="collapsed",
+        key="edit_area",
+        on_change=refresh_preview
+    )
+
+    # Metrics follow the editor, so they are filled in after reading it
+    with metrics_slot:
+        char_count = len(edited_post)
+        tree = parse_post(edited_post)
+        word_count = tree.word_count()
+        hashtag_count = len(tree.tags) + len(tree.body_tags)
+
+        metric_col1, metric_col2, metric_col3, metric_col4 = st.columns(4)
+        with metric_col1:
+            delta_text = f"{char_count - 3000}" if char_count > 3000 else f"{3000 - char_count} left"
+            st.metric("Characters", f"{char_count:,}", delta_text)
+        with metric_col2:
+            st.metric("Words", word_count)
+        with metric_col3:
+            st.metric("Hashtags", hashtag_count)
+        with metric_col4:
+            progress = min(char_count / 3000, 1.0)
+            st.metric("LinkedIn Limit", f"{progress*100:.1f}%")
+
+        # Progress bar
+        st.progress(progress)
+
+        features = score_draft(edited_post)
+        score_col1, score_col2, score_col3, score_col4 = st.columns(4)
+        with score_col1:
+            st.metric("Engagement Score", f"{features['score']:.0f}/100")
+        with score_col2:
+            st.metric("Reading Grade", f"{features['readability_grade']:.1f}")
+        with score_col3:
+            st.metric("Hook Above Fold", "Yes" if features["hook_before_fold"] else "No",
+                      help=f"Opening paragraph: {features['hook_chars']} chars; the fold is at {features['fold_at']}")
+        with score_col4:
+            st.metric("Buzzwords", features["buzzwords"])
+        for tip in tips(features) if features["words"] else []:
+            st.caption(f"💡 {tip}")
+
+        if char_count > 3000:
+            st.warning(f"⚠️ Your post exceeds LinkedIn's 3000 character limit by {char_count - 3000} characters. Consider shortening it, or splitting it into a series below.")
+
+        # Check word count against selected length
+        if length in agent.lengths:
+            expected_limit = agent.lengths[length]["strict_limit"]
+            if word_count > expected_limit * 1.2:
+                st.info(f"ℹ️ This post has {word_count} words, which is above the {length.lower()} length target of ~{expected_limit} words. Consider trimming for better engagement.")
+
+    # Section regeneration
+    regen_col1, regen_col2 = st.columns([3, 1])
+    with regen_col1:
+        st.selectbox(
+            "Regenerate one section:",
+            list(SECTION_LABELS.keys()),
+            format_func=SECTION_LABELS.get,
+            help="Rewrite only this part of the post; the rest stays as it is",
+            label_visibility="collapsed",
+            key="regen_section"
+        )
+    with regen_col2:
+        st.button(
+            "🔄 Regenerate Section",
+            use_container_width=True,
+            on_click=regenerate_section_callback,
+            args=(agent, topic, audience_desc, tone)
+        )
+    notice = st.session_state.pop('regen_notice', None)
+    if notice:
+        kind, message = notice
+        (st.success if kind == "success" else st.error)(message)
+
+    # Rule check: cheap local fixes first, a targeted section rewrite only for the rest
+    issues = lint_post(edited_post)
+    if issues:
+        fixable = sum(issue.fixable for issue in issues)
+        lint_col1, lint_col2, lint_col3 = st.columns([2, 1, 1])
+        with lint_col1:
+            with st.expander(f"🧹 {len(issues)} writing-rule issue(s)"):
+                for issue in issues:
+                    st.caption(f"{'🔧' if issue.fixable else '✍️'} {issue.message}")
+        with lint_col2:
+            st.button("🔧 Auto-fix", use_container_width=True, disabled=not fixable, on_click=autofix_callback,
+                      help="Fix inline hashtags, stock AI phrases, markdown and long paragraphs locally")
+        with lint_col3:
+            st.button("🩹 Repair", use_container_width=True, disabled=fixable == len(issues),
+                      on_click=repair_callback, args=(agent, topic, audience_desc, tone),
+                      help="Auto-fix, then rewrite only the sections that still break the rules")
+    notice = st.session_state.pop('lint_notice', None)
+    if notice:
+        kind, message = notice
+        (st.success if kind == "success" else st.error)(message)
+
+    # Hashtags from saved history: suggestions, autocomplete and a sanity check, no LLM call
+    hashtag_index = get_hashtag_index()
+    hashtag_index.refresh()
+    with st.expander("#️⃣ Hashtag suggestions"):
+        present = [*tree.tags, *tree.body_tags]
+        suggestions = hashtag_index.suggest(topic or "", limit=5, exclude=present)
+        if suggestions:
+            st.caption("Used with similar topics:")
+            tag_cols = st.columns(len(suggestions))
+            for col, (tag, _) in zip(tag_cols, suggestions):
+                with col:
+                    st.button(tag, key=f"add_tag_{tag}", use_container_width=True,
+                              on_click=add_hashtag_callback, args=(tag,))
+        else:
+            st.caption("Save a few posts to get suggestions for this topic.")
+
+        prefix = st.text_input("Find a hashtag", placeholder="#rem", key="hashtag_prefix")
+        if prefix.strip("# "):
+            completions = hashtag_index.complete(prefix)
+            if completions:
+                st.caption(" · ".join(f"{tag} ({uses})" for tag, uses in completions))
+            else:
+                st.caption("No saved post has used a tag like that yet.")
+
+        unused = [row["tag"] for row in hashtag_index.validate(topic or "", present) if not row["uses"]]
+        if unused and hashtag_index.stats()["posts"]:
+            st.caption(f"New to your history: {', '.join(unused)}")
+
+    translations = st.session_state.get("translations")
+    if languages or translations:
+        with st.expander("🌍 Translations", expanded=bool(translations)):
+            if st.button(f"Translate the current draft into {len(languages)} language(s)", key="translate_run",
+                         disabled=not languages):
+                with st.spinner(f"Translating into {', '.join(languages)}..."):
+                    run_translations(agent, backend, edited_post, languages)
+                translations = st.session_state.translations
+            if translations:
+                if translations["source"] != post_hash(edited_post):
+                    st.caption("The draft has changed since these were made; translate again to update them.")
+                results = translations["results"]
+                for tab, translation in zip(st.tabs(list(results)), results.values()):
+                    with tab:
+                        if translation.error:
+                            st.error(f"❌ {translation.error}")
+                            continue
+                        st.caption("From cache" if translation.cached else f"Translated in {translation.latency_s:.1f}s")
+                        st.text_area(translation.language, translation.text, height=250,
+                                     key=f"translation_{translation.language}_{translations['source'][:8]}",
+                                     label_visibility="collapsed")
+                        st.download_button("📥 Download", translation.text, key=f"translation_dl_{translation.language}",
+                                           file_name=f"linkedin_post_{translation.language.split()[0].lower()}.txt")
+
+    split = st.session_state.get("split")
+    with st.expander("🧵 Split into a series", expanded=bool(split) or char_count > 3000):
+        st.caption("Break a long draft, or a document, into posts or carousel slides at paragraph and sentence breaks.")
+        split_col1, split_col2 = st.columns(2)
+        with split_col1:
+            fmt_name = st.radio("Split into", list(FORMATS), horizontal=True, key="split_format",
+                                format_func=lambda name: f"{name.title()} ({FORMATS[name].max_chars:,} chars each)")
+        with split_col2:
+            bridge = st.checkbox("Add bridging lines (one model call)", key="split_bridge")
+        document = st.file_uploader("Or split a document instead of the draft", type=["txt", "md"], key="split_file")
+        if st.button("🧵 Split", key="split_run"):
+            source = document.getvalue().decode("utf-8", errors="replace") if document else edited_post
+            if source.strip():
+                with st.spinner("Writing bridging lines..." if bridge else "Splitting..."):
+                    run_split(agent, source, fmt_name, bridge, topic)
+                split = st.session_state.split
+            else:
+                st.warning("⚠️ Nothing to split yet.")
+        if split:
+            if split["error"]:
+                st.warning(f"⚠️ Split without bridging lines: {split['error']}")
+            st.caption(f"{len(split['items'])} {'posts' if split['format'] == 'thread' else 'slides'}")
+            for i, item in enumerate(split["items"], 1):
+                st.text_area(f"Part {i} · {len(item):,} chars", item, height=150,
+                             key=f"split_item_{i}_{split['key'][:8]}")
+            st.download_button("📥 Download all", "\n\n---\n\n".join(split["items"]), key="split_download",
+                               file_name=f"linkedin_{split['format']}.txt")
+
+    # Action Buttons
+    btn_col1, btn_col2, btn_col3, btn_col4 = st.columns(4)
+
+    with btn_col1:
+        if st.button("💾 Save Changes", use_container_width=True):
+            get_session().set_post(get_post_store(), edited_post)
+            st.success("✅ Post updated!")
+
+    with btn_col2:
+        if st.button("📋 Copy", use_container_width=True):
+            if HAS_PYPERCLIP:
+                try:
+                    pyperclip.copy(edited_post)
+                    st.success("✅ Copied to clipboard!")
+                except Exception as e:
+                    st.warning("⚠️ Clipboard copy failed. Use download button instead.")
+                    st.code(edited_post, language=None)
+            else:
+                st.code(edited_post, language=None)
+                st.info("💡 pyperclip not installed. Select and copy the text above, or use download.")
+
+    with btn_col3:
+        st.download_button(
+            "📥 Download",
+            edited_post,
+            file_name=f"linkedin_post_{topic[:20].replace(' ', '_') if topic else 'post'}.txt",
+            use_container_width=True
+        )
+
+    with btn_col4:
+        if st.button("📌 Save to History", use_container_width=True):
+            saved_id = backend.history_append(user_id, {
+                "post": edited_post,
+                "topic": topic,
+                "audience": audience_name,
+                "template": template_name,
+                "tone": tone,
+                "length": length,
+                "chars": char_count,
+                "words": word_count,
+                "hashtags": hashtag_count,
+                "tenant": get_tenant_id(),
+                "created_at": time.time()
             })
+            if saved_id is not None:
+                st.session_state.history_notice = f"✅ Saved! ({backend.history_count(user_id)} posts in history)"
+                # History only changes here, so only now does the history panel need a refresh
+                st.rerun()
+            else:
+                st.info("ℹ️ This post is already in history")
+
+    st.markdown("---")
+
+    # LinkedIn Preview
+    st.markdown('<div class="section-badge">LinkedIn Preview</div>', unsafe_allow_html=True)
+    st.caption("How your post will look on LinkedIn")
+    render_preview(topic, audience_name)
+
+    # Edits rerun only this fragment, so checkpoint here as well as at the end of the page
+    checkpoint_session()
+
+
+def get_preview_renderer() -> PreviewRenderer:
+    if 'preview_renderer' not in st.session_state:
+        st.session_state.preview_renderer = PreviewRenderer()
+    return st.session_state.preview_renderer
+
+
+def refresh_preview():
+    """Editor on_change: render the committed text before the fragment reruns"""
+    # The editor only commits on Enter or blur, so edits arrive already coalesced; no timer is needed
+    get_preview_renderer().render(st.session_state.edit_area)
+
+
+@st.fragment
+def render_preview(topic: str, audience_name: str):
+    """Escaped, memoized preview card; rerenders only when the text changed"""
+    renderer = get_preview_renderer()
+    text = st.session_state.edit_area if 'edit_area' in st.session_state else get_current_post()
+    result = renderer.render(text)
+
+    with st.container(key="preview_card"):
+        st.markdown(preview_header_html(topic[0].upper() if topic else 'Y', audience_name), unsafe_allow_html=True)
+        for block in renderer.html_blocks(result):
+            st.markdown(block, unsafe_allow_html=True)
+        st.markdown(PREVIEW_FOOTER_HTML, unsafe_allow_html=True)
+
+
+@st.fragment
+def render_history(backend: StateBackend, user_id: str):
+    """Post history list; only reruns when a post is loaded or history changes"""
+    total = backend.history_count(user_id)
+    if not total:
+        return
+
+    st.markdown("---")
+    st.markdown('<div class="section-badge">Post History</div>', unsafe_allow_html=True)
+
+    notice = st.session_state.pop('history_notice', None)
+    if notice:
+        st.success(notice)
+
+    # Show last 5 posts
+    recent_posts = backend.history_list(user_id, limit=5)
+    scores = score_drafts([record["post"] for record in recent_posts])["score"]
+
+    for idx, record in enumerate(recent_posts):
+        saved_post = record["post"]
+        post_number = total - idx
+        col1, col2 = st.columns([5, 1])
+
+        with col1:
+            preview_text = saved_post[:100] + "..." if len(saved_post) > 100 else saved_post
+            st.text(f"Post #{post_number} · score {scores[idx]:.0f}: {preview_text}")
+
+        with col2:
+            if st.button(f"Load", key=f"load_{record['id']}", use_container_width=True,
+                         on_click=set_current_post, args=(saved_post,)):
+                # The editor lives in another fragment, so refresh the whole page
+                st.rerun()
+
+    if total > 5:
+        st.caption(f"Showing last 5 of {total} posts")
+
+
+@st.fragment
+def render_queue_panel(agent: LinkedInPostAgent, backend: StateBackend, queue: JobQueue, user_id: str, payload: dict):
+    """Schedule the current settings for later and watch the queue"""
+    st.markdown('<div class="section-badge">Scheduled Posts</div>', unsafe_allow_html=True)
 
-            # Handle different response types
-            if hasattr(result, "content"):
-                content = result.content
-            elif isinstance(result, str):
-                content = result
+    sched_col1, sched_col2, sched_col3, sched_col4 = st.columns([2, 2, 2, 2])
+    default_at = datetime.now() + timedelta(hours=1)
+    with sched_col1:
+        run_date = st.date_input("Date", value=default_at.date(), key="queue_date")
+    with sched_col2:
+        run_time = st.time_input("Time", value=default_at.time().replace(second=0, microsecond=0), key="queue_time")
+    with sched_col3:
+        priority = st.selectbox("Priority", list(PRIORITY_LABELS.keys()), index=1, key="queue_priority")
+    with sched_col4:
+        st.markdown("<br>", unsafe_allow_html=True)
+        if st.button("🗓️ Add to Queue", use_container_width=True):
+            if not payload["topic"].strip():
+                st.warning("⚠️ Please enter a topic first!")
             else:
-                content = str(result)
-            
-            content = content.strip()
-            
-            # Validate and trim if necessary
-            words = content.split()
-            word_count = len([w for w in words if not w.startswith('#')])
-            
-            if word_count > length_config["strict_limit"] * 1.2:  # If 20% over limit
-                # Extract hashtags if present
-                lines = content.split('\n')
-                hashtag_line = None
-                main_content_lines = []
-                
-                for line in lines:
-                    if line.strip().startswith('#') or all(word.startswith('#') for word in line.strip().split() if word):
-                        hashtag_line = line
-                    else:
-                        main_content_lines.append(line)
-                
-                main_content = '\n'.join(main_content_lines).strip()
-                
-                # Trim to word limit
-                main_words = main_content.split()
-                trimmed_words = main_words[:length_config["strict_limit"]]
-                content = ' '.join(trimmed_words)
-                
-                # Re-add hashtags
-                if hashtag_line:
-                    content = f"{content}\n\n{hashtag_line}"
-            
-            return content
-            
-        except Exception as e:
-            raise Exception(f"Error generating post: {str(e)}")
+                run_at = datetime.combine(run_date, run_time).timestamp()
+                job_id = queue.enqueue(payload, user=user_id, run_at=run_at, priority=PRIORITY_LABELS[priority],
+                                       dedup_key=topic_key(payload["topic"]))
+                st.success(f"✅ Queued as job #{job_id}")
+
+    import_types = ["csv", "jsonl"] + (["xlsx"] if HAS_OPENPYXL else [])
+    with st.popover("📥 Import topics"):
+        st.caption("One topic per row. Optional audience, template, tone and length columns override "
+                   "the current settings; rows with a topic you already have are skipped.")
+        upload = st.file_uploader("Topic file", type=import_types, key="import_file", label_visibility="collapsed")
+        if upload is not None and st.button("Queue topics", key="import_run", use_container_width=True):
+            defaults = {name: payload[name]
+                        for name in ("instructions", "audience", "template", "tone", "length", "tenant")}
+            run_at = datetime.combine(run_date, run_time).timestamp()
+            try:
+                with st.spinner("Importing..."):
+                    report = import_topics(upload, agent, queue, backend, user_id, defaults,
+                                           run_at=run_at, priority=PRIORITY_LABELS[priority])
+            except Exception as e:
+                st.error(f"❌ Import failed: {str(e)}")
+            else:
+                st.success(f"✅ Queued {report.queued} of {report.rows} rows "
+                           f"({report.duplicates} duplicates, {report.invalid} invalid)")
+                if report.issues:
+                    st.dataframe([{"Line": issue.line, "Topic": issue.topic, "Problem": issue.message}
+                                  for issue in report.issues], hide_index=True, use_container_width=True)
+
+    counts = queue.counts(user_id)
+    st.caption(" • ".join(f"{status.capitalize()}: {count}" for status, count in counts.items()))
+
+    jobs = queue.list(user=user_id, limit=20)
+    if jobs:
+        st.dataframe(
+            [{
+                "Job": job.id,
+                "Status": job.status,
+                "Topic": job.payload.get("topic", ""),
+                "Scheduled": datetime.fromtimestamp(job.run_at).strftime("%Y-%m-%d %H:%M"),
+                "Attempts": f"{job.attempts}/{job.max_attempts}",
+                "Error": job.error or ""
+            } for job in jobs],
+            hide_index=True,
+            use_container_width=True
+        )
+
+    dead = [job for job in jobs if job.status == "dead"]
+    if dead:
+        retry_col1, retry_col2 = st.columns([3, 1])
+        with retry_col1:
+            retry_id = st.selectbox("Dead-lettered job", [job.id for job in dead], format_func=lambda i: f"Job #{i}",
+                                    label_visibility="collapsed")
+        with retry_col2:
+            if st.button("🔁 Retry", use_container_width=True):
+                queue.retry(retry_id)
+                st.rerun(scope="fragment")
+
+    st.button("🔄 Refresh", key="queue_refresh")
+
+
+EXPORT_MIME_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson", "parquet": "application/octet-stream"}
+
+# Exports are written here and served from disk; the browser download still passes through
+# Streamlit's memory, so files above the cap are left for the command line
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "linkedin-exports")
+EXPORT_DOWNLOAD_MAX_BYTES = int(os.getenv("EXPORT_DOWNLOAD_MAX_MB", "50")) * 1024 * 1024
+EXPORT_KEEP_S = 3600
+
+
+def prune_exports():
+    """Drop export files nobody downloaded within the hour"""
+    cutoff = time.time() - EXPORT_KEEP_S
+    for name in os.listdir(EXPORT_DIR):
+        path = os.path.join(EXPORT_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass  # another session got there first
+
+
+def commit_export(backend: StateBackend, filters: Optional[ExportFilter], last_id: int):
+    """Download on_click: only a delivered "only new" export moves its watermark"""
+    if filters is not None:
+        commit_watermark(backend, "app", filters, last_id)
+
+
+@st.fragment
+def render_export_panel(agent: LinkedInPostAgent, backend: StateBackend, user_id: str):
+    """Export the whole history to a file; rows stream to disk and are downloaded from there"""
+    st.markdown('<div class="section-badge">Export History</div>', unsafe_allow_html=True)
+
+    formats = ["csv", "jsonl"] + (["parquet"] if HAS_PYARROW else [])
+    any_option = "Any"
+    export_col1, export_col2, export_col3 = st.columns(3)
+    with export_col1:
+        fmt = st.selectbox("Format", formats, format_func=str.upper, key="export_format")
+        audience = st.selectbox("Audience", [any_option] + list(agent.audiences.keys()), key="export_audience")
+    with export_col2:
+        template = st.selectbox("Template", [any_option] + list(agent.prompt_templates.keys()) + ["Custom"],
+                                key="export_template")
+        tone = st.selectbox("Tone", [any_option] + list(agent.tones.keys()), key="export_tone")
+    with export_col3:
+        length = st.selectbox("Length", [any_option] + list(agent.lengths.keys()), key="export_length")
+        incremental = st.checkbox("Only new since last export", key="export_incremental",
+                                  help="Skips posts included in your previous incremental export")
+    if not HAS_PYARROW:
+        st.caption("Install pyarrow to enable Parquet export.")
+
+    if st.button("📤 Prepare Export", key="export_run"):
+        pick = lambda value: None if value == any_option else value
+        filters = ExportFilter(user=user_id, audience=pick(audience), template=pick(template),
+                               tone=pick(tone), length=pick(length))
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        prune_exports()
+        with tempfile.NamedTemporaryFile(suffix=f".{fmt}", dir=EXPORT_DIR, delete=False) as f:
+            path = f.name
+        try:
+            with st.spinner("Exporting..."):
+                # The watermark only moves once the file is downloaded (see commit_export)
+                result = export_history(backend, path, fmt, filters, incremental="app" if incremental else None,
+                                        commit=False)
+        except Exception:
+            os.remove(path)
+            raise
+        previous = st.session_state.get('export_file')
+        if previous and os.path.exists(previous[0]):
+            os.remove(previous[0])
+        st.session_state.export_file = (path, fmt, result.rows, filters if incremental else None, result.last_id)
+
+    export_file = st.session_state.get('export_file')
+    if export_file:
+        path, fmt, rows, watermark_filters, last_id = export_file
+        if not os.path.exists(path):
+            st.caption("This export has expired; prepare it again.")
+        elif os.path.getsize(path) > EXPORT_DOWNLOAD_MAX_BYTES:
+            st.warning(f"⚠️ {rows} posts make a {os.path.getsize(path) / 1024 / 1024:.0f} MB file, too large to "
+                       f"download here. Narrow the filters, or run `python -m Agents.Export --out posts.{fmt}`.")
+        else:
+            st.caption(f"{rows} posts ready")
+            with open(path, "rb") as f:
+                st.download_button(f"⬇️ Download {fmt.upper()}", f, file_name=f"linkedin_posts.{fmt}",
+                                   mime=EXPORT_MIME_TYPES[fmt], key="export_download",
+                                   on_click=commit_export, args=(backend, watermark_filters, last_id))
+
+
+def is_admin() -> bool:
+    token = os.getenv("ADMIN_TOKEN")
+    return bool(token) and st.query_params.get("admin") == token
+
+
+@st.fragment
+def render_usage_admin(agent: LinkedInPostAgent):
+    """Today's LLM consumption per tenant and user, plus the scheduler's queue"""
+    meter, scheduler = agent.router.meter, agent.router.scheduler
+    if meter:
+        limits = meter.limits
+        st.caption(
+            f"Daily limits (0 = unlimited) — user: {limits.user_requests:,} requests / {limits.user_tokens:,} tokens, "
+            f"tenant: {limits.tenant_requests:,} requests / {limits.tenant_tokens:,} tokens"
+        )
+        period = st.date_input("Day (UTC)", value=datetime.now(timezone.utc).date(), key="usage_day").strftime("%Y-%m-%d")
+        usage_col1, usage_col2 = st.columns(2)
+        with usage_col1:
+            st.markdown("**Tenants**")
+            st.dataframe(meter.report(period, "tenant"), hide_index=True, use_container_width=True)
+        with usage_col2:
+            st.markdown("**Top users**")
+            st.dataframe(meter.report(period, "user", limit=20), hide_index=True, use_container_width=True)
+    if scheduler:
+        stats = scheduler.stats()
+        st.markdown(f"**LLM slots:** {stats['in_flight']}/{stats['slots']} in use")
+        st.dataframe([{
+            "Class": klass,
+            "Waiting": stats["waiting"].get(klass, 0),
+            "Dispatched": stats["dispatched"].get(klass, 0),
+            "Mean wait (s)": round(stats["mean_wait_s"].get(klass, 0.0), 2)
+        } for klass in scheduler.weights], hide_index=True, use_container_width=True)
+
+    breaker = agent.router.breaker
+    if breaker:
+        state = breaker.stats()
+        retry = f", next probe in {state['retry_in_s']:.0f}s" if state["state"] == "open" else ""
+        st.markdown(f"**Circuit breaker:** {state['state']}{retry} ({state['failures']} consecutive failures, "
+                    f"opened {state['opened']:,} times)")
+
+    hedger = agent.router.hedger
+    if hedger:
+        hedging = hedger.stats()
+        st.markdown(
+            f"**Hedging:** {hedging['hedges']:,} of {hedging['requests']:,} requests hedged "
+            f"({hedging['hedge_rate']:.0%}), {hedging['hedge_wins']:,} won by the hedge "
+            f"({hedging['hedge_win_rate']:.0%}), {hedging['budget_denied']:,} held back by the hedge budget"
+        )
+        thresholds = ", ".join(f"{model} {threshold:.1f}s" for model, threshold in hedging["thresholds_s"].items()
+                               if threshold is not None)
+        if thresholds:
+            st.caption(f"Hedge after (p90 time to first token): {thresholds}")
+
+    transport = shared_transport()
+    pool = transport.stats()
+    st.markdown(
+        f"**Connection pool:** {pool['in_flight']}/{pool['max_in_flight']} in flight (peak {pool['peak_in_flight']}), "
+        f"{pool['requests']:,} requests over {pool['connections']:,} connections "
+        f"({pool['reuse_ratio']:.0%} reused), {'HTTP/2' if pool['http2'] else 'HTTP/1.1'}"
+    )
+    if st.button("🩺 Check API host", key="pool_health"):
+        transport.check()
+    health = transport.last_health
+    if health:
+        status = "reachable" if health["ok"] else f"unreachable ({health.get('error') or health.get('status')})"
+        st.caption(f"Gemini API host {status}, {health['latency_ms']:.0f} ms")
+
+    if agent.experiment:
+        report = agent.experiment.report()
+        st.markdown(f"**Prompt experiment** (control: {report['control']}, since this process started)")
+        st.dataframe([{
+            "Variant": name,
+            "Requests": stats["n"],
+            "Errors": stats["errors"],
+            "Latency p50 (s)": round(stats["latency_s"]["p50"] or 0.0, 2),
+            "Latency p95 (s)": round(stats["latency_s"]["p95"] or 0.0, 2),
+            "Prompt tokens": round(stats["prompt_tokens"]["mean"]),
+            "Total tokens": round(stats["total_tokens"]["mean"]),
+            "Word limit hit": f"{stats['word_limit_hit_rate']:.0%}",
+            "Hashtags at end": f"{stats['hashtags_at_end_rate']:.0%}"
+        } for name, stats in report["variants"].items()], hide_index=True, use_container_width=True)
+        st.dataframe([{
+            "Variant": name,
+            "Metric": metric,
+            "Change": f"{test['relative']:+.1%}" if "relative" in test else f"{test['diff']:+.1%}",
+            "p-value": round(test["p"], 4),
+            "Verdict": ("better" if test["better"] else "worse") if test["significant"] else "not significant"
+        } for name, comparison in report["comparisons"].items() for metric, test in comparison.items()],
+            hide_index=True, use_container_width=True)
+        st.caption(f"Differences need p < {report['alpha']} and {MIN_SAMPLES} requests per variant to count")
+    st.button("🔄 Refresh", key="usage_refresh")
+
 
 # --- MAIN APP FLOW ---
 
 def main():
     # Initialize session state
-    if 'post_history' not in st.session_state:
-        st.session_state.post_history = []
-    if 'current_post' not in st.session_state:
-        st.session_state.current_post = ""
     if 'config_expanded' not in st.session_state:
         st.session_state.config_expanded = False
     if 'generation_triggered' not in st.session_state:
@@ -522,16 +1325,23 @@ def main():
         st.stop()
     
     try:
-        agent = LinkedInPostAgent(api_key=api_key)
+        agent = get_agent(api_key)
+        backend = get_backend()
     except Exception as e:
         st.error(f"Error initializing agent: {str(e)}")
         st.stop()
+    user_id = get_user_id()
+    restore_session(agent, backend)
 
     # Header Section
     st.markdown('<div class="main-header">', unsafe_allow_html=True)
     st.title("LinkedIn Post Generator")
     st.markdown("**Generate high-engagement, human-sounding posts in seconds**")
     st.markdown('</div>', unsafe_allow_html=True)
+
+    notice = st.session_state.pop('restore_notice', None)
+    if notice:
+        st.info(notice)
     
     # Configuration Section (Collapsible)
     with st.expander("⚙️ Post Configuration", expanded=st.session_state.config_expanded):
@@ -546,7 +1356,8 @@ def main():
                 "Who is your audience?", 
                 list(agent.audiences.keys()),
                 help="Select the primary audience for your post",
-                label_visibility="collapsed"
+                label_visibility="collapsed",
+                key="cfg_audience"
             )
             audience_desc = agent.audiences[audience_name]
             st.caption(f"*{audience_desc}*")
@@ -554,24 +1365,36 @@ def main():
             st.markdown("**Content Tone**")
             tone = st.radio(
                 "Select tone:",
-                ["Professional", "Casual", "Conversational", "Controversial", "Empathetic", 
-                 "Educational", "Inspirational", "Storytelling", "Direct"],
+                list(agent.tones.keys()),
                 horizontal=False,
-                label_visibility="collapsed"
+                label_visibility="collapsed",
+                key="cfg_tone"
             )
         
         with config_col2:
             st.markdown("**Post Length**")
             length = st.radio(
                 "Select length:",
-                ["Short", "Medium", "Long"],
-                index=1,
+                list(agent.lengths.keys()),
                 horizontal=True,
-                label_visibility="collapsed"
+                label_visibility="collapsed",
+                key="cfg_length"
             )
             
             st.markdown("**Content Style**")
-            use_custom = st.checkbox("Use custom prompt", help="Check to write your own instructions")
+            use_custom = st.checkbox("Use custom prompt", help="Check to write your own instructions", key="cfg_use_custom")
+            speculative = st.checkbox(
+                "⚡ Speculative generation",
+                help="Start drafting in the background once your topic settles, so Generate returns instantly",
+                key="cfg_speculative"
+            )
+            languages = st.multiselect(
+                "🌍 Also translate into",
+                LANGUAGES,
+                help="After generating, translate the post into these languages in one parallel step, "
+                     "keeping its hook, body, call-to-action and hashtags",
+                key="cfg_languages"
+            )
         
         # Template Selection
         if not use_custom:
@@ -580,18 +1403,21 @@ def main():
                 "Choose a template:", 
                 list(agent.prompt_templates.keys()),
                 help="Select a pre-built template style",
-                label_visibility="collapsed"
+                label_visibility="collapsed",
+                key="cfg_template"
             )
             selected_prompt = agent.prompt_templates[template_name]
             with st.expander("📋 Template Preview"):
                 st.caption(selected_prompt)
         else:
+            template_name = "Custom"
             st.markdown("**Custom Instructions**")
             selected_prompt = st.text_area(
                 "Custom instructions:", 
                 placeholder="e.g., Write a funny, engaging post about coding that includes a personal anecdote...",
                 height=100,
-                label_visibility="collapsed"
+                label_visibility="collapsed",
+                key="cfg_instructions"
             )
     
     st.markdown("---")
@@ -605,13 +1431,32 @@ def main():
             "**What is your post about?**", 
             placeholder="e.g., The future of Remote Work in 2026",
             help="Enter the main topic or theme for your LinkedIn post",
-            label_visibility="collapsed"
+            label_visibility="collapsed",
+            key="cfg_topic"
         )
     
     with topic_col2:
         st.markdown("<br>", unsafe_allow_html=True)
         generate_btn = st.button("✨ Generate Post", type="primary", use_container_width=True)
     
+    settings = GenerationSettings(selected_prompt, topic, audience_desc, tone, length)
+    payload = {
+        "instructions": selected_prompt,
+        "topic": topic,
+        "audience": audience_name,
+        "audience_desc": audience_desc,
+        "template": template_name,
+        "tone": tone,
+        "length": length,
+        "tenant": get_tenant_id()
+    }
+    pool = get_worker_pool(api_key)
+    speculator = None
+    if speculative:
+        speculator = get_speculator(agent, backend)
+        speculator.observe(settings)
+        render_speculation_status(speculator)
+    
     # Generate Post
     if generate_btn:
         if not topic or not topic.strip():
@@ -621,186 +1466,70 @@ def main():
         else:
             with st.spinner("✍️ Writing your post... This may take 10-20 seconds"):
                 try:
-                    post = agent.generate_post(
-                        selected_prompt, 
-                        topic, 
-                        audience_desc, 
-                        tone, 
-                        length
-                    )
-                    st.session_state['current_post'] = post
-                    st.success("✅ Post generated successfully!")
+                    post = speculator.take(settings, timeout=SPECULATION_TAKE_TIMEOUT_S) if speculator else None
+                    if post is None and not backend.take_token(
+                        f"generate:{user_id}", GENERATION_RATE_PER_MIN / 60, GENERATION_BURST
+                    ):
+                        st.warning("⚠️ You're generating very quickly. Please wait a few seconds and try again.")
+                    else:
+                        # Recorded first, so a restart mid-generation knows what to recover
+                        st.session_state.pending_generation = settings.key()
+                        checkpoint_session()
+                        if post is None:
+                            post = generate_with_deadline(agent, backend, settings, get_caller())
+                        if post == get_current_post():
+                            # Same settings clicked again: the user wants a new take, not the cached one
+                            post = generate_with_deadline(agent, backend, settings, get_caller(), fresh=True)
+                        set_current_post(post)
+                        st.session_state.pop('degraded', None)
+                        st.session_state.pop('pending_generation', None)
+                        checkpoint_session()
+                        if languages:
+                            with st.spinner(f"🌍 Translating into {len(languages)} language(s)..."):
+                                run_translations(agent, backend, post, languages)
+                        else:
+                            st.session_state.pop('translations', None)
+                        st.success("✅ Post generated successfully!")
+                except QuotaExceeded as e:
+                    st.warning(f"⚠️ {str(e)}")
                 except Exception as e:
-                    st.error(f"❌ Error generating post: {str(e)}")
-                    st.info("💡 Make sure your API key is valid and you have internet connection.")
+                    if not is_outage(e):
+                        # A bad key, a rejected prompt or a bug won't fix itself; retrying in the queue won't help
+                        st.error(f"❌ Error generating post: {str(e)}")
+                        st.info("💡 Make sure your API key is valid and you have internet connection.")
+                    else:
+                        if isinstance(e, FutureTimeout):
+                            reason = f"no answer within {DEGRADE_AFTER_S:.0f}s"
+                        elif isinstance(e, UpstreamUnavailable):
+                            reason = "recent calls failed"
+                        else:
+                            reason = str(e)
+                        serve_degraded(agent, backend, pool.queue, user_id, settings, payload, reason)
+                        checkpoint_session()
+                finally:
+                    st.session_state.pop('pending_generation', None)
+
+    render_degraded_status(pool.queue)
+
+    # Scheduled generation
+    with st.expander("🗓️ Schedule & Queue"):
+        render_queue_panel(agent, backend, pool.queue, user_id, payload)
+
+    if is_admin():
+        with st.expander("📊 Usage (admin)"):
+            render_usage_admin(agent)
+
+    if backend.history_count(user_id):
+        with st.expander("📤 Export History"):
+            render_export_panel(agent, backend, user_id)
 
     # Display and Edit Post
-    if st.session_state.get('current_post'):
-        st.markdown("---")
-        
-        # Metrics Dashboard
-        st.markdown('<div class="section-badge">Post Analytics</div>', unsafe_allow_html=True)
-        
-        char_count = len(st.session_state.current_post)
-        word_count = len(st.session_state.current_post.split())
-        hashtag_count = st.session_state.current_post.count('#')
-        
-        metric_col1, metric_col2, metric_col3, metric_col4 = st.columns(4)
-        with metric_col1:
-            delta_text = f"{char_count - 3000}" if char_count > 3000 else f"{3000 - char_count} left"
-            st.metric("Characters", f"{char_count:,}", delta_text)
-        with metric_col2:
-            st.metric("Words", word_count)
-        with metric_col3:
-            st.metric("Hashtags", hashtag_count)
-        with metric_col4:
-            progress = min(char_count / 3000, 1.0)
-            st.metric("LinkedIn Limit", f"{progress*100:.1f}%")
-        
-        # Progress bar
-        st.progress(progress)
-        
-        if char_count > 3000:
-            st.warning(f"⚠️ Your post exceeds LinkedIn's 3000 character limit by {char_count - 3000} characters. Consider shortening it.")
-        
-        # Check word count against selected length
-        word_count_limits = {"Short": 100, "Medium": 250, "Long": 500}
-        if 'length' in locals() and length in word_count_limits:
-            expected_limit = word_count_limits[length]
-            if word_count > expected_limit * 1.2:
-                st.info(f"ℹ️ This post has {word_count} words, which is above the {length.lower()} length target of ~{expected_limit} words. Consider trimming for better engagement.")
-        
-        st.markdown("---")
-        
-        # Edit Section
-        st.markdown('<div class="section-badge">Edit & Refine</div>', unsafe_allow_html=True)
-        edited_post = st.text_area(
-            "Make any changes below:",
-            value=st.session_state['current_post'],
-            height=300,
-            help="Edit the generated post to match your style",
-            label_visibility="collapsed",
-            key="edit_area"
-        )
-        
-        # Action Buttons
-        btn_col1, btn_col2, btn_col3, btn_col4 = st.columns(4)
-        
-        with btn_col1:
-            if st.button("💾 Save Changes", use_container_width=True):
-                st.session_state['current_post'] = edited_post
-                st.success("✅ Post updated!")
-        
-        with btn_col2:
-            if st.button("📋 Copy", use_container_width=True):
-                if HAS_PYPERCLIP:
-                    try:
-                        pyperclip.copy(edited_post)
-                        st.success("✅ Copied to clipboard!")
-                    except Exception as e:
-                        st.warning("⚠️ Clipboard copy failed. Use download button instead.")
-                        st.code(edited_post, language=None)
-                else:
-                    st.code(edited_post, language=None)
-                    st.info("💡 pyperclip not installed. Select and copy the text above, or use download.")
-        
-        with btn_col3:
-            st.download_button(
-                "📥 Download",
-                edited_post,
-                file_name=f"linkedin_post_{topic[:20].replace(' ', '_') if topic else 'post'}.txt",
-                use_container_width=True
-            )
-        
-        with btn_col4:
-            if st.button("📌 Save to History", use_container_width=True):
-                if edited_post not in st.session_state.post_history:
-                    st.session_state.post_history.append(edited_post)
-                    st.success(f"✅ Saved! ({len(st.session_state.post_history)} posts in history)")
-                else:
-                    st.info("ℹ️ This post is already in history")
-        
-        st.markdown("---")
-        
-        # LinkedIn Preview
-        st.markdown('<div class="section-badge">LinkedIn Preview</div>', unsafe_allow_html=True)
-        st.caption("How your post will look on LinkedIn")
-        
-        # Enhanced Preview Card
-        preview_html = f"""
-        <div class="preview-container">
-            <div style="display: flex; align-items: center; margin-bottom: 16px; padding-bottom: 16px; border-bottom: 1px solid #e0e0e0;">
-                <div style="
-                    width: 56px; 
-                    height: 56px; 
-                    background: linear-gradient(135deg, #0a66c2, #004182); 
-                    border-radius: 50%; 
-                    margin-right: 12px;
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                    color: white;
-                    font-weight: bold;
-                    font-size: 24px;
-                    box-shadow: 0 2px 8px rgba(10, 102, 194, 0.3);
-                ">
-                    {topic[0].upper() if topic else 'Y'}
-                </div>
-                <div>
-                    <div style="font-weight: 700; color: #000000; font-size: 16px; margin-bottom: 2px;">Your Profile Name</div>
-                    <div style="font-size: 13px; color: #666666;">{audience_name} • Just now</div>
-                </div>
-            </div>
-            <div style="
-                white-space: pre-wrap; 
-                color: #1d1d1f; 
-                font-size: 15px; 
-                line-height: 1.6; 
-                margin-bottom: 16px;
-            ">
-                {edited_post}
-            </div>
-            <div style="
-                display: flex; 
-                justify-content: space-around; 
-                padding-top: 12px; 
-                border-top: 1px solid #e0e0e0;
-                color: #666666;
-                font-size: 14px;
-                font-weight: 600;
-            ">
-                <span>👍 Like</span>
-                <span>💬 Comment</span>
-                <span>🔁 Repost</span>
-                <span>📤 Send</span>
-            </div>
-        </div>
-        """
-        st.markdown(preview_html, unsafe_allow_html=True)
-        
-        # Post History Section
-        if st.session_state.post_history:
-            st.markdown("---")
-            st.markdown('<div class="section-badge">Post History</div>', unsafe_allow_html=True)
-            
-            # Show last 5 posts
-            recent_posts = list(reversed(st.session_state.post_history[-5:]))
-            
-            for idx, saved_post in enumerate(recent_posts):
-                post_number = len(st.session_state.post_history) - idx
-                col1, col2 = st.columns([5, 1])
-                
-                with col1:
-                    preview_text = saved_post[:100] + "..." if len(saved_post) > 100 else saved_post
-                    st.text(f"Post #{post_number}: {preview_text}")
-                
-                with col2:
-                    if st.button(f"Load", key=f"load_{idx}", use_container_width=True):
-                        st.session_state.current_post = saved_post
-                        st.rerun()
-            
-            if len(st.session_state.post_history) > 5:
-                st.caption(f"Showing last 5 of {len(st.session_state.post_history)} posts")
+    if get_session().post_id:
+        render_workspace(agent, backend, user_id, topic, audience_name, audience_desc, template_name, tone, length,
+                         languages)
+        render_history(backend, user_id)
+
+    checkpoint_session()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,143 @@
+"""Storage benchmark: plain text vs zlib vs zstd vs zstd with a trained dictionary.
+
+Trains on one part of the corpus and measures a held-out part, so the dictionary
+is never scored on the posts it learned from. By default the corpus is synthesized
+from the recorded responses; pass a history export to use real posts:
+
+    python -m benchmarks.compression
+    python -m Agents.Export --out history.jsonl --format jsonl
+    python -m benchmarks.compression --corpus history.jsonl
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from Agents.Compression import HAS_ZSTD, Codec, train_dictionary
+from Agents.SharedState import SQLiteBackend
+
+
+# Same recordings as benchmarks.matrix, without pulling in the model stack
+DEFAULT_RESPONSES = "benchmarks/data/replay_responses.jsonl"
+
+
+class PlainCodec(Codec):
+    """Stores everything as-is; the baseline"""
+
+    def encode(self, text: str) -> str:
+        return text
+
+
+def synthesize(responses: str, count: int, seed: int) -> List[str]:
+    """Posts recombined from recorded paragraphs and hashtag blocks, so repetition looks like ours"""
+    with open(responses, encoding="utf-8") as f:
+        posts = [json.loads(line)["response"] for line in f]
+    paragraphs = [p for post in posts for p in post.split("\n\n") if not p.startswith("#")]
+    hashtags = [p for post in posts for p in post.split("\n\n") if p.startswith("#")]
+    rng = random.Random(seed)
+    return [
+        "\n\n".join(rng.sample(paragraphs, min(len(paragraphs), rng.randint(3, 6)))
+                    + [f"Week {i}: what would you change?", rng.choice(hashtags)])
+        for i in range(count)
+    ]
+
+
+def load_corpus(path: str) -> List[str]:
+    with open(path, encoding="utf-8") as f:
+        return [record["post"] for record in map(json.loads, f) if record.get("post")]
+
+
+def measure_codec(codec: Codec, texts: List[str]) -> Dict[str, Any]:
+    raw = sum(len(text.encode("utf-8")) for text in texts)
+    started = time.perf_counter()
+    stored = [codec.encode(text) for text in texts]
+    write_s = time.perf_counter() - started
+    started = time.perf_counter()
+    for value in stored:
+        codec.decode(value)
+    read_s = time.perf_counter() - started
+    size = sum(len(value.encode("utf-8")) if isinstance(value, str) else len(value) for value in stored)
+    return {
+        "bytes": size,
+        "ratio": raw / size,
+        "write_mb_s": raw / write_s / 1e6,
+        "read_mb_s": raw / read_s / 1e6
+    }
+
+
+def measure_backend(codec: Codec, texts: List[str]) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        backend = SQLiteBackend(path, codec=codec)
+        started = time.perf_counter()
+        for i, text in enumerate(texts):
+            backend.history_append("bench", {"post": text, "topic": f"topic {i}"})
+        write_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        after_id, rows = 0, 0
+        while True:
+            page = backend.history_page("bench", after_id=after_id)
+            if not page:
+                break
+            after_id = page[-1]["id"]
+            rows += len(page)
+        read_s = time.perf_counter() - started
+        backend._conn().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return {
+            "file_bytes": os.path.getsize(path),
+            "append_rows_s": len(texts) / write_s,
+            "page_rows_s": rows / read_s
+        }
+
+
+def run(corpus: Optional[str], count: int, seed: int, responses: str, train_share: float) -> Dict[str, Any]:
+    texts = load_corpus(corpus) if corpus else synthesize(responses, count, seed)
+    random.Random(seed).shuffle(texts)
+    split = int(len(texts) * train_share)
+    train, test = texts[:split], texts[split:]
+
+    codecs = {"plain": PlainCodec(min_size=0)}
+    if HAS_ZSTD:
+        codecs["zstd"] = Codec(min_size=0)
+        codecs["zstd+dict"] = Codec(train_dictionary(train), min_size=0)
+    else:
+        codecs["zlib"] = Codec(min_size=0)
+
+    return {
+        "texts": {"train": len(train), "test": len(test)},
+        "raw_bytes": sum(len(text.encode("utf-8")) for text in test),
+        "codecs": {name: measure_codec(codec, test) for name, codec in codecs.items()},
+        "backend": {name: measure_backend(codec, test) for name, codec in codecs.items()}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="JSONL with a \"post\" field per line (e.g. a history export)")
+    parser.add_argument("--count", type=int, default=5000, help="Synthetic posts when no --corpus is given")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--responses", default=DEFAULT_RESPONSES)
+    parser.add_argument("--train-share", type=float, default=0.2, help="Share of the corpus used for training")
+    parser.add_argument("--out", help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    report = run(args.corpus, args.count, args.seed, args.responses, args.train_share)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    print(f"{report['texts']['test']} held-out posts, {report['raw_bytes'] / 1024:,.0f} KiB raw")
+    for name, stats in report["codecs"].items():
+        backend = report["backend"][name]
+        print(f"  {name:<10} ratio {stats['ratio']:5.2f}x  "
+              f"encode {stats['write_mb_s']:7.1f} MB/s  decode {stats['read_mb_s']:7.1f} MB/s  "
+              f"db {backend['file_bytes'] / 1024:7,.0f} KiB  "
+              f"append {backend['append_rows_s']:7,.0f} rows/s  page {backend['page_rows_s']:8,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""A/B benchmark of the generate_post prompt variants over the template x tone x length x audience matrix.
+
+Every combination is assigned a variant at random and the experiment's streaming aggregates are
+reported with significance tests against the first (control) variant. Recorded responses don't
+depend on the prompt, so offline only prompt size is a real comparison; record a cassette against
+the live API for latency and constraint hit rates:
+
+    python -m benchmarks.experiments --variants full,compact,terse --sample 600
+    python -m benchmarks.experiments --cassette cassettes/experiments.cas --record --sample 200
+    python -m benchmarks.experiments --cassette cassettes/experiments.cas --speed 1 --out ab_report.json
+"""
+import argparse
+import itertools
+import json
+import random
+from typing import Any, Dict, Optional
+
+from Agents.Cassette import cassette_factory
+from Agents.Experiments import Experiment, format_report
+from Agents.PostAgent import MODEL_PROFILES, PROMPT_VARIANTS, LinkedInPostAgent
+from Agents.Router import ModelProfile, ModelRouter, default_factory
+from benchmarks.matrix import DEFAULT_RESPONSES, ReplayBackend
+
+
+def run(variants, sample: Optional[int], seed: int, responses: str, cassette: Optional[str] = None,
+        speed: float = 0.0, record: bool = False) -> Dict[str, Any]:
+    replay = None
+    if cassette:
+        factory = cassette_factory(default_factory, cassette, mode="auto" if record else "replay", speed=speed)
+        router = ModelRouter(MODEL_PROFILES, factory=factory)
+    else:
+        replay = ReplayBackend(responses)
+        router = ModelRouter([ModelProfile("replay", "fast")], factory=lambda profile: replay)
+    agent = LinkedInPostAgent(router=router)
+    agent.experiment = Experiment(variants, seed=seed)
+
+    matrix = list(itertools.product(agent.prompt_templates, agent.tones, agent.lengths, agent.audiences))
+    rng = random.Random(seed)
+    if sample:
+        # Sample with replacement so small matrices can still fill both arms
+        matrix = [rng.choice(matrix) for _ in range(sample)]
+
+    for template, tone, length, audience in matrix:
+        if replay:
+            replay.length = length
+        try:
+            agent.generate_post(agent.prompt_templates[template], f"{template} for {audience}",
+                                agent.audiences[audience], tone, length)
+        except Exception:
+            pass  # counted as an error for its variant
+    return agent.experiment.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--variants", default="full,compact", help=f"Comma-separated, control first; "
+                                                                   f"known: {', '.join(PROMPT_VARIANTS)}")
+    parser.add_argument("--sample", type=int, default=600, help="Requests to run (0 = each combination once)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--responses", default=DEFAULT_RESPONSES)
+    parser.add_argument("--cassette", help="Replay (or with --record, record) real model responses")
+    parser.add_argument("--record", action="store_true")
+    parser.add_argument("--speed", type=float, default=0.0, help="Cassette replay speed; 0 skips recorded latency")
+    parser.add_argument("--out", help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    variants = [v.strip() for v in args.variants.split(",") if v.strip()]
+    report = run(variants, args.sample, args.seed, args.responses, args.cassette, args.speed, args.record)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    print("\n".join(format_report(report)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""Offline benchmark over the template x tone x length x audience matrix.
+
+Runs LinkedInPostAgent.generate_post against recorded responses (no network) and
+reports local overhead, prompt size and constraint hit rates as JSON:
+
+    python -m benchmarks.matrix --sample 300 --out bench_report.json
+    python -m benchmarks.matrix --baseline main_report.json   # exit 1 on regression
+    python -m benchmarks.matrix --cassette cassettes/matrix.cas --speed 0   # replay real recordings
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage
+
+from Agents.Parser import parse_post
+from Agents.Cassette import cassette_factory
+from Agents.PostAgent import MODEL_PROFILES, LinkedInPostAgent
+from Agents.Router import ModelProfile, ModelRouter, default_factory
+
+
+DEFAULT_RESPONSES = "benchmarks/data/replay_responses.jsonl"
+
+
+class ReplayBackend:
+    """Serves recorded responses by length"""
+
+    def __init__(self, path: str = DEFAULT_RESPONSES):
+        self.by_length: Dict[str, List[str]] = defaultdict(list)
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                self.by_length[record["length"]].append(record["response"])
+        self.length = "Medium"
+
+    def invoke(self, input: Any, **kwargs) -> AIMessage:
+        prompt = input.to_string() if hasattr(input, "to_string") else str(input)
+        choices = self.by_length[self.length]
+        digest = int(hashlib.md5(prompt.encode("utf-8")).hexdigest(), 16)
+        return AIMessage(content=choices[digest % len(choices)])
+
+
+class TimedClient:
+    """Records the prompt and when the model call started and returned"""
+
+    def __init__(self, client):
+        self.client = client
+        self.last_prompt = ""
+        self.invoked_at = 0.0
+        self.returned_at = 0.0
+
+    def invoke(self, input: Any, **kwargs) -> Any:
+        self.invoked_at = time.perf_counter()
+        self.last_prompt = input.to_string() if hasattr(input, "to_string") else str(input)
+        result = self.client.invoke(input, **kwargs)
+        self.returned_at = time.perf_counter()
+        return result
+
+
+def approx_tokens(text: str) -> int:
+    """Gemini averages roughly four characters per token for English prose"""
+    return max(1, round(len(text) / 4))
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"p50": pick(0.5), "p95": pick(0.95), "max": ordered[-1], "mean": statistics.fmean(ordered)}
+
+
+def run(sample: Optional[int], seed: int, responses: str, cassette: Optional[str] = None,
+        speed: float = 0.0, record: bool = False) -> Dict[str, Any]:
+    replay = None
+    timed: Dict[str, TimedClient] = {}
+    if cassette:
+        # Same profiles as the app, so recorded prompts and parameters hash identically
+        inner = cassette_factory(default_factory, cassette, mode="auto" if record else "replay", speed=speed)
+        factory = lambda profile: timed.setdefault(profile.name, TimedClient(inner(profile)))
+        router = ModelRouter(MODEL_PROFILES, factory=factory)
+    else:
+        replay = TimedClient(ReplayBackend(responses))
+        router = ModelRouter([ModelProfile("replay", "fast")], factory=lambda profile: replay)
+    agent = LinkedInPostAgent(router=router)
+
+    matrix = list(itertools.product(agent.prompt_templates, agent.tones, agent.lengths, agent.audiences))
+    if sample and sample < len(matrix):
+        matrix = random.Random(seed).sample(matrix, sample)
+
+    rows = []
+    for template, tone, length, audience in matrix:
+        if replay:
+            replay.client.length = length
+        topic = f"{template} for {audience}"
+        started = time.perf_counter()
+        post = agent.generate_post(agent.prompt_templates[template], topic, agent.audiences[audience], tone, length)
+        finished = time.perf_counter()
+        backend = replay or max(timed.values(), key=lambda client: client.returned_at)
+
+        tree = parse_post(post)
+        rows.append({
+            "template": template,
+            "tone": tone,
+            "length": length,
+            "audience": audience,
+            "overhead_ms": (finished - started) * 1000,
+            "prompt_build_ms": (backend.invoked_at - started) * 1000,
+            "postprocess_ms": (finished - backend.returned_at) * 1000,
+            "prompt_tokens": approx_tokens(backend.last_prompt),
+            "words": tree.word_count(),
+            "word_limit_hit": tree.word_count() <= agent.lengths[length]["strict_limit"],
+            "hashtags_at_end": bool(tree.tags) and not tree.body_tags
+        })
+    return summarize(rows)
+
+
+def summarize(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def rates(group_rows):
+        return {
+            "n": len(group_rows),
+            "word_limit_hit_rate": sum(r["word_limit_hit"] for r in group_rows) / len(group_rows),
+            "hashtags_at_end_rate": sum(r["hashtags_at_end"] for r in group_rows) / len(group_rows)
+        }
+
+    report = {
+        "commit": git_commit(),
+        "created_at": time.time(),
+        "python": platform.python_version(),
+        "combos": len(rows),
+        "summary": {
+            "overhead_ms": percentiles([r["overhead_ms"] for r in rows]),
+            "prompt_build_ms": percentiles([r["prompt_build_ms"] for r in rows]),
+            "postprocess_ms": percentiles([r["postprocess_ms"] for r in rows]),
+            "prompt_tokens": percentiles([r["prompt_tokens"] for r in rows]),
+            **rates(rows)
+        }
+    }
+    for dimension in ("template", "tone", "length", "audience"):
+        groups = defaultdict(list)
+        for row in rows:
+            groups[row[dimension]].append(row)
+        report[f"by_{dimension}"] = {name: rates(group) for name, group in groups.items()}
+    report["rows"] = rows
+    return report
+
+
+def regressions(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Human-readable list of metrics that got worse than the baseline allows"""
+    problems = []
+    now, before = report["summary"], baseline["summary"]
+    for metric in ("overhead_ms", "postprocess_ms", "prompt_tokens"):
+        # Sub-millisecond timings are noise; only flag them once they are measurable
+        limit = max(before[metric]["p95"] * (1 + tolerance), before[metric]["p95"] + 0.5)
+        if now[metric]["p95"] > limit:
+            problems.append(f"{metric} p95 {now[metric]['p95']:.3f} > {limit:.3f}")
+    for metric in ("word_limit_hit_rate", "hashtags_at_end_rate"):
+        if now[metric] < before[metric] - 0.01:
+            problems.append(f"{metric} {now[metric]:.3f} < baseline {before[metric]:.3f}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sample", type=int, default=None, help="Random sample size (default: full matrix)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--responses", default=DEFAULT_RESPONSES, help="JSONL of recorded responses")
+    parser.add_argument("--cassette", help="Replay a recorded cassette instead of --responses")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="Cassette timing scale: 0 = instant, 1 = original pacing")
+    parser.add_argument("--record", action="store_true",
+                        help="Call the real API for prompts missing from --cassette and record them")
+    parser.add_argument("--out", default="bench_report.json")
+    parser.add_argument("--no-rows", action="store_true", help="Leave per-combination rows out of the report")
+    parser.add_argument("--baseline", help="Previous report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative p95 slowdown")
+    args = parser.parse_args()
+
+    report = run(args.sample, args.seed, args.responses, args.cassette, args.speed, args.record)
+    if args.no_rows:
+        report.pop("rows")
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    summary = report["summary"]
+    print(f"{report['combos']} combinations -> {args.out}")
+    print(f"  overhead p50/p95: {summary['overhead_ms']['p50']:.3f} / {summary['overhead_ms']['p95']:.3f} ms")
+    print(f"  prompt tokens mean/max: {summary['prompt_tokens']['mean']:.0f} / {summary['prompt_tokens']['max']}")
+    print(f"  word limit hit rate: {summary['word_limit_hit_rate']:.1%}")
+    print(f"  hashtags at end rate: {summary['hashtags_at_end_rate']:.1%}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = regressions(report, json.load(f), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION: {problem}")
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Memory benchmark: per-session state at high concurrency, old layout vs compact.
+
+"Naive" is the old layout: every session holds its post history as full strings, the
+current post, the editor copy, and its own agent catalogs. "Compact" is the current one:
+a slotted SessionState holding a post id into the shared compressed PostStore, plus the
+editor copy (a widget value, so it can't be replaced by an id). History lives in the
+state backend and isn't in session memory at all.
+
+    python -m benchmarks.sessions --sessions 1000
+    python -m benchmarks.sessions --store-mb 1   # force spilling to disk
+"""
+import argparse
+import gc
+import json
+import random
+import tempfile
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from Agents.PostAgent import LinkedInPostAgent
+from Agents.Router import FakeBackend, ModelProfile, ModelRouter
+from Agents.Session import PostStore, SessionState
+from benchmarks.matrix import DEFAULT_RESPONSES
+
+
+HISTORY_PER_SESSION = 5
+
+
+def load_posts(path: str) -> List[str]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)["response"] for line in f]
+
+
+def unique_post(posts: List[str], rng: random.Random, i: int) -> str:
+    # A fresh string object per session, as if it had just arrived from the model or the browser
+    return f"{posts[rng.randrange(len(posts))]}\n\n(draft {i})"
+
+
+def measure(build: Callable[[], Any]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    state = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del state
+    return current
+
+
+def run(sessions: int, seed: int, responses: str, store_mb: float) -> Dict[str, Any]:
+    posts = load_posts(responses)
+    agent = LinkedInPostAgent(router=ModelRouter([ModelProfile("fake", "fast")], factory=lambda p: FakeBackend()))
+
+    def naive():
+        rng = random.Random(seed)
+        state = []
+        for i in range(sessions):
+            current = unique_post(posts, rng, i)
+            state.append({
+                "post_history": [unique_post(posts, rng, i) for _ in range(HISTORY_PER_SESSION)],
+                "current_post": current,
+                "edit_area": "".join(current),
+                # What a per-session LinkedInPostAgent used to build
+                "catalogs": [agent._load_prompt_templates(), agent._load_audiences(),
+                             agent._load_tones(), agent._load_lengths()]
+            })
+        return state
+
+    spill_dir = tempfile.mkdtemp(prefix="post-spill-")
+    store_stats: Dict[str, int] = {}
+
+    def compact():
+        rng = random.Random(seed)
+        store = PostStore(max_bytes=int(store_mb * 1024 * 1024), spill_dir=spill_dir)
+        state = []
+        for i in range(sessions):
+            current = unique_post(posts, rng, i)
+            # Consume the same random stream as the naive layout, so both see the same posts
+            for _ in range(HISTORY_PER_SESSION):
+                unique_post(posts, rng, i)
+            session = SessionState(f"user-{i}")
+            session.set_post(store, current)
+            state.append({"session": session, "edit_area": current})
+        store_stats.update(store.stats())
+        return store, state
+
+    naive_bytes = measure(naive)
+    compact_bytes = measure(compact)
+    return {
+        "sessions": sessions,
+        "naive_bytes": naive_bytes,
+        "compact_bytes": compact_bytes,
+        "naive_per_session": naive_bytes / sessions,
+        "compact_per_session": compact_bytes / sessions,
+        "reduction": 1 - compact_bytes / naive_bytes,
+        "store": store_stats,
+        "session_state_bytes": SessionState("user-0", "0" * 24).__sizeof__()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--responses", default=DEFAULT_RESPONSES)
+    parser.add_argument("--store-mb", type=float, default=16.0, help="PostStore in-memory cap")
+    parser.add_argument("--out", help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    report = run(args.sessions, args.seed, args.responses, args.store_mb)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    print(f"{report['sessions']} sessions")
+    print(f"  naive:   {report['naive_bytes'] / 1024:,.0f} KiB ({report['naive_per_session']:,.0f} B/session)")
+    print(f"  compact: {report['compact_bytes'] / 1024:,.0f} KiB ({report['compact_per_session']:,.0f} B/session)")
+    print(f"  reduction: {report['reduction']:.1%}")
+    print(f"  store: {report['store']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Transport benchmark: connection reuse under concurrent load, against a local mock LLM server.
+
+"per-request" opens a fresh client for every call (the worst case), "per-client" gives each
+model profile its own client and pool (what every ChatGoogleGenerativeAI instance did on its
+own), and "shared" routes every client through one PooledTransport. The server counts the
+TCP connections it accepts, so reuse is measured from the far end, not inferred.
+
+    python -m benchmarks.transport --threads 16 --requests 50
+    python -m benchmarks.transport --latency-ms 200 --max-in-flight 8
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List
+
+import httpx
+
+from Agents.Transport import PooledTransport, PoolSettings
+
+
+PROFILES = 2  # fast + quality, as in PostAgent.MODEL_PROFILES
+
+RESPONSE = json.dumps({
+    "candidates": [{"content": {"parts": [{"text": "A short mock LinkedIn post. " * 20}]}}]
+}).encode("utf-8")
+
+
+class MockServer:
+    """Keep-alive HTTP/1.1 server that answers every POST after a fixed delay"""
+
+    def __init__(self, latency_s: float):
+        self.connections = 0
+        self.requests = 0
+        lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with lock:
+                    server.connections += 1
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with lock:
+                    server.requests += 1
+                time.sleep(latency_s)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(RESPONSE)))
+                self.end_headers()
+                self.wfile.write(RESPONSE)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1beta/models/mock:generateContent"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def reset(self):
+        self.connections = 0
+        self.requests = 0
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def drive(call: Callable[[int], None], threads: int, requests: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+
+    def one(i: int):
+        started = time.perf_counter()
+        call(i)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(one, range(threads * requests)))
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "wall_s": wall,
+        "rps": len(latencies) / wall,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000
+    }
+
+
+def run(threads: int, requests: int, latency_ms: float, settings: PoolSettings) -> Dict[str, Any]:
+    server = MockServer(latency_ms / 1000)
+    body = {"contents": [{"parts": [{"text": "Write a post"}]}]}
+    report: Dict[str, Any] = {"threads": threads, "requests": threads * requests, "latency_ms": latency_ms}
+    try:
+        def per_request(i: int):
+            with httpx.Client() as client:
+                client.post(server.url, json=body).raise_for_status()
+
+        clients = [httpx.Client(limits=httpx.Limits(max_connections=settings.max_connections,
+                                                    max_keepalive_connections=settings.max_keepalive))
+                   for _ in range(PROFILES)]
+
+        def per_client(i: int):
+            clients[i % PROFILES].post(server.url, json=body).raise_for_status()
+
+        transport = PooledTransport(settings)
+        shared = [httpx.Client(transport=transport) for _ in range(PROFILES)]
+
+        def shared_pool(i: int):
+            shared[i % PROFILES].post(server.url, json=body).raise_for_status()
+
+        for name, call in (("per-request", per_request), ("per-client", per_client), ("shared", shared_pool)):
+            server.reset()
+            result = drive(call, threads, requests)
+            result["connections"] = server.connections
+            result["requests_per_connection"] = server.requests / max(server.connections, 1)
+            report[name] = result
+        report["shared"]["pool"] = transport.stats()
+
+        for client in clients + shared:
+            client.close()
+        transport.shutdown()
+    finally:
+        server.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=50, help="Requests per thread")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Mock server think time per request")
+    parser.add_argument("--max-connections", type=int, default=20)
+    parser.add_argument("--max-in-flight", type=int, default=16)
+    parser.add_argument("--out", help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    settings = PoolSettings(max_connections=args.max_connections, max_keepalive=args.max_connections,
+                            max_in_flight=args.max_in_flight, http2=False)
+    report = run(args.threads, args.requests, args.latency_ms, settings)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    print(f"{report['requests']} requests from {report['threads']} threads, {report['latency_ms']:.0f} ms server time")
+    for name in ("per-request", "per-client", "shared"):
+        result = report[name]
+        print(f"  {name:<12} {result['connections']:>6,} connections ({result['requests_per_connection']:6.1f} req/conn)  "
+              f"{result['rps']:7.1f} req/s  p50 {result['p50_ms']:6.1f} ms  p95 {result['p95_ms']:6.1f} ms")
+    pool = report["shared"]["pool"]
+    print(f"  pool: peak {pool['peak_in_flight']}/{pool['max_in_flight']} in flight, {pool['waited']} waited, "
+          f"reuse {pool['reuse_ratio']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import threading
+
+import pytest
+
+from Agents.SharedState import HttpBackend, SQLiteBackend, serve
+
+
+@pytest.fixture
+def sqlite_backend(tmp_path):
+    return SQLiteBackend(str(tmp_path / "state.db"))
+
+
+@pytest.fixture
+def http_backend(sqlite_backend):
+    """A state server on an ephemeral port in front of a fresh SQLite file"""
+    server = serve(sqlite_backend, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield HttpBackend(f"http://127.0.0.1:{server.server_address[1]}")
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=["sqlite", "http"])
+def backend(request):
+    """Every StateBackend implementation, so both are held to the same contract"""
+    return request.getfixturevalue(f"{request.param}_backend")
+
+
+def run_concurrently(target, count: int):
+    """Call `target()` from `count` threads released at once; results in thread order"""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def run(index):
+        barrier.wait()
+        results[index] = target()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
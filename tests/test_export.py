@@ -0,0 +1,49 @@
+import csv
+
+from Agents.Export import ExportFilter, commit_watermark, export_history
+
+
+def add_posts(backend, count, audience="Managers"):
+    start = backend.history_count("u1")
+    for i in range(start, start + count):
+        backend.history_append("u1", {"post": f"Post {i} {audience}", "audience": audience, "created_at": 1000 + i})
+
+
+def rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_incremental_export_only_advances_once_committed(sqlite_backend, tmp_path):
+    add_posts(sqlite_backend, 3)
+    filters = ExportFilter(user="u1")
+
+    first = export_history(sqlite_backend, str(tmp_path / "a.csv"), filters=filters, incremental="app", commit=False)
+    assert first.rows == 3
+    # Never delivered, so the next export includes the same posts again
+    again = export_history(sqlite_backend, str(tmp_path / "b.csv"), filters=filters, incremental="app", commit=False)
+    assert again.rows == 3
+
+    commit_watermark(sqlite_backend, "app", filters, again.last_id)
+    add_posts(sqlite_backend, 1)
+    new = export_history(sqlite_backend, str(tmp_path / "c.csv"), filters=filters, incremental="app")
+    assert [row["post"] for row in rows(new.path)] == ["Post 3 Managers"]
+
+
+def test_watermarks_are_per_filter_set(sqlite_backend, tmp_path):
+    add_posts(sqlite_backend, 2, "Managers")
+    add_posts(sqlite_backend, 2, "Founders")
+    managers = ExportFilter(user="u1", audience="Managers")
+    export_history(sqlite_backend, str(tmp_path / "m.csv"), filters=managers, incremental="nightly")
+
+    founders = export_history(sqlite_backend, str(tmp_path / "f.csv"),
+                              filters=ExportFilter(user="u1", audience="Founders"), incremental="nightly")
+    assert founders.rows == 2
+
+
+def test_commit_never_moves_the_watermark_back(sqlite_backend, tmp_path):
+    add_posts(sqlite_backend, 3)
+    filters = ExportFilter(user="u1")
+    commit_watermark(sqlite_backend, "app", filters, 3)
+    commit_watermark(sqlite_backend, "app", filters, 1)
+    assert export_history(sqlite_backend, str(tmp_path / "a.csv"), filters=filters, incremental="app").rows == 0
@@ -0,0 +1,69 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from Agents.Hedging import HedgedInvoker
+from Agents.Router import FakeBackend
+
+
+class Sequenced:
+    """Hands each successive call to the next FakeBackend and records how its stream ended"""
+
+    def __init__(self, *backends: FakeBackend):
+        self.backends = backends
+        self.streams = []
+
+    def stream(self, input, **kwargs):
+        backend = self.backends[len(self.streams)]
+        record = {"chunks": 0, "closed": False, "kwargs": kwargs}
+        self.streams.append(record)
+
+        def run():
+            try:
+                for chunk in backend.stream(input, **kwargs):
+                    record["chunks"] += 1
+                    yield chunk
+            finally:
+                record["closed"] = True
+        return run()
+
+
+@pytest.fixture
+def executor():
+    pool = ThreadPoolExecutor(max_workers=4)
+    yield pool
+    pool.shutdown(wait=True)
+
+
+def test_slow_primary_is_hedged_and_the_win_counted(executor):
+    client = Sequenced(FakeBackend("slow primary answer", latency_s=0.5), FakeBackend("fast hedge answer"))
+    hedger = HedgedInvoker(default_threshold_s=0.05, executor=executor, attempt_timeout_s=5)
+
+    assert hedger.invoke(client, "prompt", key="m").content.strip() == "fast hedge answer"
+    stats = hedger.stats()
+    assert (stats["requests"], stats["hedges"], stats["hedge_wins"], stats["budget_denied"]) == (1, 1, 1, 0)
+    assert all(record["kwargs"]["timeout"] == 5 for record in client.streams)
+
+
+def test_exhausted_budget_sends_no_second_call(executor):
+    client = Sequenced(FakeBackend("primary answer", latency_s=0.2), FakeBackend("never sent"))
+    hedger = HedgedInvoker(default_threshold_s=0.02, burst=0.5, max_hedge_ratio=0.0, executor=executor)
+
+    assert hedger.invoke(client, "prompt").content.strip() == "primary answer"
+    stats = hedger.stats()
+    assert (stats["hedges"], stats["budget_denied"]) == (0, 1)
+    assert len(client.streams) == 1
+
+
+def test_losing_attempt_is_abandoned_and_closed(executor):
+    client = Sequenced(FakeBackend("a long slow primary answer", latency_s=0.3), FakeBackend("hedge"))
+    hedger = HedgedInvoker(default_threshold_s=0.05, executor=executor)
+    hedger.invoke(client, "prompt")
+
+    deadline = time.monotonic() + 2
+    while not client.streams[0]["closed"] and time.monotonic() < deadline:
+        time.sleep(0.02)
+    loser = client.streams[0]
+    # It stopped at its first chunk instead of streaming the rest of a response nobody uses
+    assert loser["closed"] and loser["chunks"] == 1
@@ -0,0 +1,44 @@
+import pytest
+
+from Agents.Importer import import_topics, read_rows
+from Agents.Jobs import JobQueue
+from Agents.PostAgent import LinkedInPostAgent
+from Agents.Router import FakeBackend, ModelProfile, ModelRouter
+
+DEFAULTS = {"audience": "General Professionals", "template": "Quick Tips List", "tone": "Professional",
+            "length": "Medium"}
+
+JSONL = b"""{"topic": "remote work"}
+{"topic": "async standups"
+"just a string"
+[1, 2]
+
+{"topic": "hiring juniors", "tone": "casual"}
+"""
+
+
+@pytest.fixture
+def agent():
+    return LinkedInPostAgent(router=ModelRouter([ModelProfile("fake", "fast")], factory=lambda profile: FakeBackend()))
+
+
+def test_bad_jsonl_lines_are_reported_and_skipped(agent, sqlite_backend, tmp_path):
+    path = tmp_path / "topics.jsonl"
+    path.write_bytes(JSONL)
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+
+    # chunk_size=1 flushes the first topic before the bad lines are reached
+    report = import_topics(str(path), agent, queue, sqlite_backend, "u1", DEFAULTS, chunk_size=1)
+
+    assert (report.rows, report.queued, report.invalid, report.duplicates) == (5, 2, 3, 0)
+    assert [(issue.line, issue.message) for issue in report.issues] == [
+        (2, "invalid JSON (Expecting ',' delimiter)"), (3, "not a JSON object"), (4, "not a JSON object")
+    ]
+    assert sorted(job.payload["topic"] for job in queue.list(user="u1")) == ["hiring juniors", "remote work"]
+
+
+def test_read_rows_without_a_handler_names_the_line(tmp_path):
+    path = tmp_path / "topics.jsonl"
+    path.write_bytes(JSONL)
+    with open(path, "rb") as stream, pytest.raises(ValueError, match="line 2"):
+        list(read_rows(stream, "jsonl"))
@@ -0,0 +1,59 @@
+import pytest
+
+from Agents.Jobs import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.db"), lease_s=60, backoff_s=1)
+
+
+def test_claim_leases_the_job(queue):
+    job_id = queue.enqueue({"topic": "remote work"}, user="u1", run_at=1000)
+    job = queue.claim(now=1000)
+    assert (job.id, job.status, job.attempts, job.lease_until) == (job_id, "running", 1, 1060)
+    assert queue.claim(now=1030) is None
+
+
+def test_expired_lease_is_reclaimed(queue):
+    queue.enqueue({"topic": "remote work"}, run_at=1000)
+    first = queue.claim(now=1000)
+    second = queue.claim(now=1061)
+    assert second.id == first.id
+    assert second.attempts == 2
+    assert second.lease_until == 1121
+
+
+def test_stale_lease_cannot_finish_the_job(queue):
+    queue.enqueue({"topic": "remote work"}, run_at=1000)
+    stale = queue.claim(now=1000)
+    current = queue.claim(now=1061)
+
+    assert not queue.complete(stale.id, "late result", stale.lease_until)
+    assert not queue.fail(stale.id, "late error", stale.lease_until)
+    assert not queue.defer(stale.id, 2000, stale.lease_until)
+    assert queue.get(current.id).status == "running"
+
+    assert queue.complete(current.id, "result", current.lease_until)
+    job = queue.get(current.id)
+    assert (job.status, job.result) == ("done", "result")
+
+
+def test_fail_after_completion_is_ignored(queue):
+    queue.enqueue({}, run_at=1000)
+    job = queue.claim(now=1000)
+    assert queue.complete(job.id, "result", job.lease_until)
+    assert not queue.fail(job.id, "error", job.lease_until)
+    assert not queue.fail(12345, "error", job.lease_until)
+
+
+def test_failures_retry_then_dead_letter(queue):
+    queue.enqueue({}, run_at=1000, max_attempts=2)
+    job = queue.claim(now=1000)
+    assert queue.fail(job.id, "boom", job.lease_until)
+    retried = queue.get(job.id)
+    assert retried.status == "queued" and retried.run_at > 1000
+
+    job = queue.claim(now=retried.run_at)
+    assert queue.fail(job.id, "boom again", job.lease_until)
+    assert queue.get(job.id).status == "dead"
@@ -0,0 +1,32 @@
+import pytest
+
+from Agents.Lint import fix_post, lint_post
+from tests.test_parser import POST
+
+
+def test_clean_post_lints_clean():
+    assert lint_post(POST) == []
+    assert fix_post(POST).text == POST
+
+
+def test_dotted_tokens_are_not_sentence_breaks():
+    post = "Throughput went up 3.5x after we moved to example.com. Nobody expected it."
+    assert [issue.rule for issue in lint_post(post)] == []
+
+
+@pytest.mark.parametrize("post, fixed", [
+    ("We leverage seamless tools. I hope this helps.\n\n#x", "We leverage smooth tools.\n\n#x"),
+    ("This is a **big** shift for #teams today.\n\n#x", "This is a big shift for teams today.\n\n#x #teams"),
+    ("A paradigm for hiring.\n\n#x", "A paradigm for hiring.\n\n#x"),
+])
+def test_fix_round_trip(post, fixed):
+    result = fix_post(post)
+    assert result.text == fixed
+    # Fixing is idempotent: a fixed post has nothing left to fix
+    assert fix_post(result.text).text == result.text
+    assert not [issue for issue in result.remaining if issue.fixable]
+
+
+def test_paradigm_is_flagged():
+    issues = lint_post("A paradigm for hiring.")
+    assert [(issue.rule, issue.fixable) for issue in issues] == [("buzzword", False)]
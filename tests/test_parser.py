@@ -0,0 +1,34 @@
+from Agents.Parser import parse_post, trim_post
+
+POST = """Most remote teams copy the office. That fails quietly.
+
+We tried three things last year, and one cut meetings by 3.5x.
+The playbook is on example.com for anyone who wants it.
+
+- Async standups
+- Written decisions
+
+What would you add?
+
+#RemoteWork #Teams"""
+
+
+def test_parse_spans_cover_the_post():
+    tree = parse_post(POST)
+    assert tree.text(tree.hook) == "Most remote teams copy the office. That fails quietly."
+    assert tree.text(tree.cta) == "What would you add?"
+    assert tree.tags == ("#RemoteWork", "#Teams")
+    assert tree.body_tags == ()
+    assert [tree.text(span) for span in tree.list_items] == ["- Async standups", "- Written decisions"]
+
+    # Blocks are ordered, don't overlap, and hold every non-blank character of the post
+    blocks = tree.blocks()
+    assert all(a.end <= b.start for a, b in zip(blocks, blocks[1:]))
+    assert " ".join(tree.text(span) for span in blocks).split() == POST.split()
+    assert tree.sections()["full"] == POST
+
+
+def test_trim_keeps_the_hashtag_block():
+    trimmed = trim_post(POST, 5)
+    assert trimmed == "Most remote teams copy the\n\n#RemoteWork #Teams"
+    assert parse_post(trimmed).word_count() == 5
@@ -0,0 +1,36 @@
+import pytest
+
+from Agents.Quota import Caller, QuotaExceeded, QuotaLimits, UsageMeter
+from Agents.Router import FakeBackend, ModelProfile, ModelRouter
+from tests.conftest import run_concurrently
+
+FAST = ModelProfile("fast-model", "fast")
+
+
+def test_quota_reservations_never_overshoot(backend):
+    meter = UsageMeter(backend, QuotaLimits(user_requests=5))
+    caller = Caller(user="u1")
+
+    def reserve():
+        try:
+            meter.reserve(caller)
+            return True
+        except QuotaExceeded:
+            return False
+
+    assert sum(run_concurrently(reserve, 20)) == 5
+    assert meter.usage(caller)["user"]["requests"] == 5
+
+
+def test_failed_calls_give_their_request_back(sqlite_backend):
+    meter = UsageMeter(sqlite_backend, QuotaLimits(user_requests=1))
+    caller = Caller(user="u1")
+    failing = ModelRouter([FAST], factory=lambda profile: FakeBackend(error_rate=1.0), meter=meter)
+    with pytest.raises(RuntimeError):
+        failing.invoke("prompt", caller=caller)
+    assert meter.usage(caller)["user"]["requests"] == 0
+
+    ModelRouter([FAST], factory=lambda profile: FakeBackend(), meter=meter).invoke("prompt", caller=caller)
+    assert meter.usage(caller)["user"]["requests"] == 1
+    with pytest.raises(QuotaExceeded):
+        ModelRouter([FAST], factory=lambda profile: FakeBackend(), meter=meter).invoke("prompt", caller=caller)
@@ -0,0 +1,77 @@
+import pytest
+
+from Agents.Router import CircuitBreaker, FakeBackend, ModelProfile, ModelRouter, UpstreamUnavailable
+
+FAST = ModelProfile("fast-model", "fast")
+QUALITY = ModelProfile("quality-model", "quality")
+
+
+class Unreachable:
+    """A client whose upstream is down"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, input, **kwargs):
+        self.calls += 1
+        raise ConnectionError("connection refused")
+
+
+def make_router(clients, **kwargs) -> ModelRouter:
+    return ModelRouter([FAST, QUALITY], factory=lambda profile: clients[profile.name], **kwargs)
+
+
+def test_fails_over_to_the_next_model():
+    clients = {FAST.name: FakeBackend(error_rate=1.0), QUALITY.name: FakeBackend("backup post")}
+    router = make_router(clients)
+
+    assert router.invoke("prompt", length="Short").content == "backup post"
+    assert clients[FAST.name].calls == 1
+    stats = router.stats()
+    assert stats[FAST.name]["error_rate"] == 1.0
+    assert stats[QUALITY.name]["error_rate"] == 0.0
+
+
+def test_quality_requests_start_on_the_quality_model():
+    clients = {FAST.name: FakeBackend("fast post"), QUALITY.name: FakeBackend("quality post")}
+    assert make_router(clients).invoke("prompt", length="Long").content == "quality post"
+    assert clients[FAST.name].calls == 0
+
+
+def test_unhealthy_model_moves_to_the_back():
+    clients = {FAST.name: FakeBackend(error_rate=1.0), QUALITY.name: FakeBackend()}
+    router = make_router(clients, min_samples=3)
+    for _ in range(3):
+        router.invoke("prompt", length="Short")
+
+    assert [profile.name for profile in router.choose(length="Short")] == [QUALITY.name, FAST.name]
+    router.invoke("prompt", length="Short")
+    assert clients[FAST.name].calls == 3
+
+
+def test_raises_the_last_error_when_every_model_fails():
+    clients = {FAST.name: FakeBackend(error_rate=1.0), QUALITY.name: Unreachable()}
+    with pytest.raises(ConnectionError):
+        make_router(clients).invoke("prompt", length="Short")
+
+
+def test_breaker_opens_on_outages_and_fails_fast():
+    clients = {FAST.name: Unreachable(), QUALITY.name: Unreachable()}
+    router = make_router(clients, breaker=CircuitBreaker(failure_threshold=2, cooldown_s=60))
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            router.invoke("prompt")
+
+    with pytest.raises(UpstreamUnavailable):
+        router.invoke("prompt")
+    assert clients[FAST.name].calls == 2
+
+
+def test_rejected_requests_do_not_open_the_breaker():
+    clients = {FAST.name: FakeBackend(error_rate=1.0), QUALITY.name: FakeBackend(error_rate=1.0)}
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_s=60)
+    router = make_router(clients, breaker=breaker)
+    with pytest.raises(RuntimeError):
+        router.invoke("prompt")
+    assert breaker.state == "closed"
+
@@ -0,0 +1,53 @@
+import pytest
+
+from Agents.Parser import parse_post
+from Agents.Router import FakeBackend
+from Agents.Sections import SECTION_NAMES, regenerate_section, splice_section
+
+POST = """Most remote teams copy the office.
+
+  We tried three things last year.   
+The playbook is on example.com.
+
+
+- Async standups
+
+What would you add?
+
+#RemoteWork   #Teams"""
+
+
+def rewrite(post: str, section: str, text: str = "Rewritten.") -> str:
+    backend = FakeBackend(text)
+    return regenerate_section(lambda prompt: backend.invoke(prompt), post, section, "remote work", "managers")
+
+
+NEW_TEXT = {
+    "hook": "Offices don't scale.",
+    "body": "We cut meetings in half.\nNobody missed them.",
+    "cta": "Which one would you try first?",
+    "hashtags": "#Async #Remote"
+}
+
+
+@pytest.mark.parametrize("section", SECTION_NAMES)
+def test_untouched_sections_are_byte_identical(section):
+    new_post = rewrite(POST, section, NEW_TEXT[section])
+
+    before, after = parse_post(POST), parse_post(new_post)
+    assert after.sections()[section] == NEW_TEXT[section]
+    for other in SECTION_NAMES:
+        if other != section:
+            assert after.sections()[other] == before.sections()[other]
+    # Everything outside the rewritten section, spacing included, is exactly the original
+    old = before.sections()[section]
+    start = POST.index(old)
+    assert new_post == POST[:start] + NEW_TEXT[section] + POST[start + len(old):]
+
+
+def test_missing_section_is_inserted_with_a_blank_line():
+    post = "Hook line.\n\nSome body text here.\n\n#x"
+    assert splice_section(post, "cta", "Thoughts?") == "Hook line.\n\nSome body text here.\n\nThoughts?\n\n#x"
+    assert splice_section("Hook line.\n\nWhat do you think?", "body", "Body.") == \
+        "Hook line.\n\nBody.\n\nWhat do you think?"
+    assert splice_section("Hook line.", "hashtags", "#x") == "Hook line.\n\n#x"
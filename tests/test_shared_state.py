@@ -0,0 +1,58 @@
+import threading
+import time
+
+from tests.conftest import run_concurrently
+
+
+def test_single_flight_computes_once(backend):
+    calls = []
+    lock = threading.Lock()
+
+    def compute():
+        with lock:
+            calls.append(1)
+        time.sleep(0.3)
+        return "post"
+
+    results = run_concurrently(lambda: backend.single_flight("k", compute, poll_s=0.05), 8)
+    assert results == ["post"] * 8
+    assert len(calls) == 1
+    assert backend.cache_get("k") == "post"
+
+
+def test_single_flight_serves_cache_hits(backend):
+    backend.cache_set("k", "cached", ttl_s=60)
+    assert backend.single_flight("k", lambda: "fresh") == "cached"
+
+
+def test_single_flight_releases_lock_on_error(backend):
+    def broken():
+        raise RuntimeError("model down")
+
+    try:
+        backend.single_flight("k", broken)
+    except RuntimeError:
+        pass
+    assert backend.acquire_lock("flight:k", "someone-else", ttl_s=5)
+
+
+def test_token_bucket_spends_capacity_then_refuses(backend):
+    assert [backend.take_token("b", rate_per_s=0.001, capacity=3) for _ in range(4)] == [True, True, True, False]
+
+
+def test_token_bucket_refills(backend):
+    assert backend.take_token("b", rate_per_s=20, capacity=1)
+    assert not backend.take_token("b", rate_per_s=20, capacity=1)
+    time.sleep(0.1)
+    assert backend.take_token("b", rate_per_s=20, capacity=1)
+
+
+def test_token_bucket_is_atomic(backend):
+    results = run_concurrently(lambda: backend.take_token("b", rate_per_s=0.001, capacity=5), 20)
+    assert sum(results) == 5
+
+
+def test_expired_cache_entries_are_gone(backend):
+    backend.cache_set("k", "v", ttl_s=-1)
+    assert backend.cache_get("k") is None
+
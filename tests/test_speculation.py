@@ -0,0 +1,52 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from Agents.Speculation import GenerationSettings, SpeculativeGenerator
+
+SETTINGS = GenerationSettings("Write a post", "remote work", "Managers", "Casual", "Short")
+
+
+@pytest.fixture
+def executor():
+    pool = ThreadPoolExecutor(max_workers=2)
+    yield pool
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def settled(speculator: SpeculativeGenerator, settings: GenerationSettings = SETTINGS) -> bool:
+    speculator.observe(settings, now=0)
+    return speculator.maybe_start(now=10)
+
+
+def test_budget_is_shared_by_every_session_of_a_user(sqlite_backend, executor):
+    def session():
+        return SpeculativeGenerator(lambda s: "post", budget=2, executor=executor,
+                                    backend=sqlite_backend, budget_key="u1")
+
+    tabs = [session(), session(), session()]
+    started = [settled(tab, GenerationSettings("Write a post", f"topic {i}", "Managers", "Casual", "Short"))
+               for i, tab in enumerate(tabs)]
+    assert started == [True, True, False]
+    assert tabs[2].budget_exhausted(now=11)
+    assert settled(SpeculativeGenerator(lambda s: "post", budget=2, executor=executor,
+                                        backend=sqlite_backend, budget_key="u2"))
+
+
+def test_take_gives_up_on_a_stuck_call(executor):
+    release = threading.Event()
+    speculator = SpeculativeGenerator(lambda s: release.wait(5) and "post", executor=executor)
+    assert settled(speculator)
+
+    started = time.monotonic()
+    assert speculator.take(SETTINGS, timeout=0.1) is None
+    assert time.monotonic() - started < 1
+    release.set()
+
+
+def test_take_serves_a_finished_draft(executor):
+    speculator = SpeculativeGenerator(lambda s: f"post about {s.topic}", executor=executor)
+    assert settled(speculator)
+    assert speculator.take(SETTINGS, timeout=1) == "post about remote work"
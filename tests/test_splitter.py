@@ -0,0 +1,27 @@
+import pytest
+
+from Agents.Splitter import FORMATS, number_items, split_text
+from tests.test_parser import POST
+
+
+@pytest.mark.parametrize("fmt", ["thread", "carousel"])
+def test_split_round_trip(fmt):
+    paragraph = "Remote work is a skill. Version 2.0 of our playbook lives at example.com today. " * 8
+    text = "\n\n".join([paragraph] * 12) + "\n\n#RemoteWork"
+    items = split_text(text, FORMATS[fmt])
+
+    assert len(items) > 1
+    assert all(len(item) <= FORMATS[fmt].max_chars for item in number_items(items, FORMATS[fmt]))
+    assert " ".join(items).split() == text.split()
+    assert items[-1].endswith("#RemoteWork")
+
+
+def test_split_breaks_between_sentences_not_inside_tokens():
+    sentence = "Version 2.0 ships from example.com on Friday. "
+    items = split_text(sentence * 40, FORMATS["carousel"])
+    for item in items:
+        assert item.startswith("Version 2.0") and item.endswith("Friday.")
+
+
+def test_short_post_is_one_item():
+    assert split_text(POST, FORMATS["thread"]) == [POST]